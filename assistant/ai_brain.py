@@ -2,14 +2,239 @@
 AI Brain - Uses FREE Groq API with Llama models
 """
 
-from groq import Groq
+import concurrent.futures
 import config
+import contextvars
 import json
+import os
+import time
+from assistant.context_window import ContextWindow
+from assistant.llm_backend import create_backend
+from assistant.intent_router import normalize
+from assistant.tool_outputs import ToolOutputStore
+from assistant.tracing import tracer
+
+# Tools the model can call, in Groq/OpenAI function-calling format
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read the contents of a file. Large files are cut off with a note saying what was left out; use a line range, head/tail or a byte range to read a specific part",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to read"
+                    },
+                    "start_line": {
+                        "type": "integer",
+                        "description": "First line to read (1-based)"
+                    },
+                    "end_line": {
+                        "type": "integer",
+                        "description": "Last line to read (inclusive)"
+                    },
+                    "head": {
+                        "type": "integer",
+                        "description": "Read only the first N lines"
+                    },
+                    "tail": {
+                        "type": "integer",
+                        "description": "Read only the last N lines, e.g. of a log file"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Byte offset to start reading at (negative counts from the end)"
+                    },
+                    "length": {
+                        "type": "integer",
+                        "description": "Number of bytes to read from offset"
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "Cap on the returned text, in bytes"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "write_file",
+            "description": "Write content to a file (creates new or overwrites existing)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to write"
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Content to write to the file"
+                    }
+                },
+                "required": ["file_path", "content"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "edit_file",
+            "description": "Change part of an existing file without resending all of it: exact search/replace edits, or unified-diff hunks. Nothing is written unless every edit applies",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to edit"
+                    },
+                    "edits": {
+                        "type": "array",
+                        "description": "Applied in order; each search text must appear exactly once in the file",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "search": {
+                                    "type": "string",
+                                    "description": "Exact text to replace, with enough surrounding lines to be unique"
+                                },
+                                "replace": {
+                                    "type": "string",
+                                    "description": "Text to put in its place"
+                                }
+                            },
+                            "required": ["search", "replace"]
+                        }
+                    },
+                    "diff": {
+                        "type": "string",
+                        "description": "Unified diff hunks (@@ -line,count +line,count @@ with ' ', '-', '+' lines)"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_files",
+            "description": "List files in a directory",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory path (default: current directory)"
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_tree",
+            "description": "List every file under a directory, recursively, with file sizes",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory path (default: the whole workspace)"
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "Only files at most this many directories down (1 = the directory itself)"
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "find_files",
+            "description": "Find files by glob pattern, with file sizes. A pattern without a slash matches file names at any depth (e.g. '*.py', 'test_*'); use ** to span directories (e.g. 'src/**/*.js')",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "Glob pattern"
+                    },
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory to search under (default: the whole workspace)"
+                    }
+                },
+                "required": ["pattern"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_code",
+            "description": "Search the contents of every file in the workspace, e.g. to find where something is defined or used. Returns path:line matches with a line of context",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Text to look for (case-insensitive unless case_sensitive is set)"
+                    },
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory to search under (default: the whole workspace)"
+                    },
+                    "regex": {
+                        "type": "boolean",
+                        "description": "Treat query as a regular expression"
+                    },
+                    "case_sensitive": {
+                        "type": "boolean",
+                        "description": "Match case exactly"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    }
+]
+
+# Tools that change the workspace; calls on the same path must not be reordered
+WRITE_TOOLS = {"write_file", "edit_file"}
+# Answers built only from these tools can be cached against the files they read.
+# Listings and searches are left out: a directory's mtime covers neither its
+# subdirectories nor the sizes of the files listed in it.
+READ_ONLY_TOOLS = {"read_file"}
+READ_RANGE_ARGS = ("start_line", "end_line", "head", "tail", "offset", "length", "max_bytes")
+
 
 class AIBrain:
-    def __init__(self, memory=None):
-        self.client = Groq(api_key=config.GROQ_API_KEY)
+    def __init__(self, memory=None, backend=None, tool_pool=None):
+        # Groq by default; anything with the same create() works (mock server, test fakes)
+        self.backend = backend or create_backend()
         self.conversation_history = []
+        self.context = ContextWindow()
+        # Only the newest copy of a tool output, and no stale file contents, go out with each request
+        self.tool_outputs = ToolOutputStore()
+        self._local_turns = 0
+        self.cached_answers = 0  # turns answered from the answer cache, without the LLM
+        # Workspace snippets for the current turn; sent with its requests, never kept in history
+        self._retrieved = None
+        # Sessions served by one process can share a pool
+        self.tool_pool = tool_pool or concurrent.futures.ThreadPoolExecutor(
+            max_workers=config.TOOL_WORKERS,
+            thread_name_prefix="jarvis-tool"
+        )
         self.memory = memory
         self.system_prompt = """You are JARVIS, a helpful AI assistant with access to the user's code editor and memory.
 You can perform file operations, write code, and help with programming tasks.
@@ -18,7 +243,7 @@ You work within the Jarvis_Work folder in the user's Documents directory.
 When the user asks you to work with files or code, use the available tools to:
 - Read files
 - Create new files and folders
-- Modify existing files
+- Modify existing files (use edit_file to change part of a file; write_file only for new files or full rewrites)
 - List directory contents
 - Write or generate code
 
@@ -30,9 +255,8 @@ All paths are relative to the Jarvis_Work folder. Examples:
 Be concise but friendly in your responses. Keep answers under 2-3 sentences when possible.
 """
     
-    def process_command(self, command, code_handler):
-        """Process user command and return response"""
-        
+    def _add_user_message(self, command):
+        """Append the user's command, with memory context on the first turn"""
         # Add context from memory if available
         context = ""
         if self.memory:
@@ -47,117 +271,247 @@ Be concise but friendly in your responses. Keep answers under 2-3 sentences when
             "role": "user",
             "content": user_message
         })
+    
+    def _messages(self, code_handler):
+        """System prompt plus history, deduplicated and trimmed to the context token budget"""
+        self.tool_outputs.refresh(self.conversation_history, code_handler.fingerprint)
+        return self.context.fit(self.system_prompt, self.conversation_history, self._retrieved)
+    
+    def _retrieve(self, command, code_handler):
+        """Workspace snippets relevant to command, as a message for this turn's requests"""
+        self._retrieved = None
+        if not config.RETRIEVAL_ENABLED:
+            return
+        with tracer.span("retrieve") as span:
+            text = code_handler.relevant_context(command)
+            span.set(bytes=len(text))
+        if text:
+            self._retrieved = {"role": "system", "content": text}
+    
+    def _add_tool_result(self, tool_call, result, code_handler):
+        message = {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "content": str(result)
+        }
+        self.conversation_history.append(message)
         
-        # Determine if this is a code-related task
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_file",
-                    "description": "Read the contents of a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the file to read"
-                            }
-                        },
-                        "required": ["file_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "write_file",
-                    "description": "Write content to a file (creates new or overwrites existing)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the file to write"
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Content to write to the file"
-                            }
-                        },
-                        "required": ["file_path", "content"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_files",
-                    "description": "List files in a directory",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "directory": {
-                                "type": "string",
-                                "description": "Directory path (default: current directory)"
-                            }
-                        }
-                    }
-                }
-            }
-        ]
+        name, path = tool_call["function"]["name"], _tool_path(tool_call)
+        read_as = None
+        if name == "read_file" and path and not message["content"].startswith("Error"):
+            fingerprint = code_handler.fingerprint([path]) if code_handler else None
+            read_as = fingerprint[0] if fingerprint else None
+        self.tool_outputs.add(message, f"{name}({path or ''})", read_as)
+    
+    @property
+    def prompt_metrics(self):
+        """Size metrics for each request sent this session, oldest first"""
+        return list(self.context.metrics)
+    
+    def _run_tool(self, tool_call, code_handler):
+        """Execute one tool call and return its result"""
+        function_name = tool_call["function"]["name"]
+        with tracer.span(f"tool.{function_name}", path=_tool_path(tool_call)):
+            return self._call_tool(function_name, tool_call, code_handler)
+    
+    def _call_tool(self, function_name, tool_call, code_handler):
+        try:
+            function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+        except ValueError:
+            return f"Error: Invalid arguments for '{function_name}'"
         
-        # Call Groq (FREE) with function calling
-        messages = [{"role": "system", "content": self.system_prompt}] + self.conversation_history
+        # Execute the function
+        if function_name == "read_file":
+            ranges = {name: function_args[name] for name in READ_RANGE_ARGS if function_args.get(name) is not None}
+            result = code_handler.read_file(function_args["file_path"], **ranges)
+        elif function_name == "write_file":
+            result = code_handler.write_file(
+                function_args["file_path"],
+                function_args["content"]
+            )
+        elif function_name == "edit_file":
+            result = code_handler.edit_file(
+                function_args["file_path"],
+                function_args.get("edits"),
+                function_args.get("diff")
+            )
+        elif function_name == "list_files":
+            directory = function_args.get("directory", ".")
+            result = code_handler.list_files(directory)
+        elif function_name == "list_tree":
+            result = code_handler.list_tree(function_args.get("directory", "."), function_args.get("max_depth"))
+        elif function_name == "find_files":
+            result = code_handler.find_files(function_args["pattern"], function_args.get("directory", "."))
+        elif function_name == "search_code":
+            result = code_handler.search_code(
+                function_args["query"],
+                function_args.get("directory", "."),
+                function_args.get("regex", False),
+                function_args.get("case_sensitive", False)
+            )
+        else:
+            result = f"Error: Unknown tool '{function_name}'"
+        return result
+    
+    def _run_tools(self, tool_calls, code_handler, deadline):
+        """
+        Execute a batch of tool calls and record them in the conversation.
+        Calls touching a path that is written in this batch run in order on one
+        worker; every other call (reads, listings) runs concurrently.
+        """
+        lanes = {}
+        written = set()
+        for tool_call in tool_calls:
+            if tool_call["function"]["name"] in WRITE_TOOLS:
+                written.add(_tool_path(tool_call))
+        for index, tool_call in enumerate(tool_calls):
+            path = _tool_path(tool_call)
+            key = path if path in written else index
+            lanes.setdefault(key, []).append((index, tool_call))
         
-        response = self.client.chat.completions.create(
-            model=config.GROQ_MODEL,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto"
-        )
+        def run_lane(lane):
+            done = []
+            for index, tool_call in lane:
+                # A lane can sit in the pool past the deadline; nothing new starts after it
+                if time.monotonic() >= deadline:
+                    done.append((index, "Error: Tool call timed out before it started"))
+                else:
+                    done.append((index, self._run_tool(tool_call, code_handler)))
+            return done
         
-        response_message = response.choices[0].message
-        tool_calls = response_message.tool_calls
-        
-        # Handle function calls
-        if tool_calls:
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
-                # Execute the function
-                if function_name == "read_file":
-                    result = code_handler.read_file(function_args["file_path"])
-                elif function_name == "write_file":
-                    result = code_handler.write_file(
-                        function_args["file_path"],
-                        function_args["content"]
-                    )
-                elif function_name == "list_files":
-                    directory = function_args.get("directory", ".")
-                    result = code_handler.list_files(directory)
-                
-                # Add function result to conversation
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": None,
-                    "tool_calls": [tool_call.model_dump()]
-                })
-                self.conversation_history.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": str(result)
-                })
+        results = {}
+        # Workers run in a copy of this context, so their tool spans belong to the current turn
+        futures = [self.tool_pool.submit(contextvars.copy_context().run, run_lane, lane) for lane in lanes.values()]
+        for future, lane in zip(futures, lanes.values()):
+            # A write can't be abandoned: telling the model it failed while it
+            # still lands would make a retry write twice. Wait for it to finish.
+            writes = any(tool_call["function"]["name"] in WRITE_TOOLS for _, tool_call in lane)
+            try:
+                timeout = None if writes else max(0, deadline - time.monotonic())
+                results.update(future.result(timeout=timeout))
+            except concurrent.futures.TimeoutError:
+                for index, _ in lane:
+                    results.setdefault(index, "Error: Tool call timed out")
+            except Exception as e:
+                for index, _ in lane:
+                    results.setdefault(index, f"Error: {e}")
+        
+        # Add function results to conversation, in the order the model asked for them
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": tool_calls
+        })
+        for index, tool_call in enumerate(tool_calls):
+            self._add_tool_result(tool_call, results[index], code_handler)
+    
+    def record_local_turn(self, command, tool_name, tool_args, result, reply, code_handler=None):
+        """Add a turn answered by the intent router, so follow-up questions have its context"""
+        self._add_user_message(command)
+        self._local_turns += 1
+        tool_call = {
+            "id": f"local_{self._local_turns}",
+            "type": "function",
+            "function": {"name": tool_name, "arguments": json.dumps(tool_args)}
+        }
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [tool_call]
+        })
+        self._add_tool_result(tool_call, result, code_handler)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": reply
+        })
+    
+    def _cached_answer(self, command, code_handler):
+        """A previous answer to the same question, if none of the files it used have changed"""
+        if not config.ANSWER_CACHE:
+            return None
+        cached = code_handler.cache.get(("answer", normalize(command)))
+        if cached is None:
+            return None
+        answer, fingerprint = cached
+        if code_handler.fingerprint([path for path, _, _ in fingerprint]) != fingerprint:
+            return None
+        return answer
+    
+    def _cache_answer(self, command, turn_start, code_handler, answer):
+        """Cache an answer that came only from reading files the command names"""
+        if not config.ANSWER_CACHE:
+            return
+        prompt = normalize(command)
+        paths = []
+        for message in self.conversation_history[turn_start:]:
+            for tool_call in message.get("tool_calls") or []:
+                if tool_call["function"]["name"] not in READ_ONLY_TOOLS:
+                    return
+                paths.append(_tool_path(tool_call))
+        
+        # Without tools, or with files the command doesn't name ("summarize it"),
+        # the answer depends on the conversation rather than the workspace
+        if not answer or not paths:
+            return
+        if any(not path or os.path.basename(path).lower() not in prompt for path in paths):
+            return
+        
+        fingerprint = code_handler.fingerprint(sorted(set(paths)))
+        if fingerprint is not None:
+            code_handler.cache.put(("answer", prompt), (answer, fingerprint), tags=paths)
+    
+    def _answer_from_cache(self, command, answer):
+        self._add_user_message(command)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": answer
+        })
+    
+    def process_command(self, command, code_handler):
+        """Process user command and return response"""
+        cached = self._cached_answer(command, code_handler)
+        if cached is not None:
+            self._answer_from_cache(command, cached)
+            self.cached_answers += 1
+            return cached
+        
+        self._add_user_message(command)
+        self._retrieve(command, code_handler)
+        turn_start = len(self.conversation_history)
+        deadline = time.monotonic() + config.TOOL_LOOP_TIMEOUT
+        
+        # Keep resolving tool calls until the model answers, up to the round/time limit
+        assistant_message = None
+        for _ in range(config.MAX_TOOL_ROUNDS):
+            # Call Groq (FREE) with function calling
+            with tracer.span("completion") as span:
+                response = self.backend.create(
+                    model=config.GROQ_MODEL,
+                    messages=self._messages(code_handler),
+                    tools=TOOLS,
+                    tool_choice="auto"
+                )
+                span.set(tool_calls=len(response.choices[0].message.tool_calls or []))
             
-            # Get final response after function execution
-            messages = [{"role": "system", "content": self.system_prompt}] + self.conversation_history
-            final_response = self.client.chat.completions.create(
-                model=config.GROQ_MODEL,
-                messages=messages
-            )
+            response_message = response.choices[0].message
+            if not response_message.tool_calls:
+                assistant_message = response_message.content
+                break
+            
+            self._run_tools([tc.model_dump() for tc in response_message.tool_calls], code_handler, deadline)
+            if time.monotonic() >= deadline:
+                break
+        
+        if assistant_message is None:
+            # Out of rounds or time: ask for an answer without offering tools
+            with tracer.span("completion", tool_calls=0):
+                final_response = self.backend.create(
+                    model=config.GROQ_MODEL,
+                    messages=self._messages(code_handler)
+                )
             assistant_message = final_response.choices[0].message.content
-        else:
-            assistant_message = response_message.content
+        
+        self._cache_answer(command, turn_start, code_handler, assistant_message)
         
         # Add assistant response to history
         self.conversation_history.append({
@@ -166,3 +520,95 @@ Be concise but friendly in your responses. Keep answers under 2-3 sentences when
         })
         
         return assistant_message
+    
+    def process_command_stream(self, command, code_handler):
+        """
+        Same as process_command, but yields the answer text as it is generated.
+        Tool calls are collected from the stream and executed, and whatever the
+        model says next is streamed too.
+        """
+        cached = self._cached_answer(command, code_handler)
+        if cached is not None:
+            self._answer_from_cache(command, cached)
+            self.cached_answers += 1
+            yield cached
+            return
+        
+        self._add_user_message(command)
+        self._retrieve(command, code_handler)
+        turn_start = len(self.conversation_history)
+        deadline = time.monotonic() + config.TOOL_LOOP_TIMEOUT
+        
+        parts = []
+        answered = False
+        for _ in range(config.MAX_TOOL_ROUNDS):
+            tool_calls = yield from self._stream_completion(parts, code_handler, tools=TOOLS)
+            if not tool_calls:
+                answered = True
+                break
+            
+            self._run_tools(tool_calls, code_handler, deadline)
+            if time.monotonic() >= deadline:
+                break
+        
+        if not answered:
+            # Out of rounds or time: ask for an answer without offering tools
+            yield from self._stream_completion(parts, code_handler)
+        
+        self._cache_answer(command, turn_start, code_handler, "".join(parts))
+        
+        # Add assistant response to history
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": "".join(parts)
+        })
+    
+    def _stream_completion(self, parts, code_handler, tools=None):
+        """Stream one completion, yielding text; returns any tool calls it made"""
+        options = {"tools": tools, "tool_choice": "auto"} if tools else {}
+        # Timed by hand: a span can't stay open across the yields below
+        start = time.perf_counter()
+        first_token = None
+        stream = self.backend.create(
+            model=config.GROQ_MODEL,
+            messages=self._messages(code_handler),
+            stream=True,
+            **options
+        )
+        
+        tool_calls = {}
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            if delta.content:
+                parts.append(delta.content)
+                yield delta.content
+            # Tool call ids, names and arguments can arrive split across chunks
+            for piece in delta.tool_calls or []:
+                call = tool_calls.setdefault(piece.index, {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if piece.id:
+                    call["id"] = piece.id
+                if piece.function and piece.function.name:
+                    call["function"]["name"] += piece.function.name
+                if piece.function and piece.function.arguments:
+                    call["function"]["arguments"] += piece.function.arguments
+        
+        tracer.record("completion", time.perf_counter() - start, tool_calls=len(tool_calls),
+                      first_token_ms=round((first_token or 0) * 1000, 1))
+        return [tool_calls[index] for index in sorted(tool_calls)]
+
+
+def _tool_path(tool_call):
+    """The workspace path a tool call touches, if it names one"""
+    try:
+        args = json.loads(tool_call["function"]["arguments"] or "{}")
+    except ValueError:
+        return None
+    return args.get("file_path") or args.get("directory")
@@ -0,0 +1,366 @@
+"""
+Audio Pipeline - Continuous capture, concurrent recognition and barge-in
+A capture thread reads raw chunks from one long-lived audio source and cuts
+them into phrases; recognition workers turn phrases into text while the
+assistant is thinking or speaking. Speech that starts while JARVIS is talking
+interrupts the TTS. While waiting for the wake word, phrases are only sent to
+recognition after the offline keyword spotter fires. With a streaming speech
+backend each phrase is recognized while it is still being spoken.
+"""
+
+import itertools
+import math
+import queue
+import threading
+import time
+import wave
+import speech_recognition as sr
+import config
+from assistant.tracing import tracer
+from assistant.wake_word import KeywordSpotter, WakeWordDetector
+
+
+class MicrophoneSource:
+    """Keeps one microphone stream open for the whole session"""
+    
+    def __init__(self, microphone=None):
+        self.microphone = microphone or sr.Microphone(sample_rate=config.SAMPLE_RATE, chunk_size=config.CHUNK_SIZE)
+        self.source = None
+    
+    def open(self):
+        self.source = self.microphone.__enter__()
+        self.sample_rate = self.source.SAMPLE_RATE
+        self.sample_width = self.source.SAMPLE_WIDTH
+        self.chunk_size = self.source.CHUNK
+    
+    def read(self):
+        return self.source.stream.read(self.chunk_size)
+    
+    def close(self):
+        if self.source is not None:
+            self.microphone.__exit__(None, None, None)
+            self.source = None
+
+
+class WavFileSource:
+    """
+    Replays mono 16-bit WAV files as if they came from the microphone.
+    With realtime=True chunks are paced at the file's sample rate; files are
+    separated by `gap` seconds of silence. read() returns None at the end.
+    """
+    
+    def __init__(self, paths, realtime=True, gap=1.0):
+        self.paths = list(paths)
+        self.realtime = realtime
+        self.gap = gap
+        self.chunk_size = config.CHUNK_SIZE
+    
+    def open(self):
+        with wave.open(str(self.paths[0]), "rb") as wav:
+            self.sample_rate = wav.getframerate()
+            self.sample_width = wav.getsampwidth()
+        self._chunks = self._iter_chunks()
+        self._started = None
+        self._sent = 0
+    
+    def _iter_chunks(self):
+        for path in self.paths:
+            with wave.open(str(path), "rb") as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise ValueError(f"{path}: expected mono 16-bit PCM")
+                self.sample_rate = wav.getframerate()
+                self.sample_width = wav.getsampwidth()
+                while True:
+                    frames = wav.readframes(self.chunk_size)
+                    if not frames:
+                        break
+                    yield frames
+            silence = b"\0" * self.chunk_size * self.sample_width
+            for _ in range(int(self.gap * self.sample_rate / self.chunk_size)):
+                yield silence
+    
+    def read(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return None
+        if self.realtime:
+            if self._started is None:
+                self._started = time.monotonic()
+            self._sent += len(chunk) // self.sample_width
+            ahead = self._started + self._sent / self.sample_rate - time.monotonic()
+            if ahead > 0:
+                time.sleep(ahead)
+        return chunk
+    
+    def close(self):
+        pass
+
+
+class PhraseSegmenter:
+    """Endpointing: turns a stream of chunks and their VAD decisions into phrases"""
+    
+    def __init__(self, sample_rate, sample_width, chunk_size,
+                 pause_threshold=0.8, phrase_time_limit=None, min_phrase=0.3, pre_roll=0.3):
+        seconds_per_chunk = chunk_size / sample_rate
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.pause_chunks = math.ceil(pause_threshold / seconds_per_chunk)
+        self.max_chunks = math.ceil(phrase_time_limit / seconds_per_chunk) if phrase_time_limit else None
+        self.min_chunks = math.ceil(min_phrase / seconds_per_chunk)
+        self.pre_roll = max(1, math.ceil(pre_roll / seconds_per_chunk))
+        self._history = []
+        self._phrase = None
+        self._voiced = 0
+        self._silent = 0
+    
+    @property
+    def in_phrase(self):
+        return self._phrase is not None
+    
+    @property
+    def audio(self):
+        """The current phrase so far, pre-roll included"""
+        return b"".join(self._phrase or ())
+    
+    def feed(self, chunk, loud):
+        """
+        Returns "start" when speech begins, the phrase bytes when it ends,
+        "drop" when what began turned out to be too short, otherwise None
+        """
+        if self._phrase is None:
+            self._history = (self._history + [chunk])[-self.pre_roll:]
+            if not loud:
+                return None
+            self._phrase = list(self._history)
+            self._voiced = 1
+            self._silent = 0
+            return "start"
+        
+        self._phrase.append(chunk)
+        if loud:
+            self._voiced += 1
+            self._silent = 0
+        else:
+            self._silent += 1
+        
+        too_long = self.max_chunks and len(self._phrase) >= self.max_chunks
+        if self._silent >= self.pause_chunks or too_long:
+            phrase, voiced = self._phrase, self._voiced
+            self._phrase = None
+            self._history = []
+            # Clicks and pops are shorter than any real phrase
+            if voiced >= self.min_chunks:
+                return b"".join(phrase)
+            return "drop"
+        return None
+
+
+class VoicePipeline:
+    """
+    capture thread -> phrases queue -> recognition workers -> transcripts queue
+    Transcripts come out in the order they were spoken.
+    
+    Streaming speech backends get a single recognition thread instead, fed
+    chunk by chunk while the phrase is spoken. Each partial hypothesis is
+    passed to on_partial(text); when it returns True the phrase is final
+    right away, without waiting for the closing pause.
+    """
+    
+    def __init__(self, voice, source=None, workers=None, spotter=None, on_partial=None):
+        self.voice = voice
+        self.source = source or MicrophoneSource(voice.microphone)
+        self.engine = getattr(voice, "engine", None)
+        self.streaming = bool(self.engine and self.engine.streaming)
+        self.workers = 1 if self.streaming else workers or config.RECOGNITION_WORKERS
+        self.on_partial = on_partial
+        self.partial = None
+        self.early_finals = 0
+        self._live = queue.Queue()
+        self.spotter = spotter if spotter is not None else KeywordSpotter.from_directory()
+        self.wake_hits = 0
+        self.skipped = 0
+        self._waiting_for_wake = threading.Event()
+        self.phrases = queue.Queue(maxsize=config.CAPTURE_QUEUE_SIZE)
+        self.transcripts = queue.Queue()
+        self.finished = threading.Event()
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._sequence = itertools.count()
+        self._pending = {}
+        self._next_out = 0
+        self._out_lock = threading.Lock()
+        self._done_workers = 0
+        self._threads = []
+    
+    def start(self):
+        self.source.open()
+        self._threads = [threading.Thread(target=self._capture, name="jarvis-capture", daemon=True)]
+        if self.streaming:
+            self._threads.append(threading.Thread(target=self._recognize_stream, name="jarvis-recognize", daemon=True))
+        for i in range(0 if self.streaming else self.workers):
+            self._threads.append(threading.Thread(target=self._recognize, name=f"jarvis-recognize-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self.source.close()
+    
+    def wait_for_wake(self, enabled=True):
+        """
+        While enabled, phrases go to recognition only after a local wake word
+        hit, which is reported as a transcript of just the wake word.
+        Without enrolled templates every phrase is recognized as before.
+        """
+        if enabled and self.spotter is not None:
+            self._waiting_for_wake.set()
+        else:
+            self._waiting_for_wake.clear()
+    
+    def next_transcript(self, timeout=None):
+        """Next recognized utterance, or None on timeout / end of input"""
+        while True:
+            try:
+                return self.transcripts.get(timeout=0.1 if timeout is None else timeout)
+            except queue.Empty:
+                if timeout is not None or self.finished.is_set():
+                    return None
+    
+    def _capture(self):
+        segmenter = None
+        detector = WakeWordDetector(self.spotter, self.source.sample_rate)
+        wake_phrase = False
+        live = None  # sequence number of the phrase being streamed to the recognizer
+        try:
+            while not self._stop.is_set():
+                chunk = self.source.read()
+                if chunk is None:
+                    break
+                if segmenter is None:
+                    segmenter = PhraseSegmenter(
+                        self.source.sample_rate, self.source.sample_width, len(chunk) // self.source.sample_width,
+                        pause_threshold=self.voice.recognizer.pause_threshold,
+                        phrase_time_limit=config.PHRASE_TIME_LIMIT
+                    )
+                
+                # JARVIS's own voice reaches the mic too; only louder speech counts as barge-in
+                speaking = self.voice.is_speaking
+                waiting = self._waiting_for_wake.is_set()
+                speech, wake = detector.process(chunk, config.BARGE_IN_FACTOR if speaking else 1.0, spot=waiting)
+                event = segmenter.feed(chunk, speech)
+                
+                if wake and self._waiting_for_wake.is_set():
+                    self._waiting_for_wake.clear()
+                    self.wake_hits += 1
+                    # The rest of the phrase holding the wake word is not a command
+                    wake_phrase = segmenter.in_phrase and live is None
+                    self._emit(next(self._sequence), config.WAKE_WORD)
+                
+                if event == "start":
+                    if speaking:
+                        self.voice.stop_speaking()
+                    if self.streaming and not waiting:
+                        live = next(self._sequence)
+                        self._live.put(("start", live, segmenter.audio))
+                elif event is None:
+                    if live is not None:
+                        self._live.put(("audio", live, chunk))
+                elif live is not None:
+                    self._live.put(("end", live, event != "drop"))
+                    live = None
+                elif event == "drop":
+                    continue
+                elif waiting or wake_phrase:
+                    # No wake hit, so no cloud round trip for it
+                    self.skipped += 1
+                    wake_phrase = False
+                elif self.streaming:
+                    sequence = next(self._sequence)
+                    self._live.put(("start", sequence, event))
+                    self._live.put(("end", sequence, True))
+                else:
+                    audio = sr.AudioData(event, self.source.sample_rate, self.source.sample_width)
+                    self._enqueue((next(self._sequence), audio))
+        finally:
+            if live is not None:
+                self._live.put(("end", live, True))
+            self._live.put(None)
+            for _ in range(self.workers):
+                self.phrases.put(None)
+    
+    def _enqueue(self, item):
+        while True:
+            try:
+                self.phrases.put_nowait(item)
+                return
+            except queue.Full:
+                # Falling behind: drop the oldest phrase rather than block capture
+                try:
+                    stale = self.phrases.get_nowait()
+                    if stale is not None:
+                        self.dropped += 1
+                        self._emit(stale[0], None)
+                except queue.Empty:
+                    pass
+    
+    def _recognize(self):
+        while True:
+            item = self.phrases.get()
+            if item is None:
+                break
+            sequence, audio = item
+            self._emit(sequence, self.voice.recognize(audio))
+        
+        with self._out_lock:
+            self._done_workers += 1
+            if self._done_workers == self.workers:
+                self.finished.set()
+    
+    def _recognize_stream(self):
+        stream, final = None, False
+        while True:
+            item = self._live.get()
+            if item is None:
+                break
+            kind, sequence, data = item
+            try:
+                if kind == "start":
+                    stream, final = self.engine.stream(self.source.sample_rate), False
+                    partial = stream.feed(data)
+                elif kind == "audio":
+                    partial = None if final else stream.feed(data)
+                else:
+                    if not final:
+                        with tracer.span("recognize", streaming=True):
+                            text = stream.finish() if data else None
+                        self._emit(sequence, text)
+                    stream = None
+                    continue
+            except Exception as e:
+                print(f"❌ Error in speech recognition: {e}")
+                if not final:
+                    self._emit(sequence, None)
+                final = True
+                continue
+            
+            if partial:
+                self.partial = partial
+                if self.on_partial and self.on_partial(partial):
+                    # Control phrases don't need to wait for the closing pause
+                    final = True
+                    self.early_finals += 1
+                    self._emit(sequence, stream.finish())
+        self.finished.set()
+    
+    def _emit(self, sequence, text):
+        """Release transcripts strictly in capture order"""
+        with self._out_lock:
+            self._pending[sequence] = text
+            while self._next_out in self._pending:
+                text = self._pending.pop(self._next_out)
+                self._next_out += 1
+                if text:
+                    self.transcripts.put(text)
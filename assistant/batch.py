@@ -0,0 +1,231 @@
+"""
+Batch Mode - Replay command files through AIBrain without a microphone
+Commands come from a JSONL file (or stdin), one per line: either plain text
+or an object with "command" (or "text") and an optional "session". Lines
+sharing a session are one conversation, run in order; every other line is a
+session of its own.
+Sessions run concurrently on a worker pool, each with its own AIBrain and so
+its own history. They share the LLM backend, one CodeHandler (and its caches
+and indexes) and the workspace memory, which serializes its own updates.
+
+Results go to stdout as JSONL, one line per command as it finishes;
+progress and the closing throughput/latency summary go to stderr.
+
+Usage:
+    python -m assistant.batch commands.jsonl --workers 8 --backend fake
+    echo "list my files" | python -m assistant.batch - --backend mock
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+import config
+from assistant.tracing import format_summary, quantile, tracer
+
+
+def parse_commands(lines):
+    """[(session, command)] in file order; unlabeled lines get a session of their own"""
+    commands = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        session = f"line-{number}"
+        if line.startswith("{"):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"⚠️  Line {number} is not valid JSON, skipped", file=sys.stderr)
+                continue
+            command = entry.get("command") or entry.get("text")
+            session = str(entry.get("session") or session)
+        else:
+            command = line
+        if command:
+            commands.append((session, command))
+    return commands
+
+
+def group_sessions(commands, repeat=1):
+    """{session: [commands]}, the whole set repeated under fresh session names for load tests"""
+    sessions = {}
+    for round_number in range(repeat):
+        suffix = f"#{round_number + 1}" if repeat > 1 else ""
+        for session, command in commands:
+            sessions.setdefault(session + suffix, []).append(command)
+    return sessions
+
+
+class BatchRunner:
+    def __init__(self, backend, code_handler, memory=None, workers=None, stream=False, emit=None):
+        self.backend = backend
+        self.code_handler = code_handler
+        self.memory = memory
+        self.workers = workers or config.BATCH_WORKERS
+        self.stream = stream
+        self.emit = emit or (lambda result: None)
+        self.results = []
+        self._lock = threading.Lock()
+
+    def run(self, sessions):
+        """Run every session, workers at a time; returns the per-command results"""
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="jarvis-session") as pool:
+            futures = [pool.submit(self._run_session, name, commands) for name, commands in sessions.items()]
+            for future in futures:
+                future.result()
+        self.elapsed = time.perf_counter() - start
+        if self.memory:
+            self.memory.flush()
+        return self.results
+
+    def _run_session(self, session, commands):
+        from assistant.ai_brain import AIBrain
+        brain = AIBrain(memory=self.memory, backend=self.backend)
+        try:
+            for turn, command in enumerate(commands, 1):
+                result = self._run_command(brain, session, command)
+                result.update(session=session, turn=turn)
+                with self._lock:
+                    self.results.append(result)
+                    self.emit(result)
+        finally:
+            brain.tool_pool.shutdown()
+
+    def _run_command(self, brain, session, command):
+        history = len(brain.conversation_history)
+        start = time.perf_counter()
+        first = None
+        response, error = None, None
+        try:
+            with tracer.turn(session=session):
+                if self.stream:
+                    parts = []
+                    for chunk in brain.process_command_stream(command, self.code_handler):
+                        if first is None:
+                            first = time.perf_counter() - start
+                        parts.append(chunk)
+                    response = "".join(parts)
+                else:
+                    response = brain.process_command(command, self.code_handler)
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+        elapsed = time.perf_counter() - start
+
+        tools = [call["function"]["name"]
+                 for message in brain.conversation_history[history:]
+                 for call in message.get("tool_calls") or []]
+        if error:
+            # A half-finished turn would confuse the rest of the conversation
+            del brain.conversation_history[history:]
+        result = {
+            "command": command,
+            "response": response,
+            "error": error,
+            "ms": round(elapsed * 1000, 1),
+            "tools": tools,
+        }
+        if self.stream:
+            result["first_ms"] = None if first is None else round(first * 1000, 1)
+        return result
+
+    def summary(self):
+        """Throughput and latency lines for the finished run"""
+        latencies = sorted(r["ms"] for r in self.results)
+        errors = sum(1 for r in self.results if r["error"])
+        sessions = len({r["session"] for r in self.results})
+        tools = sum(len(r["tools"]) for r in self.results)
+        lines = [
+            f"📊 {len(self.results)} commands in {sessions} sessions on {self.workers} workers: "
+            f"{self.elapsed:.2f}s, {len(self.results) / max(self.elapsed, 1e-9):.1f} commands/s, "
+            f"{sessions / max(self.elapsed, 1e-9):.1f} sessions/s",
+            f"⏱️  Latency p50 {quantile(latencies, 0.5):.0f}ms, p95 {quantile(latencies, 0.95):.0f}ms, "
+            f"p99 {quantile(latencies, 0.99):.0f}ms, max {latencies[-1] if latencies else 0:.0f}ms",
+        ]
+        if self.stream:
+            firsts = sorted(r["first_ms"] for r in self.results if r["first_ms"] is not None)
+            lines.append(f"🗣️  First text p50 {quantile(firsts, 0.5):.0f}ms, p95 {quantile(firsts, 0.95):.0f}ms")
+        lines.append(f"🔧 {tools} tool calls, {errors} errors")
+        return "\n".join(lines)
+
+
+def create_batch_backend(name, latency=0.2, token_latency=0.01, failure_rate=0.0, seed=None):
+    """The LLM backend, plus the in-process mock server behind it for "fake" (else None)"""
+    from assistant.llm_backend import GroqBackend, create_backend
+    if name != "fake":
+        return create_backend(name), None
+    from assistant.mock_llm_server import MockLLMServer
+    server = MockLLMServer(port=0, latency=latency, token_latency=token_latency,
+                           failure_rate=failure_rate, seed=seed).start()
+    return GroqBackend(api_key="fake", base_url=server.url), server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run commands through JARVIS without a microphone")
+    parser.add_argument("commands", help="JSONL or plain-text file of commands, - for stdin")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="sessions run at once")
+    parser.add_argument("--repeat", type=int, default=1, help="replay every session this many times")
+    parser.add_argument("--backend", default=config.LLM_BACKEND, choices=["groq", "mock", "fake"],
+                        help="fake starts a mock LLM server inside this process")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake backend: seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake backend: seconds per word")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fake backend: fraction of requests that fail")
+    parser.add_argument("--workspace", type=Path, help=f"work here instead of {config.WORKSPACE_DIR}")
+    parser.add_argument("--stream", action="store_true", help="use streamed completions and time the first text")
+    parser.add_argument("--trace", action="store_true", help="print per-stage latencies at the end")
+    args = parser.parse_args()
+
+    if args.workspace:
+        config.WORKSPACE_DIR = args.workspace.resolve()
+    if args.backend == "groq" and not config.GROQ_API_KEY:
+        parser.error("GROQ_API_KEY not found; use --backend fake or mock to run offline")
+
+    if args.commands == "-":
+        commands = parse_commands(sys.stdin)
+    else:
+        with open(args.commands, encoding="utf-8") as f:
+            commands = parse_commands(f)
+    sessions = group_sessions(commands, args.repeat)
+    if not sessions:
+        parser.error("no commands to run")
+
+    results_out = sys.stdout
+
+    def emit(result):
+        results_out.write(json.dumps(result) + "\n")
+        results_out.flush()
+
+    # Everything the assistant prints goes to stderr; stdout carries only results
+    with contextlib.redirect_stdout(sys.stderr):
+        from assistant.code_handler import CodeHandler
+        from assistant.memory import open_memory
+
+        if args.trace:
+            tracer.enable()
+        backend, server = create_batch_backend(args.backend, args.latency, args.token_latency, args.failure_rate)
+        memory = open_memory(config.WORKSPACE_DIR)
+        code_handler = CodeHandler(memory=memory)
+        count = sum(len(c) for c in sessions.values())
+        print(f"🚀 Running {count} commands in {len(sessions)} sessions ({args.workers} at a time, {args.backend} backend)")
+
+        runner = BatchRunner(backend, code_handler, memory, args.workers, args.stream, emit)
+        try:
+            runner.run(sessions)
+        finally:
+            if server is not None:
+                server.stop()
+
+        print(runner.summary())
+        if server is not None:
+            print(f"🧪 Mock LLM: {server.requests} requests, {server.failures} injected failures")
+        if args.trace:
+            print(format_summary(tracer.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Workspace Cache - Size-bounded LRU/TTL cache for tool results and answers
+Entries are tagged with the workspace paths they depend on, so a write to a
+path drops everything derived from it
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+import config
+
+
+def normalize_path(path):
+    """Canonical form of a workspace-relative path, used for tags"""
+    return os.path.normpath(path or ".")
+
+
+def _size(value):
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (tuple, list)):
+        return sum(_size(v) for v in value)
+    return len(repr(value))
+
+
+class LRUCache:
+    def __init__(self, max_bytes=None, ttl=None):
+        self.max_bytes = max_bytes or config.CACHE_MAX_BYTES
+        self.ttl = ttl or config.CACHE_TTL
+        self._entries = OrderedDict()  # key -> (value, size, expires, tags)
+        self._by_tag = {}  # path -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value, tags=()):
+        size = _size(value) + _size(key)
+        if size > self.max_bytes:
+            return
+        tags = {normalize_path(t) for t in tags}
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl, tags)
+            self._bytes += size
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate(self, path):
+        """Drop every entry that depends on path"""
+        with self._lock:
+            for key in list(self._by_tag.get(normalize_path(path), ())):
+                self._remove(key)
+                self.invalidations += 1
+    
+    def _remove(self, key):
+        _, size, _, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
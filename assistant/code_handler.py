@@ -3,20 +3,76 @@ Code Handler - Manages file operations and code editor integration
 Restricted to Jarvis_Work folder for safety
 """
 
+import mmap
 import os
+import tempfile
+import threading
 from pathlib import Path
 import config
+from assistant.cache import LRUCache
+from assistant.edits import EditConflict, apply_diff, apply_replacements
+from assistant.workspace_index import WorkspaceIndex, format_size
+
+BLOCK = 1024 * 1024  # bytes scanned at a time when looking for line boundaries
+MAX_LINE = 200  # characters of each line shown in search results
+# New files get the usual permissions (mkstemp creates them 0600); read once, umask() isn't thread-safe
+UMASK = os.umask(0)
+os.umask(UMASK)
 
 class CodeHandler:
     def __init__(self, memory=None):
         self.workspace = config.WORKSPACE_DIR
         self.memory = memory
+        # Tool results (and AIBrain answers) keyed on the on-disk state they came from
+        self.cache = LRUCache()
+        # Every file and its size, indexed on first use for recursive listings and searches
+        self.index = WorkspaceIndex(self.workspace)
+        # Trigram index over file contents, opened on the first search
+        self._search = None
+        self._search_lock = threading.Lock()
+        # BM25 index of file chunks, built in the background on the first turn that asks for context
+        self._retrieval = None
+        # Writes to one path happen one at a time, whichever session or thread makes them
+        self._path_locks = {}
+        self._path_locks_lock = threading.Lock()
         # Create workspace if it doesn't exist
         self.workspace.mkdir(parents=True, exist_ok=True)
         print(f"📁 Workspace: {self.workspace}")
     
-    def read_file(self, file_path):
-        """Read contents of a file (restricted to workspace)"""
+    @property
+    def search(self):
+        """The content search index; created (and NumPy imported) on first use"""
+        with self._search_lock:
+            if self._search is None:
+                from assistant.code_search import CodeSearch
+                self._search = CodeSearch(self.index)
+            return self._search
+    
+    @property
+    def retrieval(self):
+        """The context retrieval index; created (and NumPy imported) on first use"""
+        with self._search_lock:
+            if self._retrieval is None:
+                from assistant.retrieval import RetrievalIndex
+                self._retrieval = RetrievalIndex(self.index, memory=self.memory)
+            return self._retrieval
+    
+    def relevant_context(self, query):
+        """Excerpts of the workspace files most relevant to query, within RETRIEVAL_MAX_BYTES; "" if none"""
+        try:
+            return self.retrieval.snippets(query)
+        except Exception as e:
+            print(f"⚠️  Context retrieval failed: {e}")
+            return ""
+    
+    def read_file(self, file_path, start_line=None, end_line=None, head=None, tail=None,
+                  offset=None, length=None, max_bytes=None):
+        """
+        Read a file (restricted to workspace).
+        Optionally just a line range (1-based, inclusive), the first or last
+        lines, or a byte range. Output is capped at max_bytes and says what
+        was left out; large files are memory-mapped, never read whole.
+        """
         try:
             full_path = self.workspace / file_path
             
@@ -24,22 +80,59 @@ class CodeHandler:
             if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
                 return "Error: Access denied - path outside workspace"
             
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            try:
+                start_line, end_line, head, tail, offset, length = (
+                    None if value is None else int(value)
+                    for value in (start_line, end_line, head, tail, offset, length)
+                )
+                max_bytes = min(int(max_bytes or config.READ_MAX_BYTES), config.READ_MAX_BYTES)
+            except (TypeError, ValueError):
+                return "Error: line and byte ranges must be whole numbers"
+            
+            # Unchanged (mtime, size) means the cached copy is still current
+            stat = full_path.stat()
+            window = (start_line, end_line, head, tail, offset, length, max_bytes)
+            key = ("read_file", file_path, stat.st_mtime_ns, stat.st_size, window)
+            result = self.cache.get(key)
+            if result is None:
+                content, note = _read_range(full_path, stat.st_size, *window)
+                header = f"Successfully read {file_path} ({note})" if note else f"Successfully read {file_path}"
+                result = f"{header}:\n\n{content}"
+                self.cache.put(key, result, tags=[file_path])
             
             # Record activity
             if self.memory:
                 self.memory.record_file_activity(file_path, "read")
                 self.memory.detect_project(file_path)
             
-            return f"Successfully read {file_path}:\n\n{content}"
+            return result
         except FileNotFoundError:
             return f"Error: File '{file_path}' not found"
         except Exception as e:
             return f"Error reading file: {str(e)}"
     
+    def line_count(self, file_path):
+        """Lines in a workspace file, or None if it can't be read"""
+        full_path = self.workspace / file_path
+        if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
+            return None
+        try:
+            stat = full_path.stat()
+            key = ("line_count", file_path, stat.st_mtime_ns, stat.st_size)
+            count = self.cache.get(key)
+            if count is None:
+                count = _count_lines(full_path)
+                self.cache.put(key, count, tags=[file_path])
+            return count
+        except OSError:
+            return None
+    
     def write_file(self, file_path, content):
         """Write content to a file (restricted to workspace)"""
+        with self._path_lock(file_path):
+            return self._write_file(file_path, content)
+    
+    def _write_file(self, file_path, content):
         try:
             full_path = self.workspace / file_path
             
@@ -53,18 +146,85 @@ class CodeHandler:
             # Check if file exists (create vs modify)
             action = "modified" if full_path.exists() else "created"
             
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            # Record activity
-            if self.memory:
-                self.memory.record_file_activity(file_path, action)
-                self.memory.detect_project(file_path)
+            _atomic_write(full_path, content)
+            self._written(file_path, action)
             
             return f"Successfully wrote to {file_path}"
         except Exception as e:
             return f"Error writing file: {str(e)}"
     
+    def edit_file(self, file_path, edits=None, diff=None):
+        """
+        Change part of a file (restricted to workspace) with search/replace
+        edits or unified-diff hunks. Nothing is written unless every edit
+        applies, and the file must not change on disk while it is edited.
+        """
+        with self._path_lock(file_path):
+            return self._edit_file(file_path, edits, diff)
+    
+    def _edit_file(self, file_path, edits, diff):
+        try:
+            full_path = self.workspace / file_path
+            
+            # Security: ensure path is within workspace
+            if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
+                return "Error: Access denied - path outside workspace"
+            if not edits and not diff:
+                return "Error: edit_file needs edits or a diff"
+            
+            before = full_path.stat()
+            with open(full_path, 'r', encoding='utf-8', newline='') as f:
+                original = f.read()
+            # Edits are written with \n; keep the file's own line endings
+            crlf = "\r\n" in original
+            text = original.replace("\r\n", "\n") if crlf else original
+            
+            if edits:
+                text = apply_replacements(text, edits)
+            if diff:
+                text = apply_diff(text, diff)
+            if text == original.replace("\r\n", "\n"):
+                return f"No changes to {file_path}: the edits leave it as it was"
+            
+            after = full_path.stat()
+            if (after.st_mtime_ns, after.st_size) != (before.st_mtime_ns, before.st_size):
+                return f"Error: edit conflict in {file_path}: the file changed while it was being edited; read it again"
+            
+            _atomic_write(full_path, text.replace("\n", "\r\n") if crlf else text, newline='')
+            self._written(file_path, "modified")
+            
+            old_lines, new_lines = len(original.splitlines()), len(text.splitlines())
+            return f"Successfully edited {file_path} ({new_lines - old_lines:+d} lines, now {new_lines})"
+        except EditConflict as e:
+            return f"Error: edit conflict in {file_path}: {e}"
+        except FileNotFoundError:
+            return f"Error: File '{file_path}' not found (use write_file to create it)"
+        except Exception as e:
+            return f"Error editing file: {str(e)}"
+    
+    def _path_lock(self, file_path):
+        key = os.path.normpath(file_path)
+        with self._path_locks_lock:
+            lock = self._path_locks.get(key)
+            if lock is None:
+                lock = self._path_locks[key] = threading.Lock()
+            return lock
+    
+    def _written(self, file_path, action):
+        # Drop cached reads, listings and answers that depended on this path
+        self.cache.invalidate(file_path)
+        self.cache.invalidate(os.path.dirname(file_path))
+        self.index.update(file_path)
+        if self._search is not None:
+            self._search.update(file_path)
+        if self._retrieval is not None:
+            self._retrieval.update(file_path)
+        
+        # Record activity
+        if self.memory:
+            self.memory.record_file_activity(file_path, action)
+            self.memory.detect_project(file_path)
+    
     def list_files(self, directory="."):
         """List files in a directory (restricted to workspace)"""
         try:
@@ -74,19 +234,227 @@ class CodeHandler:
             if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
                 return "Error: Access denied - path outside workspace"
             
-            files = []
+            subdirs, files = self.index.children(directory)
+            entries = [f"📁 {name}/" for name in subdirs]
+            entries += [f"📄 {name} ({format_size(size)})" for name, size in files]
             
-            for item in full_path.iterdir():
-                if item.is_file():
-                    files.append(f"📄 {item.name}")
-                elif item.is_dir():
-                    files.append(f"📁 {item.name}/")
-            
-            if not files:
+            if not entries:
                 return f"Directory '{directory}' is empty"
-            
-            return f"Contents of {directory}:\n" + "\n".join(sorted(files))
+            return f"Contents of {directory}:\n" + "\n".join(sorted(entries))
         except FileNotFoundError:
             return f"Error: Directory '{directory}' not found"
         except Exception as e:
             return f"Error listing files: {str(e)}"
+    
+    def list_tree(self, directory=".", max_depth=None):
+        """Every file under a directory, recursively, with sizes (restricted to workspace)"""
+        try:
+            full_path = self.workspace / directory
+            
+            # Security: ensure path is within workspace
+            if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
+                return "Error: Access denied - path outside workspace"
+            if not full_path.is_dir():
+                return f"Error: Directory '{directory}' not found"
+            
+            try:
+                max_depth = None if max_depth is None else int(max_depth)
+            except (TypeError, ValueError):
+                return "Error: max_depth must be a whole number"
+            
+            entries, more = self.index.walk(directory, max_depth)
+            count, size = self.index.totals(directory)
+            if not entries:
+                return f"No files under {directory}"
+            return _format_entries(f"Files under {directory} ({count} files, {format_size(size)} in total)", entries, more)
+        except Exception as e:
+            return f"Error listing files: {str(e)}"
+    
+    def find_files(self, pattern, directory="."):
+        """Files matching a glob pattern, with sizes (restricted to workspace)"""
+        try:
+            full_path = self.workspace / directory
+            
+            # Security: ensure path is within workspace
+            if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
+                return "Error: Access denied - path outside workspace"
+            if not full_path.is_dir():
+                return f"Error: Directory '{directory}' not found"
+            
+            entries, more = self.index.glob(pattern, directory)
+            if not entries:
+                return f"No files matching '{pattern}' under {directory}"
+            return _format_entries(f"Files matching '{pattern}' under {directory}", entries, more)
+        except Exception as e:
+            return f"Error searching files: {str(e)}"
+    
+    def search_code(self, query, directory=".", regex=False, case_sensitive=False):
+        """Search file contents (restricted to workspace); matches come back as path:line with context"""
+        try:
+            full_path = self.workspace / directory
+            
+            # Security: ensure path is within workspace
+            if not str(full_path.resolve()).startswith(str(self.workspace.resolve())):
+                return "Error: Access denied - path outside workspace"
+            if not full_path.is_dir():
+                return f"Error: Directory '{directory}' not found"
+            if not query:
+                return "Error: search query is empty"
+            
+            matches, more = self.search.search(query, directory, bool(regex), bool(case_sensitive))
+            if not matches:
+                return f"No matches for '{query}' under {directory}"
+            
+            blocks = []
+            for path, line, context in matches:
+                blocks.append("\n".join(
+                    f"{path}:{n}{':' if n == line else '-'} {text[:MAX_LINE]}" for n, text in context
+                ))
+            shown = f"first {len(matches)} " if more else ""
+            return f"Matches for '{query}' ({shown}path:line):\n" + "\n--\n".join(blocks)
+        except ValueError as e:
+            return f"Error: {e}"
+        except Exception as e:
+            return f"Error searching code: {str(e)}"
+    
+    def fingerprint(self, paths):
+        """(path, mtime, size) for each workspace path; None for paths that no longer exist"""
+        prints = []
+        for path in paths:
+            try:
+                stat = (self.workspace / path).stat()
+            except OSError:
+                return None
+            prints.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(prints)
+
+
+def _atomic_write(full_path, content, newline=None):
+    """Write to a temp file beside the target, then rename over it: readers never see half a file"""
+    fd, temp = tempfile.mkstemp(prefix=f".{full_path.name}.", suffix=".tmp", dir=full_path.parent)
+    try:
+        with open(fd, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp, full_path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(temp, 0o666 & ~UMASK)
+        os.replace(temp, full_path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def _format_entries(header, entries, more):
+    lines = [f"📄 {path} ({format_size(size)})" for path, size in entries]
+    if more:
+        lines.append("... more not shown; narrow the directory or pattern")
+    return f"{header}:\n" + "\n".join(lines)
+
+
+def _read_range(full_path, size, start_line, end_line, head, tail, offset, length, max_bytes):
+    """Returns (text, note on what was shown and elided, or None for the whole file)"""
+    if size == 0:
+        return "", None
+    with open(full_path, "rb") as f:
+        mapped = size > config.READ_MMAP_THRESHOLD
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped else f.read()
+        try:
+            start, end, shown = _select(data, start_line, end_line, head, tail, offset, length, max_bytes)
+            chunk = data[start:min(end, start + max_bytes)]
+            # Counting every line of a huge file is not worth it
+            total_lines = None if mapped else data.count(b"\n") + (not data.endswith(b"\n"))
+        finally:
+            if mapped:
+                data.close()
+    
+    capped = end - start > max_bytes
+    if capped:
+        # Stop at a line boundary rather than mid-line
+        newline = chunk.rfind(b"\n")
+        if newline > 0:
+            chunk = chunk[:newline + 1]
+    
+    if start == 0 and len(chunk) == size:
+        return chunk.decode("utf-8", errors="replace"), None
+    
+    notes = [shown] if shown else []
+    if total_lines is not None:
+        notes.append(f"{total_lines} lines in total")
+    notes.append(f"bytes {start}-{start + len(chunk)} of {size}, {size - len(chunk)} bytes not shown")
+    if capped:
+        notes.append(f"output capped at {max_bytes} bytes, ask for a narrower range to see more")
+    return chunk.decode("utf-8", errors="replace"), "; ".join(notes)
+
+
+def _select(data, start_line, end_line, head, tail, offset, length, max_bytes):
+    """(start byte, end byte, description) of the requested part of data"""
+    size = len(data)
+    if offset is not None or length is not None:
+        start = offset or 0
+        start = max(0, size + start) if start < 0 else min(start, size)
+        return start, min(size, start + (length if length is not None else max_bytes)), None
+    if start_line is not None or end_line is not None:
+        first = max(1, start_line or 1)
+        start = _line_offset(data, first)
+        end = _line_offset(data, end_line + 1) if end_line is not None else size
+        return start, max(start, end), f"lines {first}-{end_line if end_line is not None else 'end'}"
+    if head is not None:
+        return 0, _line_offset(data, head + 1), f"first {head} lines"
+    if tail is not None:
+        return _tail_offset(data, tail), size, f"last {tail} lines"
+    return 0, size, None
+
+
+def _line_offset(data, line):
+    """Byte offset where a 1-based line starts; the size of data past the last line"""
+    remaining = line - 1
+    pos = 0
+    while remaining > 0 and pos < len(data):
+        block = data[pos:pos + BLOCK]
+        count = block.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            pos += len(block)
+            continue
+        newline = -1
+        for _ in range(remaining):
+            newline = block.find(b"\n", newline + 1)
+        return pos + newline + 1
+    return min(pos, len(data))
+
+
+def _count_lines(full_path):
+    """Lines in a file, read a block at a time; a trailing newline doesn't start another line"""
+    count, last = 0, b"\n"
+    with open(full_path, "rb") as f:
+        while block := f.read(BLOCK):
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
+
+
+def _tail_offset(data, lines):
+    """Byte offset where the last `lines` lines start"""
+    if lines <= 0:
+        return len(data)
+    # A trailing newline ends the last line, it doesn't start another
+    pos = len(data) - 1 if data[-1:] == b"\n" else len(data)
+    seen = 0
+    while pos > 0:
+        start = max(0, pos - BLOCK)
+        block = data[start:pos]
+        count = block.count(b"\n")
+        if seen + count >= lines:
+            newline = len(block)
+            for _ in range(lines - seen):
+                newline = block.rfind(b"\n", 0, newline)
+            return start + newline + 1
+        seen += count
+        pos = start
+    return 0
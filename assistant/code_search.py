@@ -0,0 +1,299 @@
+"""
+Code Search - Full-text search over the workspace backed by a trigram index
+Each text file's set of byte trigrams (lowercased) is kept in
+.jarvis_search.db, so after a restart only files whose size or mtime changed
+are read again. In memory the postings are NumPy arrays: sorted trigram keys,
+and for each key the ids of the files containing it. A search intersects the
+postings of its trigrams and opens only the files left.
+
+Files changed since the postings were built sit in a small overlay (new ids
+for their new contents, old ids marked dead) until enough pile up to merge.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+import config
+from assistant.workspace_index import WorkspaceIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    text INTEGER NOT NULL,
+    trigrams BLOB NOT NULL
+);
+"""
+SNIFF_BYTES = 8192  # a NUL byte in the first block marks a file as binary
+NO_TRIGRAMS = np.zeros(0, dtype=np.uint32)
+
+
+def trigrams(data):
+    """Sorted unique trigrams of lowercased bytes; none that span a line break"""
+    if len(data) < 3:
+        return NO_TRIGRAMS
+    b = np.frombuffer(data.lower(), dtype=np.uint8).astype(np.uint32)
+    codes = (b[:-2] << 16) | (b[1:-1] << 8) | b[2:]
+    newline = b == 10
+    return np.unique(codes[~(newline[:-2] | newline[1:-1] | newline[2:])])
+
+
+def required_literals(pattern):
+    """
+    Literal runs that every match of a regex must contain. Conservative:
+    alternation gives up entirely, and anything inside a group, a character
+    class or under a quantifier is skipped.
+    """
+    if "|" in pattern:
+        return []
+    runs, run, depth, i = [], "", 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if depth == 0 and not escaped.isalnum():
+                run += escaped
+            else:
+                runs.append(run)
+                run = ""
+            continue
+        if c == "[":
+            end = pattern.find("]", i + 2)
+            runs.append(run)
+            run = ""
+            i = end + 1 if end > 0 else len(pattern)
+            continue
+        if c in "*?{":
+            runs.append(run[:-1])  # the quantified character may be absent
+            run = ""
+            if c == "{":
+                i = pattern.find("}", i) + 1 or len(pattern)
+                continue
+        elif c in "+.^$()":
+            runs.append(run)
+            run = ""
+            depth += (c == "(") - (c == ")")
+        elif depth == 0:
+            run += c
+        i += 1
+    runs.append(run)
+    return [r for r in runs if len(r) >= 3]
+
+
+def query_trigrams(literals, case_sensitive):
+    if not literals:
+        return NO_TRIGRAMS
+    codes = np.unique(np.concatenate([trigrams(s.encode("utf-8")) for s in literals]))
+    if not case_sensitive:
+        # Non-ASCII case folding isn't in the index; keep only trigrams it can vouch for
+        codes = codes[(codes & 0x808080) == 0]
+    return codes
+
+
+class CodeSearch:
+    def __init__(self, workspace_index, db_file=None):
+        self.workspace = workspace_index
+        self.root = workspace_index.root
+        self.db_file = Path(db_file or self.root / config.SEARCH_INDEX_FILE)
+        self.files = {}  # path -> (size, mtime_ns, file id, or None when not searchable)
+        self.conn = None
+        self._lock = threading.RLock()
+        self._version = None  # workspace index version last synced with
+        self._paths = []  # file id -> path; None once the id is stale
+        self._keys = NO_TRIGRAMS  # sorted trigrams
+        self._starts = np.zeros(1, dtype=np.int64)  # postings of _keys[k] are _postings[_starts[k]:_starts[k + 1]]
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._dead = set()  # ids in _postings whose file has changed or gone
+        self._fresh = {}  # file id -> trigrams, for files (re)indexed since the last merge
+    
+    # ----- keeping the index current -----
+    
+    def _open(self):
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(str(self.db_file), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        
+        codes, ids = [], []
+        for path, size, mtime, text, blob in self.conn.execute("SELECT * FROM files"):
+            file_id = None
+            if text:
+                file_id = len(self._paths)
+                self._paths.append(path)
+                codes.append(np.frombuffer(blob, dtype=np.uint32))
+                ids.append(np.full(len(codes[-1]), file_id, dtype=np.int32))
+            self.files[path] = (size, mtime, file_id)
+        if codes:
+            self._build(np.concatenate(codes), np.concatenate(ids))
+    
+    def _build(self, codes, ids):
+        order = np.argsort(codes, kind="stable")
+        codes, self._postings = codes[order], ids[order]
+        self._keys, starts = np.unique(codes, return_index=True)
+        self._starts = np.append(starts, len(codes))
+    
+    def _merge(self):
+        """Fold the overlay into the postings arrays"""
+        codes = np.repeat(self._keys, np.diff(self._starts))
+        ids = self._postings
+        if self._dead:
+            live = ~np.isin(ids, np.fromiter(self._dead, dtype=np.int32))
+            codes, ids = codes[live], ids[live]
+        fresh = list(self._fresh.items())
+        codes = np.concatenate([codes] + [c for _, c in fresh])
+        ids = np.concatenate([ids] + [np.full(len(c), i, dtype=np.int32) for i, c in fresh])
+        self._build(codes, ids)
+        self._dead.clear()
+        self._fresh.clear()
+    
+    @staticmethod
+    def _searchable(path):
+        return not path.rsplit("/", 1)[-1].startswith(".jarvis_")
+    
+    def _forget(self, path):
+        entry = self.files.pop(path, None)
+        if entry is None or entry[2] is None:
+            return
+        file_id = entry[2]
+        self._paths[file_id] = None
+        if self._fresh.pop(file_id, None) is None:
+            self._dead.add(file_id)
+    
+    def _index(self, path, size, mtime):
+        try:
+            with open(self.root / path, "rb") as f:
+                data = f.read(config.SEARCH_MAX_FILE_BYTES + 1)
+        except OSError:
+            self._forget(path)
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            return
+        text = len(data) <= config.SEARCH_MAX_FILE_BYTES and b"\0" not in data[:SNIFF_BYTES]
+        codes = trigrams(data) if text else NO_TRIGRAMS
+        
+        self._forget(path)
+        file_id = None
+        if text:
+            file_id = len(self._paths)
+            self._paths.append(path)
+            self._fresh[file_id] = codes
+        self.files[path] = (size, mtime, file_id)
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                          (path, size, mtime, int(text), codes.tobytes()))
+    
+    def sync(self):
+        """Re-index whatever changed in the workspace since the last sync; returns how many files"""
+        with self._lock:
+            self._open()
+            self.workspace.ensure_built()
+            version = self.workspace.version
+            if version == self._version:
+                return 0
+            
+            changed = None if self._version is None else self.workspace.changes_since(self._version)
+            if changed is None:
+                version, current = self.workspace.snapshot()
+                changed = [p for p, stat in current.items() if self.files.get(p, (None, None))[:2] != stat]
+                changed += [p for p in self.files if p not in current]
+            
+            with self.conn:
+                for path in changed:
+                    stat = self.workspace.files.get(path)
+                    if stat is None or not self._searchable(path):
+                        if path in self.files:
+                            self._forget(path)
+                            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                    elif self.files.get(path, (None, None))[:2] != stat:
+                        self._index(path, *stat)
+            self._version = version
+            
+            if len(self._fresh) + len(self._dead) > config.SEARCH_MERGE_AFTER:
+                self._merge()
+            if len(changed) >= 1000:
+                print(f"🔎 Indexed {len(changed)} files for search")
+            return len(changed)
+    
+    def update(self, path):
+        """Re-index a file JARVIS just wrote (after the workspace index has seen it), without waiting for a sync"""
+        with self._lock:
+            if self.conn is None:
+                return
+            path = os.path.normpath(path).replace(os.sep, "/")
+            stat = self.workspace.files.get(path)
+            if stat is None or not self._searchable(path):
+                return
+            with self.conn:
+                self._index(path, *stat)
+    
+    # ----- searching -----
+    
+    def _candidates(self, codes):
+        """Ids of files containing every trigram in codes (all files when codes is empty)"""
+        if not len(codes):
+            return [i for i, path in enumerate(self._paths) if path is not None]
+        
+        ids = []
+        if len(self._keys):
+            at = np.searchsorted(self._keys, codes)
+            if (at < len(self._keys)).all() and (self._keys[at] == codes).all():
+                postings = sorted((self._postings[self._starts[k]:self._starts[k + 1]] for k in at), key=len)
+                found = postings[0]
+                for other in postings[1:]:
+                    if not len(found):
+                        break
+                    found = np.intersect1d(found, other, assume_unique=True)
+                ids = [i for i in found.tolist() if i not in self._dead]
+        
+        for file_id, fresh in self._fresh.items():
+            at = np.searchsorted(fresh, codes)
+            if (at < len(fresh)).all() and (fresh[np.minimum(at, len(fresh) - 1)] == codes).all():
+                ids.append(file_id)
+        return ids
+    
+    def search(self, query, directory=".", regex=False, case_sensitive=False, limit=None):
+        """
+        Lines matching query: ([(path, line number, [(line number, text), ...context])], more_left).
+        Line numbers are 1-based.
+        """
+        limit = limit or config.SEARCH_MAX_RESULTS
+        try:
+            # MULTILINE so ^ and $ mean the same on the whole text as on one line
+            flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+            pattern = re.compile(query if regex else re.escape(query), flags)
+        except re.error as e:
+            raise ValueError(f"invalid regular expression: {e}")
+        codes = query_trigrams(required_literals(query) if regex else [query], case_sensitive)
+        
+        with self._lock:
+            self.sync()
+            paths = sorted(self._paths[i] for i in self._candidates(codes))
+        
+        prefix = WorkspaceIndex._prefix(directory)
+        context = config.SEARCH_CONTEXT_LINES
+        matches = []
+        for path in paths:
+            if not path.startswith(prefix):
+                continue
+            try:
+                with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            # Trigrams only narrow things down; one pass over the whole text rules out the rest
+            if not pattern.search(text):
+                continue
+            lines = text.splitlines()
+            for n, line in enumerate(lines):
+                if not pattern.search(line):
+                    continue
+                if len(matches) == limit:
+                    return matches, True
+                window = range(max(0, n - context), min(len(lines), n + context + 1))
+                matches.append((path, n + 1, [(k + 1, lines[k]) for k in window]))
+        return matches, False
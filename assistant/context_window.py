@@ -0,0 +1,152 @@
+"""
+Context Window - Keeps the conversation sent to the LLM within a token budget
+Old tool outputs are truncated first, then the oldest turns are folded into
+a short running summary
+"""
+
+import json
+from collections import deque
+import config
+
+# Rough size of the per-message framing the API adds around content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message):
+    """Cheap token estimate (~4 characters per token for English and code)"""
+    chars = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"]))
+    return chars // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+class ContextWindow:
+    def __init__(self, budget=None, keep_turns=None, tool_output_chars=None, summary_chars=None):
+        self.budget = budget or config.CONTEXT_TOKEN_BUDGET
+        self.keep_turns = keep_turns or config.CONTEXT_KEEP_TURNS
+        self.tool_output_chars = tool_output_chars or config.CONTEXT_TOOL_OUTPUT_CHARS
+        self.summary_chars = summary_chars or config.CONTEXT_SUMMARY_CHARS
+        self.summary_lines = []
+        self.metrics = deque(maxlen=100)
+    
+    def fit(self, system_prompt, history, extra=None):
+        """
+        Trim history in place so the request fits the budget.
+        Returns the messages to send: system prompt, running summary, history.
+        extra (retrieved context) goes just before the latest user message,
+        counts against the budget, and is never added to history.
+        """
+        truncated = 0
+        folded = 0
+        
+        total = self._total(system_prompt, history, extra)
+        if total > self.budget:
+            truncated = self._truncate_tool_outputs(history)
+            total = self._total(system_prompt, history, extra)
+        
+        while total > self.budget and self._fold_oldest_turn(history):
+            folded += 1
+            total = self._total(system_prompt, history, extra)
+        
+        # Last resort: only the current turn keeps its tool outputs intact
+        if total > self.budget:
+            truncated += self._truncate_tool_outputs(history, keep_turns=1)
+            total = self._total(system_prompt, history, extra)
+        
+        messages = [{"role": "system", "content": system_prompt}]
+        summary = self._summary_message()
+        if summary:
+            messages.append(summary)
+        if extra:
+            starts = self._turn_starts(history)
+            at = starts[-1] if starts else len(history)
+            messages += history[:at] + [extra] + history[at:]
+        else:
+            messages += history
+        
+        self.metrics.append({
+            "prompt_tokens": total,
+            "budget": self.budget,
+            "messages": len(messages),
+            "summary_tokens": estimate_tokens(summary) if summary else 0,
+            "retrieved_tokens": estimate_tokens(extra) if extra else 0,
+            "truncated_tool_outputs": truncated,
+            "folded_turns": folded
+        })
+        return messages
+    
+    def _total(self, system_prompt, history, extra=None):
+        total = estimate_tokens({"content": system_prompt})
+        if extra:
+            total += estimate_tokens(extra)
+        summary = self._summary_message()
+        if summary:
+            total += estimate_tokens(summary)
+        return total + sum(estimate_tokens(m) for m in history)
+    
+    def _summary_message(self):
+        if not self.summary_lines:
+            return None
+        return {
+            "role": "system",
+            "content": "Summary of earlier conversation:\n" + "\n".join(self.summary_lines)
+        }
+    
+    def _turn_starts(self, history):
+        return [i for i, m in enumerate(history) if m["role"] == "user"]
+    
+    def _truncate_tool_outputs(self, history, keep_turns=None):
+        """Cut tool results outside the most recent turns down to a short head"""
+        keep_turns = keep_turns or self.keep_turns
+        starts = self._turn_starts(history)
+        if len(starts) <= keep_turns:
+            return 0
+        cutoff = starts[-keep_turns]
+        
+        truncated = 0
+        for message in history[:cutoff]:
+            content = message.get("content") or ""
+            if message["role"] != "tool" or len(content) <= self.tool_output_chars:
+                continue
+            elided = len(content) - self.tool_output_chars
+            message["content"] = content[:self.tool_output_chars] + f"\n[... {elided} characters elided from an earlier tool result ...]"
+            truncated += 1
+        return truncated
+    
+    def _fold_oldest_turn(self, history):
+        """Replace the oldest turn with one summary line. Returns False if nothing can be folded."""
+        starts = self._turn_starts(history)
+        if len(starts) <= self.keep_turns:
+            return False
+        
+        end = starts[1]
+        turn = history[:end]
+        del history[:end]
+        
+        user = turn[0]["content"] or ""
+        # The first message may carry memory context ahead of "User: ..."
+        user = user.rsplit("User: ", 1)[-1]
+        tools = []
+        for message in turn:
+            for call in message.get("tool_calls") or []:
+                args = json.loads(call["function"]["arguments"] or "{}")
+                target = args.get("file_path") or args.get("directory") or ""
+                tools.append(f"{call['function']['name']}({target})")
+        answer = next((m["content"] for m in reversed(turn) if m["role"] == "assistant" and m.get("content")), "")
+        
+        line = f"- User: {_clip(user, 120)}"
+        if tools:
+            line += f" | Tools: {_clip(', '.join(tools), 120)}"
+        if answer:
+            line += f" | JARVIS: {_clip(answer, 160)}"
+        self.summary_lines.append(line)
+        
+        # Keep the summary itself bounded; the oldest lines go first
+        while len(self.summary_lines) > 1 and sum(len(l) + 1 for l in self.summary_lines) > self.summary_chars:
+            self.summary_lines.pop(0)
+        return True
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
@@ -0,0 +1,98 @@
+"""
+Edits - Apply search/replace blocks or unified-diff hunks to file contents
+Both are all-or-nothing: every edit must apply cleanly to the current text,
+or EditConflict says which one didn't and nothing is written.
+"""
+
+import re
+
+HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class EditConflict(ValueError):
+    pass
+
+
+def apply_replacements(text, edits):
+    """edits: [{"search": exact text, "replace": new text}, ...], applied in order"""
+    for number, edit in enumerate(edits, 1):
+        search, replace = edit.get("search"), edit.get("replace", "")
+        if not search:
+            raise EditConflict(f"edit {number} has no search text")
+        count = text.count(search)
+        if count == 0:
+            raise EditConflict(f"edit {number}: search text not found{_nearest_hint(text, search)}")
+        if count > 1:
+            raise EditConflict(f"edit {number}: search text found {count} times; include more surrounding lines")
+        text = text.replace(search, replace, 1)
+    return text
+
+
+def parse_hunks(diff):
+    """Unified diff -> [(old start line or None, old lines, new lines)]; file headers are ignored"""
+    hunks = []
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            hunks.append((int(match.group(1)) if match else None, [], []))
+        elif not hunks or line.startswith("\\"):
+            continue  # "--- a/x", "+++ b/x", "\ No newline at end of file"
+        elif line.startswith("-"):
+            hunks[-1][1].append(line[1:])
+        elif line.startswith("+"):
+            hunks[-1][2].append(line[1:])
+        else:
+            # Context; blank context lines often lose their leading space
+            context = line[1:] if line.startswith(" ") else line
+            hunks[-1][1].append(context)
+            hunks[-1][2].append(context)
+    if not hunks:
+        raise EditConflict("diff has no @@ hunks")
+    return hunks
+
+
+def apply_diff(text, diff):
+    """Apply hunks in order; each may have moved from its stated line, like patch's offset search"""
+    lines = text.split("\n")
+    shift = 0  # lines added minus removed by earlier hunks
+    floor = 0  # a hunk can't apply above the one before it
+    for number, (start, old, new) in enumerate(parse_hunks(diff), 1):
+        expected = None if start is None else max(floor, start - 1 + shift if old else start + shift)
+        at = _locate(lines, old, expected, floor)
+        if at is None:
+            raise EditConflict(f"hunk {number}: context not found{_nearest_hint(text, chr(10).join(old))}")
+        if at == -1:
+            raise EditConflict(f"hunk {number}: context matches in several places; add a line number header or more context")
+        lines[at:at + len(old)] = new
+        shift += len(new) - len(old)
+        floor = at + len(new)
+    return "\n".join(lines)
+
+
+def _locate(lines, old, expected, floor):
+    """Index where old starts (the match nearest expected), None when absent, -1 when ambiguous"""
+    if not old:
+        return expected
+    for same in (lambda a, b: a == b, lambda a, b: a.rstrip() == b.rstrip()):
+        found = [
+            i for i in range(floor, len(lines) - len(old) + 1)
+            if same(lines[i], old[0]) and all(same(lines[i + k], old[k]) for k in range(1, len(old)))
+        ]
+        if len(found) == 1:
+            return found[0]
+        if found:
+            if expected is None:
+                return -1
+            return min(found, key=lambda i: abs(i - expected))
+    return None
+
+
+def _nearest_hint(text, search):
+    """Point at the line the model probably meant, so it can retry with the real text"""
+    first = next((line.strip() for line in search.split("\n") if line.strip()), "")
+    if not first:
+        return ""
+    for number, line in enumerate(text.split("\n"), 1):
+        if first in line:
+            return f" (its first line appears at line {number}; re-read the file and copy the text exactly)"
+    return "; re-read the file and copy the text exactly"
@@ -0,0 +1,105 @@
+"""
+Intent Router - Answers simple commands locally, without an LLM round-trip
+Control phrases (exit, pause, wake) and common file commands are matched
+against a table of compiled patterns; anything else goes to the AI brain
+"""
+
+import re
+from collections import namedtuple
+from pathlib import Path
+import config
+
+Intent = namedtuple("Intent", ["name", "args", "confidence"])
+
+# Below this, a matched file command is still sent to the LLM
+MIN_CONFIDENCE = 0.8
+
+FILE_NAME = r"(?P<file_path>[\w\-./]+\.\w+)"
+DIRECTORY = r"(?P<directory>[\w\-./]+)"
+
+# (intent, pattern, confidence); patterns must match the whole normalized utterance
+PATTERNS = [
+    ("exit", r"(?:ok(?:ay)? )?(?:goodbye|bye|exit|quit)(?: jarvis)?(?: now)?", 1.0),
+    ("exit", r".*\b(?:goodbye|bye|exit) jarvis\b.*", 1.0),
+    ("pause", r".*\bstop listening\b.*", 1.0),
+    ("pause", r"(?:pause|sleep|go to sleep)(?: jarvis)?(?: for now)?", 1.0),
+    ("list_files", r"(?:list|show)(?: me)?(?: all)?(?: the| my)? files(?: in(?: the)? " + DIRECTORY + r"(?: folder| directory)?)?", 1.0),
+    ("list_files", r"what files do i have(?: in(?: the)? " + DIRECTORY + r"(?: folder| directory)?)?", 1.0),
+    ("list_files", r"what(?:'s| is) in my workspace", 1.0),
+    ("list_files", r"what(?:'s| is) in(?: the)? " + DIRECTORY + r" (?:folder|directory)", 1.0),
+    ("read_file", r"(?:read|open|show)(?: me)?(?: the)?(?: file)? " + FILE_NAME + r"(?: file)?", 0.9),
+]
+COMPILED = [(name, re.compile(pattern), confidence) for name, pattern, confidence in PATTERNS]
+
+FILLER = re.compile(r"^(?:(?:hey )?jarvis,? |please |can you |could you )+|(?: please| for me)+$")
+
+
+def normalize(text):
+    """Lowercase, drop filler words and turn spoken file names ("app dot py") into paths"""
+    text = text.lower().strip()
+    text = re.sub(r"\s+dot\s+", ".", text)
+    text = re.sub(r"\s+slash\s+", "/", text)
+    text = re.sub(r"[?!,]+|\.$", "", text)
+    text = " ".join(text.split())
+    return FILLER.sub("", text).strip()
+
+
+class IntentRouter:
+    def __init__(self, workspace=None):
+        self.workspace = workspace or config.WORKSPACE_DIR
+        self.hits = 0
+        self.misses = 0
+    
+    def is_wake(self, text):
+        return config.WAKE_WORD.lower() in text.lower()
+    
+    def is_control(self, text):
+        """Exit or pause phrase; cheap enough to run on every partial transcript"""
+        normalized = normalize(text)
+        return any(name in ("exit", "pause") and pattern.fullmatch(normalized)
+                   for name, pattern, _ in COMPILED)
+    
+    def route(self, text):
+        """Return the matching Intent, or None when the LLM should handle it"""
+        normalized = normalize(text)
+        for name, pattern, confidence in COMPILED:
+            match = pattern.fullmatch(normalized)
+            if not match:
+                continue
+            args = {k: v for k, v in match.groupdict().items() if v}
+            # A file name that doesn't exist was probably misheard; let the LLM work it out
+            if name == "read_file" and not (Path(self.workspace) / args["file_path"]).is_file():
+                confidence = 0.5
+            if confidence < MIN_CONFIDENCE:
+                break
+            self.hits += 1
+            return Intent(name, args, confidence)
+        
+        self.misses += 1
+        return None
+    
+    def handle(self, intent, code_handler):
+        """
+        Run a file intent directly on the code handler.
+        Returns (tool_result, spoken_reply).
+        """
+        if intent.name == "list_files":
+            directory = intent.args.get("directory", ".")
+            result = code_handler.list_files(directory)
+            if result.startswith("Error"):
+                return result, result
+            entries = result.count("\n")
+            where = "your workspace" if directory == "." else directory
+            return result, f"There {'is' if entries == 1 else 'are'} {entries} item{'' if entries == 1 else 's'} in {where}."
+        
+        if intent.name == "read_file":
+            file_path = intent.args["file_path"]
+            result = code_handler.read_file(file_path)
+            if result.startswith("Error"):
+                return result, result
+            lines = code_handler.line_count(file_path)
+            if lines is None:
+                return result, f"I've opened {file_path}."
+            return result, f"I've opened {file_path}. It has {lines} line{'' if lines == 1 else 's'}."
+        
+        raise ValueError(f"Intent '{intent.name}' is not handled locally")
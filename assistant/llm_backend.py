@@ -0,0 +1,140 @@
+"""
+LLM Backends - Where AIBrain sends its chat completions
+GroqBackend adds connection pooling, deadlines, jittered retries and optional
+request hedging on top of the Groq SDK; the same class talks to the local
+mock server (assistant/mock_llm_server.py) for offline load testing
+"""
+
+import concurrent.futures
+import random
+import time
+import config
+
+
+class LLMBackend:
+    """
+    create() takes the same arguments as groq's chat.completions.create and
+    returns the same shapes (a completion, or an iterator of chunks when stream=True)
+    """
+    
+    def create(self, **kwargs):
+        raise NotImplementedError
+
+
+class GroqBackend(LLMBackend):
+    # Statuses worth another attempt: timeouts, conflicts, rate limits, server errors
+    RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+    
+    def __init__(self, api_key=None, base_url=None, timeout=None, max_retries=None, hedge_after=None):
+        import httpx
+        from groq import Groq
+        
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge_after = config.LLM_HEDGE_AFTER if hedge_after is None else hedge_after
+        
+        # One pooled HTTP client for the whole session keeps TLS connections warm
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+            timeout=httpx.Timeout(self.timeout, connect=5.0)
+        )
+        # Retries are handled here so they share one deadline with hedging
+        self.client = Groq(
+            api_key=api_key or config.GROQ_API_KEY,
+            base_url=base_url or config.GROQ_BASE_URL,
+            http_client=self.http_client,
+            max_retries=0
+        )
+        self._hedge_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="jarvis-hedge")
+    
+    def create(self, **kwargs):
+        """Call the API with a deadline, retrying transient failures with jittered backoff"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if self.hedge_after and not kwargs.get("stream"):
+                    return self._hedged(kwargs, remaining)
+                response = self.client.chat.completions.create(timeout=remaining, **kwargs)
+                if kwargs.get("stream"):
+                    return self._until(response, deadline)
+                return response
+            except Exception as e:
+                if attempt >= self.max_retries or not self._retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                print(f"⚠️  LLM request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+    
+    def _hedged(self, kwargs, remaining):
+        """Send a second copy of a slow request and take whichever answers first"""
+        deadline = time.monotonic() + remaining
+        first = self._hedge_pool.submit(self.client.chat.completions.create, timeout=remaining, **kwargs)
+        done, _ = concurrent.futures.wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        
+        second = self._hedge_pool.submit(
+            self.client.chat.completions.create, timeout=max(0.1, deadline - time.monotonic()), **kwargs
+        )
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower copy is still running; whatever it returns must not hold a pooled connection
+                    for other in pending | (done - {future}):
+                        other.add_done_callback(_close_result)
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def _until(self, stream, deadline):
+        """Iterate a streamed completion, giving up once the request's deadline has passed"""
+        try:
+            for chunk in stream:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"LLM response still streaming after {self.timeout}s")
+                yield chunk
+        finally:
+            stream.close()
+    
+    def _retryable(self, error):
+        import groq
+        if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError)):
+            return True
+        return isinstance(error, groq.APIStatusError) and error.status_code in self.RETRY_STATUSES
+    
+    def _backoff(self, attempt, error):
+        """Full-jitter exponential backoff, honoring Retry-After when the server sends one"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+def _close_result(future):
+    """Done-callback for an abandoned request: close its response (an open stream holds a connection)"""
+    if not future.cancelled() and future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+def create_backend(name=None):
+    """Build the backend selected in config: "groq" or "mock" (local mock server)"""
+    name = name or config.LLM_BACKEND
+    if name == "groq":
+        return GroqBackend()
+    if name == "mock":
+        return GroqBackend(api_key="mock", base_url=config.MOCK_LLM_URL)
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -3,62 +3,335 @@ Memory System - Knowledge Graph for JARVIS
 Tracks projects, files, activities, and context
 """
 
+import atexit
+import gc
+import heapq
 import json
+import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
+import config
+from assistant.tracing import tracer
 
-class Memory:
+# Bump when the on-disk layout changes; older files are migrated on load
+MEMORY_VERSION = 2
+
+
+def _to_epoch(iso_time: str) -> float:
+    try:
+        return datetime.fromisoformat(iso_time).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RecencyIndex:
+    """
+    Max-heap of (timestamp, key) with lazy deletion.
+    touch() is O(log n); top(k) pops k live entries and pushes them back,
+    so it is O(k log n) plus whatever stale entries it clears on the way.
+    """
+    
+    def __init__(self, items=()):
+        self._latest = {}
+        for key, ts in items:
+            self._latest[key] = ts
+        self._heap = [(-ts, key) for key, ts in self._latest.items()]
+        heapq.heapify(self._heap)
+    
+    def __len__(self):
+        return len(self._latest)
+    
+    def touch(self, key: str, ts: float):
+        if self._latest.get(key) == ts:
+            return
+        self._latest[key] = ts
+        heapq.heappush(self._heap, (-ts, key))
+        
+        # Rebuild once stale entries outnumber live ones
+        if len(self._heap) > 2 * len(self._latest) + 64:
+            self._heap = [(-t, k) for k, t in self._latest.items()]
+            heapq.heapify(self._heap)
+    
+    def top(self, k: int) -> List[str]:
+        """Keys of the k most recent entries, newest first"""
+        found = []
+        while self._heap and len(found) < k:
+            entry = heapq.heappop(self._heap)
+            if self._latest.get(entry[1]) == -entry[0]:
+                found.append(entry)
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [key for _, key in found]
+
+
+class BaseMemory:
+    """
+    Public API shared by every memory backend.
+    Backends store the data; context rendering lives here.
+    """
+    
+    _summary_cache = None
+    
+    def record_file_activity(self, file_path: str, action: str):
+        raise NotImplementedError
+    
+    def detect_project(self, file_path: str):
+        raise NotImplementedError
+    
+    def get_recent_projects(self, limit: int = 5) -> List[Dict]:
+        raise NotImplementedError
+    
+    def get_recent_files(self, limit: int = 5) -> List[Dict]:
+        raise NotImplementedError
+    
+    def get_project_info(self, project_name: str) -> Dict:
+        raise NotImplementedError
+    
+    def update_session(self):
+        raise NotImplementedError
+    
+    def flush(self):
+        """Persist anything still buffered"""
+    
+    def _activity_version(self):
+        """Changes whenever recorded activity changes"""
+        raise NotImplementedError
+    
+    def get_context_summary(self) -> str:
+        """Get a summary of recent context for AI"""
+        # Relative times ("5 minutes ago") are only shown to the minute, so a
+        # cached summary stays valid until activity changes or the minute rolls over
+        cache_key = (self._activity_version(), int(time.time() // 60))
+        if self._summary_cache and self._summary_cache[0] == cache_key:
+            return self._summary_cache[1]
+        
+        recent_projects = self.get_recent_projects(3)
+        recent_files = self.get_recent_files(5)
+        
+        summary = "Recent context:\n"
+        
+        if recent_projects:
+            summary += "\nRecent projects:\n"
+            for proj in recent_projects:
+                summary += f"- {proj['name']} ({proj['file_count']} files, last accessed: {self._format_time(proj['last_accessed'])})\n"
+        
+        if recent_files:
+            summary += "\nRecent files:\n"
+            for file in recent_files:
+                summary += f"- {file['path']} (modified: {self._format_time(file['last_modified'])})\n"
+        
+        self._summary_cache = (cache_key, summary)
+        return summary
+    
+    def _format_time(self, iso_time: str) -> str:
+        """Format timestamp to human readable"""
+        try:
+            dt = datetime.fromisoformat(iso_time)
+            now = datetime.now()
+            diff = now - dt
+            
+            if diff.days == 0:
+                if diff.seconds < 60:
+                    return "just now"
+                elif diff.seconds < 3600:
+                    return f"{diff.seconds // 60} minutes ago"
+                else:
+                    return f"{diff.seconds // 3600} hours ago"
+            elif diff.days == 1:
+                return "yesterday"
+            elif diff.days < 7:
+                return f"{diff.days} days ago"
+            else:
+                return dt.strftime("%B %d")
+        except:
+            return "recently"
+
+
+class Memory(BaseMemory):
+    """
+    The knowledge graph lives in two files:
+    - .jarvis_memory.json     snapshot, replaced atomically on compaction
+    - .jarvis_memory.journal  append-only log of mutations since the snapshot
+    Mutations are buffered and appended in batches, so recording an activity
+    costs the same no matter how large the graph has grown.
+    """
+    
     def __init__(self, workspace_dir: Path):
         self.workspace_dir = workspace_dir
         self.memory_file = workspace_dir / ".jarvis_memory.json"
+        self.journal_file = workspace_dir / ".jarvis_memory.journal"
+        self.flush_interval = config.MEMORY_FLUSH_INTERVAL
+        self.compact_threshold = config.MEMORY_COMPACT_THRESHOLD
+        self._pending = []
+        # Tool calls may record activity from several threads at once
+        self._lock = threading.RLock()
+        self._journal_records = 0
+        self._last_flush = time.monotonic()
+        # Recency indexes are built on first query, then maintained per mutation
+        self._file_index = None
+        self._project_index = None
+        self._generation = 0
         self.knowledge_graph = self._load_memory()
+        atexit.register(self.flush)
+    
+    def _empty_graph(self) -> Dict:
+        return {
+            "projects": {},
+            "files": {},
+            "activities": [],
+            "preferences": {},
+            "last_session": None,
+            "journal_seq": 0,
+            "version": MEMORY_VERSION
+        }
     
     def _load_memory(self) -> Dict:
-        """Load existing memory or create new"""
+        """Load the snapshot, then replay any journaled mutations on top"""
+        graph = self._empty_graph()
         if self.memory_file.exists():
+            # The snapshot is one big tree of small dicts; letting the cyclic GC
+            # rescan it repeatedly while it is being built dominates load time
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
             try:
                 with open(self.memory_file, 'r') as f:
-                    return json.load(f)
+                    stored = json.load(f)
+                stored.setdefault("version", 1)
+                graph.update(stored)
             except:
                 pass
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
         
-        return {
-            "projects": {},
-            "files": {},
-            "activities": [],
-            "preferences": {},
-            "last_session": None
-        }
+        self.knowledge_graph = graph
+        migrated = graph["version"] < MEMORY_VERSION
+        if migrated:
+            self._migrate()
+        
+        if self.journal_file.exists():
+            good_bytes = 0
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn tail from a crash mid-append; everything before it is intact
+                        break
+                    good_bytes += len(line)
+                    self._journal_records += 1
+                    if record["seq"] > graph["journal_seq"]:
+                        self._apply(record)
+
+            if good_bytes < self.journal_file.stat().st_size:
+                os.truncate(self.journal_file, good_bytes)
+        
+        if migrated:
+            self.compact()
+        
+        return graph
     
     def _save_memory(self):
-        """Save memory to disk"""
+        """Flush buffered mutations if the debounce interval has passed"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Append buffered mutations to the journal, compacting when it gets long"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            
+            with tracer.span("memory.save", records=len(self._pending)):
+                try:
+                    self.workspace_dir.mkdir(parents=True, exist_ok=True)
+                    lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in self._pending)
+                    with open(self.journal_file, 'a') as f:
+                        f.write(lines)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._journal_records += len(self._pending)
+                    self._pending = []
+                except Exception as e:
+                    print(f"Warning: Could not save memory: {e}")
+                    return
+                
+                if self._journal_records >= self.compact_threshold:
+                    self.compact()
+    
+    def compact(self):
+        """Write a full snapshot atomically and start a fresh journal"""
+        with self._lock:
+            self._compact()
+    
+    def _compact(self):
         try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.knowledge_graph, f, indent=2)
+            self.workspace_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.memory_file.with_suffix(".json.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(self.knowledge_graph, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.memory_file)
+            
+            # Records already folded into the snapshot are skipped on replay via
+            # journal_seq, so a crash before this truncate is harmless
+            open(self.journal_file, 'w').close()
+            self._journal_records = 0
         except Exception as e:
-            print(f"Warning: Could not save memory: {e}")
+            print(f"Warning: Could not compact memory: {e}")
+    
+    def _commit(self, record: Dict):
+        """Apply a mutation in memory and queue it for the journal"""
+        with self._lock:
+            self.knowledge_graph["journal_seq"] += 1
+            record["seq"] = self.knowledge_graph["journal_seq"]
+            self._apply(record)
+            self._pending.append(record)
+            self._save_memory()
+    
+    def _apply(self, record: Dict):
+        op = record["op"]
+        if op == "file":
+            self._apply_file_activity(record["path"], record["action"], record["ts"])
+        elif op == "project":
+            self._apply_project(record["path"], record["ts"])
+        elif op == "session":
+            self.knowledge_graph["last_session"] = record["ts"]
+        self._generation += 1
+        self.knowledge_graph["journal_seq"] = max(self.knowledge_graph["journal_seq"], record["seq"])
     
     def record_file_activity(self, file_path: str, action: str):
         """Record file creation/modification"""
-        timestamp = datetime.now().isoformat()
-        
+        self._commit({
+            "op": "file",
+            "path": file_path,
+            "action": action,
+            "ts": datetime.now().isoformat()
+        })
+    
+    def _apply_file_activity(self, file_path: str, action: str, timestamp: str):
         # Update file record
         if file_path not in self.knowledge_graph["files"]:
             self.knowledge_graph["files"][file_path] = {
                 "created": timestamp,
                 "last_modified": timestamp,
                 "access_count": 1,
-                "actions": []
+                "actions": [],
+                "action_counts": {},
+                "daily": {}
             }
         else:
             self.knowledge_graph["files"][file_path]["last_modified"] = timestamp
             self.knowledge_graph["files"][file_path]["access_count"] += 1
         
-        self.knowledge_graph["files"][file_path]["actions"].append({
-            "action": action,
-            "timestamp": timestamp
-        })
+        self._rollup(self.knowledge_graph["files"][file_path], action, timestamp)
+        if self._file_index is not None:
+            self._file_index.touch(file_path, _to_epoch(timestamp))
         
         # Record activity
         self.knowledge_graph["activities"].append({
@@ -71,104 +344,151 @@ class Memory:
         # Keep only last 100 activities
         if len(self.knowledge_graph["activities"]) > 100:
             self.knowledge_graph["activities"] = self.knowledge_graph["activities"][-100:]
+    
+    def _rollup(self, record: Dict, action: str, timestamp: str):
+        """Add an action to a file's recent ring and its aggregate counters"""
+        actions = record["actions"]
+        actions.append({
+            "action": action,
+            "timestamp": timestamp
+        })
+        if len(actions) > config.MEMORY_ACTIONS_PER_FILE:
+            del actions[:-config.MEMORY_ACTIONS_PER_FILE]
+        
+        counts = record["action_counts"]
+        counts[action] = counts.get(action, 0) + 1
         
-        self._save_memory()
+        daily = record["daily"]
+        day = timestamp[:10]
+        daily[day] = daily.get(day, 0) + 1
+        if len(daily) > config.MEMORY_DAILY_ROLLUP_DAYS:
+            for old_day in sorted(daily)[:-config.MEMORY_DAILY_ROLLUP_DAYS]:
+                del daily[old_day]
     
     def detect_project(self, file_path: str):
         """Auto-detect project from file path"""
-        parts = Path(file_path).parts
-        if len(parts) > 0:
-            project_name = parts[0]
-            
-            if project_name not in self.knowledge_graph["projects"]:
-                self.knowledge_graph["projects"][project_name] = {
-                    "created": datetime.now().isoformat(),
-                    "files": [],
-                    "last_accessed": datetime.now().isoformat()
-                }
-            
-            if file_path not in self.knowledge_graph["projects"][project_name]["files"]:
-                self.knowledge_graph["projects"][project_name]["files"].append(file_path)
-            
-            self.knowledge_graph["projects"][project_name]["last_accessed"] = datetime.now().isoformat()
-            self._save_memory()
+        if len(Path(file_path).parts) > 0:
+            self._commit({
+                "op": "project",
+                "path": file_path,
+                "ts": datetime.now().isoformat()
+            })
+    
+    def _apply_project(self, file_path: str, timestamp: str):
+        project_name = Path(file_path).parts[0]
+        
+        if project_name not in self.knowledge_graph["projects"]:
+            self.knowledge_graph["projects"][project_name] = {
+                "created": timestamp,
+                "files": [],
+                "file_count": 0,
+                "last_accessed": timestamp
+            }
+        project = self.knowledge_graph["projects"][project_name]
+        
+        # Count each file once, even after it drops out of the recent list
+        file_record = self.knowledge_graph["files"].get(file_path)
+        if file_record is not None and "project" not in file_record:
+            file_record["project"] = project_name
+            project["file_count"] += 1
+        
+        # "files" keeps only the most recently touched paths, newest last
+        if file_path in project["files"]:
+            project["files"].remove(file_path)
+        project["files"].append(file_path)
+        if len(project["files"]) > config.MEMORY_FILES_PER_PROJECT:
+            del project["files"][:-config.MEMORY_FILES_PER_PROJECT]
+        
+        project["last_accessed"] = timestamp
+        if self._project_index is not None:
+            self._project_index.touch(project_name, _to_epoch(timestamp))
+    
+    def _migrate(self):
+        """One-shot compaction of memory files written before retention limits"""
+        graph = self.knowledge_graph
+        
+        for record in graph["files"].values():
+            history = record["actions"]
+            record["actions"] = []
+            record["action_counts"] = {}
+            record["daily"] = {}
+            for entry in history:
+                self._rollup(record, entry["action"], entry["timestamp"])
+        
+        for project_name, project in graph["projects"].items():
+            for file_path in project["files"]:
+                file_record = graph["files"].get(file_path)
+                if file_record is not None:
+                    file_record.setdefault("project", project_name)
+            project["file_count"] = len(project["files"])
+            del project["files"][:-config.MEMORY_FILES_PER_PROJECT]
+        
+        graph["version"] = MEMORY_VERSION
     
     def get_recent_projects(self, limit: int = 5) -> List[Dict]:
         """Get recently accessed projects"""
+        with self._lock:
+            return self._recent_projects(limit)
+    
+    def _recent_projects(self, limit: int) -> List[Dict]:
+        if self._project_index is None:
+            self._project_index = RecencyIndex(
+                (name, _to_epoch(data["last_accessed"]))
+                for name, data in self.knowledge_graph["projects"].items()
+            )
+        
         projects = []
-        for name, data in self.knowledge_graph["projects"].items():
+        for name in self._project_index.top(limit):
+            data = self.knowledge_graph["projects"][name]
             projects.append({
                 "name": name,
                 "last_accessed": data["last_accessed"],
-                "file_count": len(data["files"])
+                "file_count": data.get("file_count", len(data["files"]))
             })
-        
-        # Sort by last accessed
-        projects.sort(key=lambda x: x["last_accessed"], reverse=True)
-        return projects[:limit]
+        return projects
     
     def get_recent_files(self, limit: int = 5) -> List[Dict]:
         """Get recently modified files"""
+        with self._lock:
+            return self._recent_files(limit)
+    
+    def _recent_files(self, limit: int) -> List[Dict]:
+        if self._file_index is None:
+            self._file_index = RecencyIndex(
+                (path, _to_epoch(data["last_modified"]))
+                for path, data in self.knowledge_graph["files"].items()
+            )
+        
         files = []
-        for path, data in self.knowledge_graph["files"].items():
+        for path in self._file_index.top(limit):
+            data = self.knowledge_graph["files"][path]
             files.append({
                 "path": path,
                 "last_modified": data["last_modified"],
                 "access_count": data["access_count"]
             })
-        
-        files.sort(key=lambda x: x["last_modified"], reverse=True)
-        return files[:limit]
+        return files
     
-    def get_context_summary(self) -> str:
-        """Get a summary of recent context for AI"""
-        recent_projects = self.get_recent_projects(3)
-        recent_files = self.get_recent_files(5)
-        
-        summary = "Recent context:\n"
-        
-        if recent_projects:
-            summary += "\nRecent projects:\n"
-            for proj in recent_projects:
-                summary += f"- {proj['name']} ({proj['file_count']} files, last accessed: {self._format_time(proj['last_accessed'])})\n"
-        
-        if recent_files:
-            summary += "\nRecent files:\n"
-            for file in recent_files:
-                summary += f"- {file['path']} (modified: {self._format_time(file['last_modified'])})\n"
-        
-        return summary
-    
-    def _format_time(self, iso_time: str) -> str:
-        """Format timestamp to human readable"""
-        try:
-            dt = datetime.fromisoformat(iso_time)
-            now = datetime.now()
-            diff = now - dt
-            
-            if diff.days == 0:
-                if diff.seconds < 60:
-                    return "just now"
-                elif diff.seconds < 3600:
-                    return f"{diff.seconds // 60} minutes ago"
-                else:
-                    return f"{diff.seconds // 3600} hours ago"
-            elif diff.days == 1:
-                return "yesterday"
-            elif diff.days < 7:
-                return f"{diff.days} days ago"
-            else:
-                return dt.strftime("%B %d")
-        except:
-            return "recently"
+    def _activity_version(self):
+        return self._generation
     
     def update_session(self):
         """Update last session time"""
-        self.knowledge_graph["last_session"] = datetime.now().isoformat()
-        self._save_memory()
+        self._commit({"op": "session", "ts": datetime.now().isoformat()})
     
     def get_project_info(self, project_name: str) -> Dict:
         """Get detailed info about a project"""
         if project_name in self.knowledge_graph["projects"]:
             return self.knowledge_graph["projects"][project_name]
         return None
+
+
+def open_memory(workspace_dir: Path, backend: str = None) -> BaseMemory:
+    """Create the memory backend selected in config (json or sqlite)"""
+    backend = backend or config.MEMORY_BACKEND
+    if backend == "sqlite":
+        from assistant.sqlite_memory import SQLiteMemory
+        return SQLiteMemory(workspace_dir)
+    if backend != "json":
+        raise ValueError(f"Unknown memory backend: {backend}")
+    return Memory(workspace_dir)
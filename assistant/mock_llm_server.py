@@ -0,0 +1,205 @@
+"""
+Mock LLM Server - Local OpenAI/Groq-compatible chat completions endpoint
+For offline development and load testing, with configurable latency and
+failure injection. Point JARVIS at it with LLM_BACKEND=mock.
+
+Usage: python -m assistant.mock_llm_server --port 8765 --latency 0.3 --failure-rate 0.05
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATHS = {"/openai/v1/chat/completions", "/v1/chat/completions"}
+FILE_MENTION = re.compile(r"[\w\-./]+\.(?:py|js|ts|html|css|md|txt|json|toml|yaml|yml)\b")
+
+
+class MockLLMServer:
+    def __init__(self, host="127.0.0.1", port=8765, latency=0.2, token_latency=0.01,
+                 failure_rate=0.0, failure_status=503, seed=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        
+        server = self
+        
+        class Handler(MockHandler):
+            mock = server
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """Serve on a background thread; returns self"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+    
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+            return failed
+    
+    def reply(self, request):
+        """Pick a plausible reply: a tool call for file-ish requests, otherwise text"""
+        messages = request.get("messages", [])
+        last = messages[-1] if messages else {"role": "user", "content": ""}
+        text = last.get("content") or ""
+        
+        if request.get("tools") and last["role"] == "user":
+            mentioned = FILE_MENTION.findall(text)
+            if mentioned:
+                return None, [("read_file", {"file_path": path}) for path in mentioned]
+            if "files" in text.lower() or "workspace" in text.lower():
+                return None, [("list_files", {"directory": "."})]
+        
+        if last["role"] == "tool":
+            results = [m for m in messages if m["role"] == "tool"]
+            size = sum(len(m.get("content") or "") for m in results)
+            return f"Done. I looked at {len(results)} tool results, {size} characters in total.", []
+        
+        words = " ".join(text.rsplit("User: ", 1)[-1].split()[:12])
+        return f"This is a mock reply to: {words}. Everything is working as expected.", []
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path not in COMPLETIONS_PATHS:
+            return self._json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+        
+        request = json.loads(body or b"{}")
+        if self.mock.should_fail():
+            headers = {"Retry-After": "0.1"} if self.mock.failure_status == 429 else {}
+            return self._json(self.mock.failure_status,
+                              {"error": {"message": "Injected failure", "type": "server_error"}}, headers)
+        
+        time.sleep(self.mock.latency)
+        content, tool_calls = self.mock.reply(request)
+        completion_id = f"chatcmpl-mock-{self.mock.next_id()}"
+        calls = [
+            {
+                "id": f"call_{completion_id}_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)}
+            }
+            for i, (name, args) in enumerate(tool_calls)
+        ]
+        
+        if request.get("stream"):
+            return self._stream(completion_id, request, content, calls)
+        
+        time.sleep(self.mock.token_latency * len((content or "").split()))
+        self._json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "tool_calls": calls or None},
+                "finish_reason": "tool_calls" if calls else "stop"
+            }],
+            "usage": {"prompt_tokens": len(json.dumps(request.get("messages", []))) // 4,
+                      "completion_tokens": len((content or "").split()),
+                      "total_tokens": 0}
+        })
+    
+    def _stream(self, completion_id, request, content, calls):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        
+        self.close_connection = True
+        try:
+            send({"role": "assistant", "content": ""})
+            for i, call in enumerate(calls):
+                send({"tool_calls": [dict(call, index=i)]})
+            for word in re.findall(r"\S+\s*", content or ""):
+                time.sleep(self.mock.token_latency)
+                send({"content": word})
+            send({}, "tool_calls" if calls else "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading (deadline, barge-in or an abandoned hedge)
+    
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per generated word")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    server = MockLLMServer(args.host, args.port, args.latency, args.token_latency,
+                           args.failure_rate, args.failure_status, args.seed)
+    print(f"🧪 Mock LLM server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Context Retrieval - BM25 ranking of workspace snippets for each turn
+Every text file is cut into chunks of RETRIEVAL_CHUNK_LINES lines, and the
+words of each chunk (identifiers split at underscores and camelCase, plus
+the words of its path) are counted. In memory the postings are NumPy arrays,
+as in code_search: sorted term ids, and for each term the chunks containing
+it with their counts, so scoring a query is a few slices and a bincount.
+
+Files JARVIS writes are re-indexed at once, other changes on the next query.
+Chunks indexed since the postings were built sit in a small overlay (stale
+ones are marked dead) until enough pile up to merge. Files the workspace
+memory saw recently rank a little higher.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+import config
+
+IDENTIFIER = re.compile(r"[A-Za-z0-9_]+")
+TOKEN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")  # words of an identifier: snake_case and camelCase split
+STOPWORDS = frozenset("""
+about and are but can could did does for from has have how into its not should than that the
+them then there these they this was what when where which who why will with would you your
+""".split())
+SNIFF_BYTES = 8192  # a NUL byte in the first block marks a file as binary
+MAX_LINE = 200  # characters of each snippet line
+NO_IDS = np.zeros(0, dtype=np.int32)
+NO_COUNTS = np.zeros(0, dtype=np.float32)
+
+
+def count_terms(text):
+    """Counter of lowercased words; one-letter words and stopwords left out"""
+    counts = Counter()
+    for word, n in Counter(TOKEN.findall(text)).items():
+        word = word.lower()
+        if len(word) > 1 and word not in STOPWORDS:
+            counts[word] += n
+    return counts
+
+
+def _indexable(path):
+    return not path.rsplit("/", 1)[-1].startswith(".jarvis_")
+
+
+class RetrievalIndex:
+    def __init__(self, workspace_index, memory=None):
+        self.workspace = workspace_index
+        self.root = workspace_index.root
+        self.memory = memory
+        self.files = {}  # path -> (size, mtime_ns, [chunk ids])
+        self.build_seconds = None
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()  # not _lock: the build holds that for as long as it takes
+        self._version = None  # workspace index version last synced with
+        self._vocab = {}  # word -> term id
+        self._term_ids = {}  # identifier as written -> term ids of its words
+        self._chunks = []  # chunk id -> (path, first line, last line); None once stale
+        self._lengths = np.zeros(0, dtype=np.float32)  # chunk id -> words in it
+        self._alive = np.zeros(0, dtype=bool)
+        self._live_chunks = 0
+        self._live_words = 0.0
+        self._terms = NO_IDS  # sorted term ids
+        self._starts = np.zeros(1, dtype=np.int64)  # postings of _terms[k] are [_starts[k]:_starts[k + 1]]
+        self._postings = NO_IDS  # chunk ids
+        self._counts = NO_COUNTS  # how often the term appears in that chunk
+        self._dead = 0  # chunks in the postings whose file has changed or gone
+        self._fresh = {}  # chunk id -> (term ids, counts), for chunks indexed since the last merge
+        self._fresh_flat = None  # the overlay as (term ids, chunk ids, counts), built when first queried
+
+    # ----- keeping the index current -----
+
+    def start(self):
+        """Build the index in the background, if that hasn't started yet"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._build, name="jarvis-retrieval", daemon=True)
+                self._thread.start()
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self.sync()
+        except Exception as e:
+            print(f"⚠️  Context index build failed: {e}")
+            return
+        self.build_seconds = time.perf_counter() - start
+        self._ready.set()
+
+    def _term_counts(self, text):
+        """(term ids, counts) of the words in text, as count_terms() would count them"""
+        ids, counts = [], []
+        # Each distinct identifier is split into words once; after that it is a dict lookup
+        for identifier, n in Counter(IDENTIFIER.findall(text)).items():
+            terms = self._term_ids.get(identifier)
+            if terms is None:
+                terms = self._term_ids[identifier] = [self._vocab.setdefault(word, len(self._vocab))
+                                                      for word in count_terms(identifier).elements()]
+            ids += terms
+            counts += [n] * len(terms)
+        ids, inverse = np.unique(np.array(ids, dtype=np.int32), return_inverse=True)
+        return ids, np.bincount(inverse, weights=counts, minlength=len(ids)).astype(np.float32)
+
+    def _add_chunk(self, path, first, last, terms, counts):
+        chunk_id = len(self._chunks)
+        if chunk_id == len(self._alive):
+            grow = max(1024, chunk_id)
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._lengths = np.concatenate([self._lengths, np.zeros(grow, dtype=np.float32)])
+        self._fresh[chunk_id] = (terms, counts)
+        self._fresh_flat = None
+        length = float(counts.sum())
+        self._chunks.append((path, first, last))
+        self._alive[chunk_id] = True
+        self._lengths[chunk_id] = length
+        self._live_chunks += 1
+        self._live_words += length
+        return chunk_id
+
+    def _forget(self, path):
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        for chunk_id in entry[2]:
+            self._chunks[chunk_id] = None
+            self._alive[chunk_id] = False
+            self._live_chunks -= 1
+            self._live_words -= float(self._lengths[chunk_id])
+            if self._fresh.pop(chunk_id, None) is None:
+                self._dead += 1
+            else:
+                self._fresh_flat = None
+
+    def _index(self, path, size, mtime):
+        self._forget(path)
+        try:
+            with open(self.root / path, "rb") as f:
+                data = f.read(config.RETRIEVAL_MAX_FILE_BYTES + 1)
+        except OSError:
+            return
+        chunk_ids = []
+        if len(data) <= config.RETRIEVAL_MAX_FILE_BYTES and b"\0" not in data[:SNIFF_BYTES]:
+            lines = data.decode("utf-8", errors="replace").splitlines()
+            step = config.RETRIEVAL_CHUNK_LINES
+            for first in range(0, len(lines), step):
+                # The path's words count in every chunk, so "the game's player" finds game/player.py
+                terms, counts = self._term_counts("\n".join(lines[first:first + step] + [path]))
+                chunk_ids.append(self._add_chunk(path, first + 1, min(first + step, len(lines)), terms, counts))
+        self.files[path] = (size, mtime, chunk_ids)
+
+    def _merge(self):
+        """Fold the overlay into the postings arrays and drop dead chunks"""
+        terms = np.repeat(self._terms, np.diff(self._starts))
+        chunks, counts = self._postings, self._counts
+        if self._dead:
+            live = self._alive[chunks]
+            terms, chunks, counts = terms[live], chunks[live], counts[live]
+        fresh = list(self._fresh.items())
+        terms = np.concatenate([terms] + [t for _, (t, _) in fresh])
+        chunks = np.concatenate([chunks] + [np.full(len(t), i, dtype=np.int32) for i, (t, _) in fresh])
+        counts = np.concatenate([counts] + [c for _, (_, c) in fresh])
+        order = np.argsort(terms, kind="stable")
+        self._postings, self._counts = chunks[order], counts[order]
+        self._terms, starts = np.unique(terms[order], return_index=True)
+        self._starts = np.append(starts, len(order))
+        self._dead = 0
+        self._fresh.clear()
+        self._fresh_flat = None
+
+    def sync(self):
+        """Re-index whatever changed in the workspace since the last sync; returns how many files"""
+        with self._lock:
+            self.workspace.ensure_built()
+            version = self.workspace.version
+            if version == self._version:
+                return 0
+
+            changed = None if self._version is None else self.workspace.changes_since(self._version)
+            if changed is None:
+                version, current = self.workspace.snapshot()
+                changed = [p for p, stat in current.items() if self.files.get(p, (None, None))[:2] != stat]
+                changed += [p for p in self.files if p not in current]
+
+            for path in changed:
+                stat = self.workspace.files.get(path)
+                if stat is None or not _indexable(path):
+                    self._forget(path)
+                elif self.files.get(path, (None, None))[:2] != stat:
+                    self._index(path, *stat)
+            self._version = version
+
+            if len(self._fresh) + self._dead > config.RETRIEVAL_MERGE_AFTER:
+                self._merge()
+            return len(changed)
+
+    def update(self, path):
+        """Re-index a file JARVIS just wrote (after the workspace index has seen it), without waiting for a sync"""
+        # Until the first build is done it will pick the change up itself
+        if not self._ready.is_set():
+            return
+        with self._lock:
+            path = os.path.normpath(path).replace(os.sep, "/")
+            stat = self.workspace.files.get(path)
+            if stat is None or not _indexable(path):
+                self._forget(path)
+            else:
+                self._index(path, *stat)
+
+    # ----- ranking -----
+
+    def _matches(self, query_terms):
+        """(chunk ids, counts, index into query_terms) of every posting for the query's terms"""
+        chunks, counts, which = [], [], []
+        if len(self._terms):
+            at = np.searchsorted(self._terms, query_terms)
+            for i, k in enumerate(at.tolist()):
+                if k < len(self._terms) and self._terms[k] == query_terms[i]:
+                    start, end = self._starts[k], self._starts[k + 1]
+                    chunks.append(self._postings[start:end])
+                    counts.append(self._counts[start:end])
+                    which.append(np.full(end - start, i, dtype=np.int32))
+
+        if self._fresh and self._fresh_flat is None:
+            fresh = list(self._fresh.items())
+            self._fresh_flat = (np.concatenate([t for _, (t, _) in fresh]),
+                                np.concatenate([np.full(len(t), i, dtype=np.int32) for i, (t, _) in fresh]),
+                                np.concatenate([c for _, (_, c) in fresh]))
+        if self._fresh:
+            terms, fresh_chunks, fresh_counts = self._fresh_flat
+            hit = np.isin(terms, query_terms)
+            chunks.append(fresh_chunks[hit])
+            counts.append(fresh_counts[hit])
+            which.append(np.searchsorted(query_terms, terms[hit]).astype(np.int32))
+
+        if not chunks:
+            return NO_IDS, NO_COUNTS, NO_IDS
+        chunks, counts, which = np.concatenate(chunks), np.concatenate(counts), np.concatenate(which)
+        live = self._alive[chunks]
+        return chunks[live], counts[live], which[live]
+
+    def _scores(self, words):
+        """(chunk ids, BM25 scores) of the chunks containing any of words"""
+        query_terms = np.array(sorted({self._vocab[w] for w in words if w in self._vocab}), dtype=np.int32)
+        if not len(query_terms) or not self._live_chunks:
+            return NO_IDS, NO_COUNTS
+        chunks, counts, which = self._matches(query_terms)
+        if not len(chunks):
+            return NO_IDS, NO_COUNTS
+
+        k1, b = config.RETRIEVAL_BM25_K1, config.RETRIEVAL_BM25_B
+        df = np.bincount(which, minlength=len(query_terms))
+        idf = np.log1p((self._live_chunks - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * self._lengths[chunks] * (self._live_chunks / self._live_words))
+        weights = idf[which] * counts * (k1 + 1) / (counts + norm)
+        # One bincount adds up each chunk's terms
+        ids, inverse = np.unique(chunks, return_inverse=True)
+        return ids, np.bincount(inverse, weights=weights).astype(np.float32)
+
+    def _activity(self):
+        """{path: boost} for files the workspace memory saw recently, the most recent highest"""
+        if self.memory is None:
+            return {}
+        recent = self.memory.get_recent_files(config.RETRIEVAL_RECENT_FILES)
+        return {os.path.normpath(f["path"]).replace(os.sep, "/"):
+                config.RETRIEVAL_ACTIVITY_BOOST * (1 - rank / len(recent))
+                for rank, f in enumerate(recent)}
+
+    def search(self, query, k=None):
+        """[(path, first line, last line, score)]: the best chunk of each of the k files most relevant to query"""
+        k = k or config.RETRIEVAL_TOP_K
+        words = count_terms(query)
+        with self._lock:
+            self.sync()
+            ids, scores = self._scores(words)
+            if len(ids) > k * 8:
+                # Only the leaders can be lifted past each other by recent activity
+                top = np.argpartition(-scores, k * 8)[:k * 8]
+                ids, scores = ids[top], scores[top]
+            chunks = [self._chunks[i] for i in ids.tolist()]
+
+        boost = self._activity()
+        ranked = sorted(((score * (1 + boost.get(chunk[0], 0)), chunk)
+                         for score, chunk in zip(scores.tolist(), chunks)), key=lambda item: -item[0])
+        best, seen = [], set()
+        for score, (path, first, last) in ranked:
+            if path not in seen:
+                seen.add(path)
+                best.append((path, first, last, score))
+                if len(best) == k:
+                    break
+        return best
+
+    def snippets(self, query, k=None, max_bytes=None, wait=None):
+        """
+        Excerpts of the chunks most relevant to query, as one block of text
+        within max_bytes; "" when nothing matches or the first build is still
+        running after waiting RETRIEVAL_BUILD_WAIT seconds.
+        """
+        self.start()
+        if not self._ready.wait(config.RETRIEVAL_BUILD_WAIT if wait is None else wait):
+            return ""
+        budget = max_bytes or config.RETRIEVAL_MAX_BYTES
+        hits = self.search(query, k)
+        words = set(count_terms(query))
+
+        header = "Workspace snippets that may be relevant (read_file for the rest):"
+        parts, used = [header], len(header) + 1
+        for n, (path, first, last, _) in enumerate(hits):
+            try:
+                with open(self.root / path, encoding="utf-8", errors="replace") as f:
+                    lines = f.read().splitlines()[first - 1:last]
+            except OSError:
+                continue
+            # Share what's left between this snippet and the ones still to come
+            title = f"--- {path}"
+            share = (budget - used) // (len(hits) - n) - len(title) - 16
+            if not lines or share < 80:
+                continue
+            offset, lines = excerpt(lines, words, share)
+            title += f" (lines {first + offset}-{first + offset + len(lines) - 1})"
+            parts.append(title)
+            parts += lines
+            used += len(title) + 1 + sum(len(line.encode()) + 1 for line in lines)
+        return "\n".join(parts) if len(parts) > 1 else ""
+
+
+def excerpt(lines, words, budget):
+    """(offset, lines): the run of lines within budget bytes around the line with the most query words"""
+    lines = [line if len(line) <= MAX_LINE else line[:MAX_LINE - 3] + "..." for line in lines]
+    hits = [len(words.intersection(count_terms(line))) for line in lines]
+    low = high = hits.index(max(hits))
+    used = len(lines[low].encode()) + 1
+    if used > budget:
+        return low, [lines[low][:budget - 4] + "..."]
+    grew = True
+    while grew:
+        grew = False
+        for n in (high + 1, low - 1):
+            if 0 <= n < len(lines) and not low <= n <= high:
+                size = len(lines[n].encode()) + 1
+                if used + size <= budget:
+                    used += size
+                    low, high = min(low, n), max(high, n)
+                    grew = True
+    return low, lines[low:high + 1]
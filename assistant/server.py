@@ -0,0 +1,474 @@
+"""
+Server - One JARVIS shared by several clients over HTTP and WebSocket
+Each session has its own AIBrain (conversation history). All sessions share
+the LLM backend, one CodeHandler with its caches and indexes, and the
+workspace memory. Turns run on a fixed pool of SERVER_WORKERS threads, so at
+most that many LLM requests are in flight; further turns wait their turn,
+and once SERVER_MAX_PENDING are running or waiting new ones are refused with
+503 and Retry-After instead of piling up. A session runs one turn at a time.
+Writes to one workspace path are serialized by CodeHandler; memory updates
+by the memory's own lock. Standard library only (asyncio streams).
+
+    POST   /sessions                 -> {"session": id}
+    DELETE /sessions/<id>
+    POST   /command                  {"command", "session"?} -> {"session", "response", "ms", "cached", "tools"}
+    GET    /ws?session=<id>          WebSocket; send {"command": ...}, receive
+                                     {"type": "chunk", "text"}... then {"type": "done", ...}
+    GET    /health                   sessions, turns running and waiting, counters
+    GET    /metrics                  Prometheus text
+
+Usage: python -m assistant.server --port 8766 [--backend fake] [--workers 16]
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import secrets
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import config
+from assistant.tracing import describe, format_prometheus, tracer
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class Busy(Exception):
+    """Too many turns running or waiting; the client should retry later"""
+
+
+class Session:
+    def __init__(self, session_id, brain):
+        self.id = session_id
+        self.brain = brain
+        self.lock = asyncio.Lock()  # one turn at a time per conversation
+        self.last_used = time.monotonic()
+
+
+class JarvisServer:
+    def __init__(self, backend, code_handler, memory=None, workers=None, max_pending=None, session_ttl=None):
+        self.backend = backend
+        self.code_handler = code_handler
+        self.memory = memory
+        self.workers = workers or config.SERVER_WORKERS
+        self.max_pending = max_pending or config.SERVER_MAX_PENDING
+        self.session_ttl = session_ttl or config.SERVER_SESSION_TTL
+        self.sessions = {}
+        self.pending = 0  # turns running or waiting; only touched on the event loop
+        self.running = 0
+        self.served = 0
+        self.rejected = 0
+        self.failed = 0
+        self.latencies = collections.deque(maxlen=config.TRACE_WINDOW)
+        self.latency_total = 0.0
+        # Each turn holds one of these threads, and makes at most one LLM request at a time
+        self.pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="jarvis-turn")
+        self.tool_pool = concurrent.futures.ThreadPoolExecutor(config.TOOL_WORKERS, thread_name_prefix="jarvis-tool")
+        self._running_lock = threading.Lock()
+        self._server = None
+        self._reaper = None
+
+    # ----- sessions and turns -----
+
+    def new_session(self):
+        from assistant.ai_brain import AIBrain
+        session = Session(secrets.token_hex(8), AIBrain(memory=self.memory, backend=self.backend, tool_pool=self.tool_pool))
+        self.sessions[session.id] = session
+        return session
+
+    async def run_turn(self, session, command, on_chunk=None):
+        """
+        Answer one command in a session. With on_chunk, the answer is streamed
+        and on_chunk(text) is called on the event loop as it arrives.
+        Raises Busy when SERVER_MAX_PENDING turns are already admitted.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Busy()
+        self.pending += 1
+        try:
+            async with session.lock:
+                session.last_used = time.monotonic()
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(self.pool, self._turn, session, command, on_chunk, loop)
+                except Exception:
+                    self.failed += 1
+                    raise
+                session.last_used = time.monotonic()
+        finally:
+            self.pending -= 1
+        self.served += 1
+        self.latencies.append(result["ms"] / 1000)
+        self.latency_total += result["ms"] / 1000
+        return result
+
+    def _turn(self, session, command, on_chunk, loop):
+        brain = session.brain
+        history = len(brain.conversation_history)
+        cached = brain.cached_answers
+        start = time.perf_counter()
+        first = None
+        with self._running_lock:
+            self.running += 1
+        try:
+            with tracer.turn(session=session.id):
+                if on_chunk is None:
+                    response = brain.process_command(command, self.code_handler)
+                else:
+                    parts = []
+                    for chunk in brain.process_command_stream(command, self.code_handler):
+                        if first is None:
+                            first = time.perf_counter() - start
+                        parts.append(chunk)
+                        loop.call_soon_threadsafe(on_chunk, chunk)
+                    response = "".join(parts)
+        except Exception:
+            # A half-finished turn would confuse the rest of the conversation
+            del brain.conversation_history[history:]
+            raise
+        finally:
+            with self._running_lock:
+                self.running -= 1
+
+        result = {
+            "session": session.id,
+            "response": response,
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+            "cached": brain.cached_answers > cached,
+            "tools": [call["function"]["name"]
+                      for message in brain.conversation_history[history:]
+                      for call in message.get("tool_calls") or []],
+        }
+        if on_chunk is not None:
+            result["first_ms"] = None if first is None else round(first * 1000, 1)
+        return result
+
+    async def _reap_sessions(self):
+        """Drop the history of sessions idle for longer than SERVER_SESSION_TTL"""
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id, session in list(self.sessions.items()):
+                if session.last_used < cutoff and not session.lock.locked():
+                    del self.sessions[session_id]
+
+    def health(self):
+        return {
+            "sessions": len(self.sessions),
+            "running": self.running,
+            "waiting": self.pending - self.running,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "served": self.served,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    def metrics(self):
+        """Prometheus text: server gauges and counters, turn latency, and traced stages if tracing is on"""
+        health = self.health()
+        lines = [
+            "# TYPE jarvis_server_sessions gauge",
+            f"jarvis_server_sessions {health['sessions']}",
+            "# TYPE jarvis_server_turns_running gauge",
+            f"jarvis_server_turns_running {health['running']}",
+            "# TYPE jarvis_server_turns_waiting gauge",
+            f"jarvis_server_turns_waiting {health['waiting']}",
+            "# TYPE jarvis_server_turns_total counter",
+        ]
+        for outcome in ("served", "rejected", "failed"):
+            lines.append(f'jarvis_server_turns_total{{outcome="{outcome}"}} {health[outcome]}')
+        stats = tracer.stats() if tracer.enabled else {}
+        stats["server.turn"] = describe(sorted(self.latencies), self.served, self.latency_total)
+        return "\n".join(lines) + "\n" + format_prometheus(stats)
+
+    # ----- HTTP -----
+
+    async def start(self, host=None, port=None):
+        """Listen and return the asyncio server; port 0 picks a free one (see .port)"""
+        self._server = await asyncio.start_server(self._handle, host or config.SERVER_HOST,
+                                                  config.SERVER_PORT if port is None else port)
+        self._reaper = asyncio.ensure_future(self._reap_sessions())
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.pool.shutdown(wait=True)
+        self.tool_pool.shutdown(wait=True)
+        if self.memory:
+            self.memory.flush()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    await write_response(writer, 413 if "large" in str(e) else 400, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers, query)
+                    break
+
+                status, payload, extra = await self._route(method, path, body)
+                await write_response(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _route(self, method, path, body):
+        """(status, JSON payload or text, extra headers)"""
+        if path == "/health" and method == "GET":
+            return 200, self.health(), None
+        if path == "/metrics" and method == "GET":
+            return 200, self.metrics(), None
+        if path == "/sessions" and method == "POST":
+            return 201, {"session": self.new_session().id}, None
+        if path.startswith("/sessions/") and method == "DELETE":
+            session = self.sessions.pop(path[len("/sessions/"):], None)
+            return (204, None, None) if session else (404, {"error": "unknown session"}, None)
+        if path != "/command":
+            return 404, {"error": f"no route for {path}"}, None
+        if method != "POST":
+            return 405, {"error": "use POST"}, None
+
+        try:
+            message = json.loads(body or b"{}")
+            command = message["command"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": 'body must be JSON with a "command"'}, None
+        created = not message.get("session")
+        session = self.new_session() if created else self.sessions.get(message["session"])
+        if session is None:
+            return 404, {"error": "unknown session"}, None
+        try:
+            return 200, await self.run_turn(session, command), None
+        except Busy:
+            if created:
+                # The client never learns this id, so don't keep it
+                del self.sessions[session.id]
+            return 503, {"error": "busy, try again shortly"}, {"Retry-After": "1"}
+        except Exception as e:
+            return 500, {"error": f"{e.__class__.__name__}: {e}"}, None
+
+    # ----- WebSocket -----
+
+    async def _websocket(self, reader, writer, headers, query):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await write_response(writer, 400, {"error": "missing Sec-WebSocket-Key"}, keep_alive=False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+
+        def send(payload):
+            writer.write(encode_frame(OP_TEXT, json.dumps(payload).encode()))
+
+        session = self.sessions.get(query.get("session")) or self.new_session()
+        send({"type": "session", "session": session.id})
+        await writer.drain()
+
+        while True:
+            opcode, payload = await read_frame(reader)
+            if opcode == OP_CLOSE:
+                writer.write(encode_frame(OP_CLOSE, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == OP_PING:
+                writer.write(encode_frame(OP_PONG, payload))
+                await writer.drain()
+                continue
+            if opcode != OP_TEXT:
+                continue
+
+            try:
+                command = json.loads(payload)["command"]
+            except (ValueError, KeyError, TypeError):
+                send({"type": "error", "status": 400, "error": 'send JSON with a "command"'})
+                await writer.drain()
+                continue
+            try:
+                result = await self.run_turn(session, command, lambda text: send({"type": "chunk", "text": text}))
+                send(dict(result, type="done"))
+            except Busy:
+                send({"type": "error", "status": 503, "error": "busy, try again shortly", "retry_after": 1})
+            except Exception as e:
+                send({"type": "error", "status": 500, "error": f"{e.__class__.__name__}: {e}"})
+            await writer.drain()
+
+
+async def read_request(reader):
+    """(method, path, query, headers, body), or None when the client has gone; ValueError when malformed"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise ValueError("bad request line")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > config.SERVER_MAX_BODY:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    query = {name: values[0] for name, values in parse_qs(url.query).items()}
+    return method.upper(), url.path, query, headers, body
+
+
+async def write_response(writer, status, payload, extra=None, keep_alive=True):
+    if payload is None:
+        body, content_type = b"", None
+    elif isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if content_type:
+        head.append(f"Content-Type: {content_type}")
+    head += [f"{name}: {value}" for name, value in (extra or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+
+
+def encode_frame(opcode, payload, mask=False):
+    """One final WebSocket frame; clients must mask, servers must not"""
+    length = len(payload)
+    if length < 126:
+        head = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return bytes([head[0], head[1] | 0x80]) + head[2:] + key + _unmask(payload, key)
+
+
+async def read_frame(reader):
+    """(opcode, payload) of the next message, fragments joined; control frames come back as they arrive"""
+    message, message_opcode = bytearray(), OP_TEXT
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > config.SERVER_MAX_BODY:
+            raise ConnectionError("WebSocket message too large")
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key:
+            payload = _unmask(payload, key)
+        opcode = first & 0x0F
+        if opcode >= OP_CLOSE:
+            return opcode, payload
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        message += payload
+        if first & 0x80:
+            return message_opcode, bytes(message)
+
+
+def _unmask(payload, key):
+    if not payload:
+        return payload
+    n = len(payload)
+    mask = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(mask, "big")).to_bytes(n, "big")
+
+
+async def serve(server, host, port):
+    await server.start(host, port)
+    print(f"🌐 JARVIS server on http://{host}:{server.port} (WebSocket at /ws)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve JARVIS to several clients over HTTP and WebSocket")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS, help="turns (LLM requests) at once")
+    parser.add_argument("--max-pending", type=int, default=config.SERVER_MAX_PENDING,
+                        help="turns running or waiting before new ones get 503")
+    parser.add_argument("--backend", default=config.LLM_BACKEND, choices=["groq", "mock", "fake"],
+                        help="fake starts a mock LLM server inside this process")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake backend: seconds before the first token")
+    parser.add_argument("--workspace", type=Path, help=f"work here instead of {config.WORKSPACE_DIR}")
+    parser.add_argument("--trace", action="store_true", help="add per-stage latencies to /metrics")
+    args = parser.parse_args()
+
+    if args.workspace:
+        config.WORKSPACE_DIR = args.workspace.resolve()
+    if args.backend == "groq" and not config.GROQ_API_KEY:
+        parser.error("GROQ_API_KEY not found; use --backend fake or mock to run offline")
+
+    from assistant.batch import create_batch_backend
+    from assistant.code_handler import CodeHandler
+    from assistant.memory import open_memory
+
+    if args.trace:
+        tracer.enable()
+    backend, mock = create_batch_backend(args.backend, latency=args.latency)
+    memory = open_memory(config.WORKSPACE_DIR)
+    server = JarvisServer(backend, CodeHandler(memory=memory), memory, args.workers, args.max_pending)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped", file=sys.stderr)
+    finally:
+        if mock is not None:
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
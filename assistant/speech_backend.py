@@ -0,0 +1,178 @@
+"""
+Speech Backends - Where VoiceHandler sends captured audio to become text
+GoogleRecognizer is the FREE online recognizer JARVIS has always used.
+VoskRecognizer runs fully offline and consumes audio as it is captured,
+giving partial hypotheses before the user has finished speaking.
+
+Batch transcription of a folder of WAV files:
+    python -m assistant.speech_backend transcribe recordings/ --backend vosk --workers 4
+"""
+
+import argparse
+import concurrent.futures
+import json
+import time
+from pathlib import Path
+import config
+
+
+class RecognitionStream:
+    """
+    One phrase being recognized incrementally. feed() returns the new partial
+    hypothesis when it changes (else None); finish() returns the final text.
+    Engines without partial results just collect the audio and transcribe it
+    at the end.
+    """
+    
+    def __init__(self, engine, sample_rate):
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self._chunks = []
+    
+    def feed(self, pcm):
+        self._chunks.append(pcm)
+        return None
+    
+    def finish(self):
+        return self.engine.transcribe(b"".join(self._chunks), self.sample_rate)
+
+
+class SpeechRecognizer:
+    """Audio is 16-bit mono PCM bytes; transcribe() returns text, or None when nothing was understood"""
+    
+    streaming = False  # True when stream() gives partial results
+    
+    def transcribe(self, pcm, sample_rate):
+        raise NotImplementedError
+    
+    def stream(self, sample_rate):
+        return RecognitionStream(self, sample_rate)
+    
+    def transcribe_file(self, path):
+        from assistant.wake_word import read_wav
+        pcm, sample_rate = read_wav(path)
+        start = time.perf_counter()
+        text = self.transcribe(pcm, sample_rate)
+        return {
+            "path": str(path),
+            "text": text or "",
+            "audio_seconds": len(pcm) / 2 / sample_rate,
+            "seconds": time.perf_counter() - start
+        }
+    
+    def transcribe_batch(self, paths, workers=1):
+        """Transcribe many WAV files concurrently; results come back in input order"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jarvis-stt") as pool:
+            return list(pool.map(self.transcribe_file, paths))
+
+
+class GoogleRecognizer(SpeechRecognizer):
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+    
+    def transcribe(self, pcm, sample_rate):
+        try:
+            return self.recognizer.recognize_google(self.sr.AudioData(pcm, sample_rate, 2))
+        except self.sr.UnknownValueError:
+            return None
+        except Exception as e:
+            print(f"❌ Error in speech recognition: {e}")
+            return None
+
+
+class VoskStream(RecognitionStream):
+    def __init__(self, engine, sample_rate):
+        super().__init__(engine, sample_rate)
+        from vosk import KaldiRecognizer
+        self.kaldi = KaldiRecognizer(engine.model, sample_rate)
+        self.segments = []
+        self.partial = ""
+    
+    def feed(self, pcm):
+        # Vosk finalizes a segment on its own at internal pauses; keep those and keep going
+        if self.kaldi.AcceptWaveform(pcm):
+            text = json.loads(self.kaldi.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            current = ""
+        else:
+            current = json.loads(self.kaldi.PartialResult()).get("partial", "")
+        
+        hypothesis = " ".join(self.segments + [current]).strip()
+        if hypothesis == self.partial:
+            return None
+        self.partial = hypothesis
+        return hypothesis
+    
+    def finish(self):
+        text = json.loads(self.kaldi.FinalResult()).get("text", "")
+        return " ".join(self.segments + [text]).strip() or None
+
+
+class VoskRecognizer(SpeechRecognizer):
+    """Offline Kaldi models from https://alphacephei.com/vosk/models (pip install vosk)"""
+    
+    streaming = True
+    CHUNK_BYTES = 8000  # ~0.25s at 16kHz, what Vosk's examples feed per call
+    
+    def __init__(self, model_path=None):
+        import vosk
+        
+        model_path = Path(model_path or config.VOSK_MODEL_PATH)
+        if not model_path.is_dir():
+            raise FileNotFoundError(
+                f"Vosk model not found at {model_path}. Download one from "
+                "https://alphacephei.com/vosk/models and set JARVIS_VOSK_MODEL"
+            )
+        vosk.SetLogLevel(-1)
+        # One model is shared by every stream (and thread); each stream has its own recognizer
+        self.model = vosk.Model(str(model_path))
+    
+    def stream(self, sample_rate):
+        return VoskStream(self, sample_rate)
+    
+    def transcribe(self, pcm, sample_rate):
+        stream = self.stream(sample_rate)
+        for offset in range(0, len(pcm), self.CHUNK_BYTES):
+            stream.feed(pcm[offset:offset + self.CHUNK_BYTES])
+        return stream.finish()
+
+
+def create_recognizer(name=None):
+    """Build the recognizer selected in config: "google" (online) or "vosk" (offline)"""
+    name = name or config.STT_BACKEND
+    if name == "google":
+        return GoogleRecognizer()
+    if name == "vosk":
+        return VoskRecognizer()
+    raise ValueError(f"Unknown speech recognition backend: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech recognition backends")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch = commands.add_parser("transcribe", help="transcribe every WAV file in a directory")
+    batch.add_argument("directory")
+    batch.add_argument("--backend", default=config.STT_BACKEND, choices=["google", "vosk"])
+    batch.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    
+    paths = sorted(Path(args.directory).glob("*.wav"))
+    if not paths:
+        print(f"❌ No .wav files in {args.directory}")
+        return
+    
+    engine = create_recognizer(args.backend)
+    start = time.perf_counter()
+    results = engine.transcribe_batch(paths, args.workers)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"{Path(result['path']).name}: {result['text']}")
+    audio = sum(result["audio_seconds"] for result in results)
+    print(f"\n🎧 {len(results)} files, {audio:.1f}s of audio in {elapsed:.1f}s ({audio / elapsed:.1f}x realtime)")
+
+
+if __name__ == "__main__":
+    main()
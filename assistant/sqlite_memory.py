@@ -0,0 +1,278 @@
+"""
+SQLite Memory Backend - Knowledge graph stored in .jarvis_memory.db
+Only the rows a query needs are loaded, and several JARVIS processes can
+share one workspace safely (WAL mode, one transaction per mutation)
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List
+import config
+from assistant.memory import BaseMemory, Memory, _to_epoch
+from assistant.tracing import tracer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    project TEXT,
+    created TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    last_modified_ts REAL NOT NULL,
+    access_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_by_recency ON files (last_modified_ts DESC);
+CREATE INDEX IF NOT EXISTS files_by_project ON files (project, last_modified_ts DESC);
+
+CREATE TABLE IF NOT EXISTS file_actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS file_actions_by_path ON file_actions (path, id);
+
+CREATE TABLE IF NOT EXISTS action_counts (
+    path TEXT NOT NULL,
+    action TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, action)
+);
+
+CREATE TABLE IF NOT EXISTS daily_counts (
+    path TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, day)
+);
+
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    last_accessed TEXT NOT NULL,
+    last_accessed_ts REAL NOT NULL,
+    file_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS projects_by_recency ON projects (last_accessed_ts DESC);
+
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    action TEXT NOT NULL,
+    target TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteMemory(BaseMemory):
+    def __init__(self, workspace_dir: Path):
+        self.workspace_dir = workspace_dir
+        self.db_file = workspace_dir / ".jarvis_memory.db"
+        self.workspace_dir.mkdir(parents=True, exist_ok=True)
+
+        # One connection shared by this process's threads, guarded by a lock
+        self._lock = threading.RLock()
+        self._generation = 0
+        self.conn = sqlite3.connect(str(self.db_file), timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate_from_json()
+
+    def _migrate_from_json(self):
+        """Import .jarvis_memory.json (and its journal) the first time the database is opened"""
+        json_file = self.workspace_dir / ".jarvis_memory.json"
+        journal_file = self.workspace_dir / ".jarvis_memory.journal"
+        if self._get_meta("json_imported") or not (json_file.exists() or journal_file.exists()):
+            return
+
+        legacy = Memory(self.workspace_dir)
+        graph = legacy.knowledge_graph
+
+        with self._lock, self.conn:
+            # Another process may have finished the import while we were loading
+            if self._get_meta("json_imported"):
+                return
+
+            for path, data in graph["files"].items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, data.get("project"), data["created"], data["last_modified"],
+                     _to_epoch(data["last_modified"]), data["access_count"])
+                )
+                self.conn.executemany(
+                    "INSERT INTO file_actions (path, action, timestamp) VALUES (?, ?, ?)",
+                    [(path, a["action"], a["timestamp"]) for a in data["actions"]]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO action_counts VALUES (?, ?, ?)",
+                    [(path, action, count) for action, count in data["action_counts"].items()]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO daily_counts VALUES (?, ?, ?)",
+                    [(path, day, count) for day, count in data["daily"].items()]
+                )
+
+            for name, data in graph["projects"].items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)",
+                    (name, data["created"], data["last_accessed"],
+                     _to_epoch(data["last_accessed"]), data.get("file_count", len(data["files"])))
+                )
+
+            self.conn.executemany(
+                "INSERT INTO activities (type, action, target, timestamp) VALUES (?, ?, ?, ?)",
+                [(a["type"], a["action"], a["target"], a["timestamp"]) for a in graph["activities"]]
+            )
+            if graph["last_session"]:
+                self._set_meta("last_session", graph["last_session"])
+            self._set_meta("json_imported", datetime.now().isoformat())
+
+        print(f"📦 Imported {len(graph['files'])} files from {json_file.name} into {self.db_file.name}")
+
+    def _get_meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def record_file_activity(self, file_path: str, action: str):
+        """Record file creation/modification"""
+        timestamp = datetime.now().isoformat()
+        ts = _to_epoch(timestamp)
+
+        with tracer.span("memory.save"), self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO files (path, created, last_modified, last_modified_ts, access_count)
+                   VALUES (?, ?, ?, ?, 1)
+                   ON CONFLICT (path) DO UPDATE SET
+                       last_modified = excluded.last_modified,
+                       last_modified_ts = excluded.last_modified_ts,
+                       access_count = access_count + 1""",
+                (file_path, timestamp, timestamp, ts)
+            )
+
+            # Recent-action ring plus rollups, same retention as the JSON backend
+            self.conn.execute(
+                "INSERT INTO file_actions (path, action, timestamp) VALUES (?, ?, ?)",
+                (file_path, action, timestamp)
+            )
+            self.conn.execute(
+                """DELETE FROM file_actions WHERE path = ? AND id <= (
+                       SELECT id FROM file_actions WHERE path = ?
+                       ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (file_path, file_path, config.MEMORY_ACTIONS_PER_FILE)
+            )
+            self.conn.execute(
+                """INSERT INTO action_counts VALUES (?, ?, 1)
+                   ON CONFLICT (path, action) DO UPDATE SET count = count + 1""",
+                (file_path, action)
+            )
+            self.conn.execute(
+                """INSERT INTO daily_counts VALUES (?, ?, 1)
+                   ON CONFLICT (path, day) DO UPDATE SET count = count + 1""",
+                (file_path, timestamp[:10])
+            )
+            self.conn.execute(
+                """DELETE FROM daily_counts WHERE path = ? AND day <= (
+                       SELECT day FROM daily_counts WHERE path = ?
+                       ORDER BY day DESC LIMIT 1 OFFSET ?)""",
+                (file_path, file_path, config.MEMORY_DAILY_ROLLUP_DAYS)
+            )
+
+            # Record activity, keeping only the last 100
+            self.conn.execute(
+                "INSERT INTO activities (type, action, target, timestamp) VALUES ('file', ?, ?, ?)",
+                (action, file_path, timestamp)
+            )
+            self.conn.execute("DELETE FROM activities WHERE id <= (SELECT MAX(id) FROM activities) - 100")
+            self._generation += 1
+
+    def detect_project(self, file_path: str):
+        """Auto-detect project from file path"""
+        parts = Path(file_path).parts
+        if len(parts) == 0:
+            return
+        project_name = parts[0]
+        timestamp = datetime.now().isoformat()
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO projects VALUES (?, ?, ?, ?, 0)
+                   ON CONFLICT (name) DO UPDATE SET
+                       last_accessed = excluded.last_accessed,
+                       last_accessed_ts = excluded.last_accessed_ts""",
+                (project_name, timestamp, timestamp, _to_epoch(timestamp))
+            )
+            # Count each file once, the first time it is attributed to a project
+            claimed = self.conn.execute(
+                "UPDATE files SET project = ? WHERE path = ? AND project IS NULL",
+                (project_name, file_path)
+            ).rowcount
+            if claimed:
+                self.conn.execute(
+                    "UPDATE projects SET file_count = file_count + 1 WHERE name = ?",
+                    (project_name,)
+                )
+            self._generation += 1
+
+    def get_recent_projects(self, limit: int = 5) -> List[Dict]:
+        """Get recently accessed projects"""
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT name, last_accessed, file_count FROM projects
+                   ORDER BY last_accessed_ts DESC LIMIT ?""",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_recent_files(self, limit: int = 5) -> List[Dict]:
+        """Get recently modified files"""
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT path, last_modified, access_count FROM files
+                   ORDER BY last_modified_ts DESC LIMIT ?""",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_project_info(self, project_name: str) -> Dict:
+        """Get detailed info about a project"""
+        with self._lock:
+            project = self.conn.execute(
+                "SELECT created, last_accessed, file_count FROM projects WHERE name = ?",
+                (project_name,)
+            ).fetchone()
+            if project is None:
+                return None
+            files = self.conn.execute(
+                """SELECT path FROM files WHERE project = ?
+                   ORDER BY last_modified_ts DESC LIMIT ?""",
+                (project_name, config.MEMORY_FILES_PER_PROJECT)
+            ).fetchall()
+
+        info = dict(project)
+        # Oldest first, matching the JSON backend's list
+        info["files"] = [row["path"] for row in reversed(files)]
+        return info
+
+    def update_session(self):
+        """Update last session time"""
+        with self._lock, self.conn:
+            self._set_meta("last_session", datetime.now().isoformat())
+            self._generation += 1
+
+    def _activity_version(self):
+        # data_version changes when another process commits to the database
+        with self._lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return (self._generation, data_version)
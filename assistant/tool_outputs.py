@@ -0,0 +1,59 @@
+"""
+Tool Outputs - One copy of each tool result in the conversation
+Tool messages in the history are tied, by tool call id, to the hash of
+their output and, for file reads, to the (path, mtime, size) the file had
+when it was read. Before every request refresh() rewrites the history in
+place: the newest copy of any output is kept, older copies shrink to a
+pointer, and reads of files that have changed since are dropped, so the
+model re-reads instead of trusting old text.
+"""
+
+import hashlib
+
+
+class ToolOutputStore:
+    def __init__(self):
+        self.sources = {}  # tool call id -> (digest, label, fingerprint of the file read or None)
+        self.deduplicated = 0
+        self.dropped = 0
+
+    def add(self, message, label, fingerprint=None):
+        """Register a tool message just appended to the history"""
+        digest = hashlib.sha256(message["content"].encode("utf-8")).hexdigest()
+        self.sources[message["tool_call_id"]] = (digest, label, fingerprint)
+
+    def refresh(self, history, fingerprint):
+        """
+        Deduplicate and drop stale outputs in history, newest first.
+        fingerprint(paths) returns the current (path, mtime, size) tuples, or None.
+        """
+        current = {}
+        newest = {}
+        for message in reversed(history):
+            source = self.sources.get(message.get("tool_call_id")) if message["role"] == "tool" else None
+            if source is None:
+                continue
+            digest, label, read_as = source
+            tool_call_id = message["tool_call_id"]
+
+            if read_as is not None:
+                path = read_as[0]
+                if path not in current:
+                    now = fingerprint([path])
+                    current[path] = now[0] if now else None
+                if current[path] != read_as:
+                    message["content"] = f"[Output of {label} dropped: {path} has changed since. Read it again if needed.]"
+                    del self.sources[tool_call_id]
+                    self.dropped += 1
+                    continue
+
+            if digest in newest:
+                message["content"] = f"[Same output as the later {newest[digest]} result below.]"
+                del self.sources[tool_call_id]
+                self.deduplicated += 1
+            else:
+                newest[digest] = label
+
+        # Forget messages the context window has folded away
+        present = {m.get("tool_call_id") for m in history if m["role"] == "tool"}
+        self.sources = {key: source for key, source in self.sources.items() if key in present}
@@ -0,0 +1,342 @@
+"""
+Tracing - Where the time of each turn went
+Spans time the stages of a turn: listening, recognition, each completion,
+each tool call, memory saves and speech. Durations feed a rolling window per
+stage for p50/p95/p99, every finished span is appended to a JSONL trace, and
+prometheus() renders the windows as Prometheus summaries. While disabled,
+span() hands back one shared no-op context manager, so instrumented code
+costs an attribute check.
+
+With PROFILE_SLOW_TURNS set, a sampling profiler watches threads working on
+a turn, and turns slower than that get their most frequent stacks written to
+the trace.
+
+Summarize a trace file:
+    python -m assistant.tracing report .jarvis_trace.jsonl [--prometheus]
+"""
+
+import argparse
+import contextvars
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+import config
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# The innermost open span of the current thread (or task); copy_context() carries it to workers
+_current = contextvars.ContextVar("jarvis_span", default=None)
+
+
+def quantile(ordered, q):
+    """Nearest-rank quantile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1]
+
+
+def describe(ordered, count=None, total=None):
+    """Stats of sorted durations: count and sum (of everything seen, when given) plus p50/p95/p99"""
+    stats = {"count": len(ordered) if count is None else count, "sum": sum(ordered) if total is None else total}
+    for q in QUANTILES:
+        stats[f"p{int(q * 100)}"] = quantile(ordered, q)
+    return stats
+
+
+class _NoSpan:
+    """Stand-in for every span while tracing is off"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set(self, **attrs):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attrs, turn=False):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = next(tracer._ids)
+        parent = _current.get()
+        self.parent = parent.id if parent else None
+        self.turn = self.id if turn else (parent.turn if parent else None)
+        self._token = None
+    
+    def set(self, **attrs):
+        """Attach attributes learned while the span is open (result sizes, counts)"""
+        self.attrs.update(attrs)
+    
+    def __enter__(self):
+        self._token = _current.set(self)
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        if self.turn is not None:
+            self.tracer._enter_thread(self.turn)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        if self.turn is not None:
+            self.tracer._exit_thread()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, seconds)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self.slow_turn = 0
+        self.slow_turns = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._windows = {}  # stage -> deque of recent durations
+        self._totals = {}  # stage -> [count, sum of seconds] since start
+        self._buffer = []
+        # Sampling profiler state: thread id -> [turn, open spans], turn -> Counter of stacks
+        self._threads = {}
+        self._samples = {}
+        self._profiler = None
+        self._stop = threading.Event()
+    
+    def enable(self, trace_file=None, slow_turn=None):
+        """Start tracing; spans go to trace_file (JSONL) when given"""
+        self.trace_file = Path(trace_file) if trace_file else None
+        self.slow_turn = config.PROFILE_SLOW_TURNS if slow_turn is None else slow_turn
+        self.enabled = True
+        if self.slow_turn and self._profiler is None:
+            self._stop.clear()
+            self._profiler = threading.Thread(target=self._profile, name="jarvis-profiler", daemon=True)
+            self._profiler.start()
+    
+    def close(self):
+        """Stop the profiler and write out buffered spans"""
+        if self._profiler is not None:
+            self._stop.set()
+            self._profiler.join()
+            self._profiler = None
+        self.flush()
+        self.enabled = False
+    
+    def span(self, name, **attrs):
+        """Context manager timing one stage; nested spans record their parent"""
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, attrs)
+    
+    def turn(self, **attrs):
+        """Span covering one whole turn; spans opened inside it, on any thread given its context, belong to it"""
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, "turn", attrs, turn=True)
+    
+    def record(self, name, seconds, **attrs):
+        """A stage timed elsewhere (a stream consumed across yields), ending now"""
+        if not self.enabled:
+            return
+        span = Span(self, name, attrs)
+        span.wall = time.time() - seconds
+        self._finish(span, seconds)
+    
+    def _finish(self, span, seconds):
+        entry = {
+            "ts": round(span.wall, 6),
+            "turn": span.turn,
+            "span": span.id,
+            "parent": span.parent,
+            "name": span.name,
+            "ms": round(seconds * 1000, 3),
+        }
+        entry.update(span.attrs)
+        
+        stacks = None
+        if span.name == "turn" and self.slow_turn:
+            with self._lock:
+                samples = self._samples.pop(span.id, None)
+            if seconds >= self.slow_turn and samples:
+                stacks = samples
+        
+        with self._lock:
+            window = self._windows.get(span.name)
+            if window is None:
+                window = self._windows[span.name] = deque(maxlen=config.TRACE_WINDOW)
+                self._totals[span.name] = [0, 0.0]
+            window.append(seconds)
+            totals = self._totals[span.name]
+            totals[0] += 1
+            totals[1] += seconds
+            if self.trace_file is not None:
+                self._buffer.append(json.dumps(entry, default=str))
+                if stacks:
+                    self._buffer.append(json.dumps({
+                        "ts": entry["ts"],
+                        "turn": span.turn,
+                        "name": "profile",
+                        "ms": entry["ms"],
+                        "samples": sum(stacks.values()),
+                        "stacks": [{"count": count, "stack": stack}
+                                   for stack, count in stacks.most_common(config.PROFILE_TOP_STACKS)]
+                    }))
+        
+        if stacks:
+            self.slow_turns += 1
+            print(f"🐢 Slow turn ({seconds:.1f}s), busiest stacks:")
+            for stack, count in stacks.most_common(3):
+                print(f"   {count:>4} samples  ...{' <- '.join(reversed(stack.split(';')[-3:]))}")
+        if span.name == "turn":
+            self.flush()
+    
+    def flush(self):
+        """Append buffered spans to the trace file"""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines or self.trace_file is None:
+            return
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Warning: Could not write trace: {e}")
+    
+    def stats(self):
+        """{stage: {"count", "sum", "p50", "p95", "p99"}} with quantiles over the recent window"""
+        with self._lock:
+            windows = {name: sorted(window) for name, window in self._windows.items()}
+            totals = {name: list(values) for name, values in self._totals.items()}
+        return {name: describe(ordered, *totals[name]) for name, ordered in windows.items()}
+    
+    def summary(self):
+        """Per-stage latency table"""
+        return format_summary(self.stats())
+    
+    def prometheus(self):
+        """Prometheus text exposition of the per-stage summaries"""
+        return format_prometheus(self.stats())
+    
+    # Sampling profiler
+    
+    def _enter_thread(self, turn):
+        if not self.slow_turn:
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            state = self._threads.setdefault(ident, [turn, 0])
+            state[1] += 1
+    
+    def _exit_thread(self):
+        if not self.slow_turn:
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            state = self._threads.get(ident)
+            if state is not None:
+                state[1] -= 1
+                if state[1] <= 0:
+                    del self._threads[ident]
+    
+    def _profile(self):
+        interval = config.PROFILE_INTERVAL
+        while not self._stop.wait(interval):
+            with self._lock:
+                if not self._threads:
+                    continue
+                threads = {ident: state[0] for ident, state in self._threads.items()}
+            frames = sys._current_frames()
+            sampled = []
+            for ident, turn in threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    sampled.append((turn, _stack(frame)))
+            with self._lock:
+                for turn, stack in sampled:
+                    self._samples.setdefault(turn, Counter())[stack] += 1
+
+
+def _stack(frame, limit=40):
+    """Collapsed stack, outermost first: "file:function:line;..." """
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def format_summary(stats):
+    lines = [f"{'stage':<24}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'total':>10}"]
+    for name in sorted(stats, key=lambda n: -stats[n]["sum"]):
+        s = stats[name]
+        lines.append(f"{name:<24}{s['count']:>8}{s['p50'] * 1000:>8.0f}ms{s['p95'] * 1000:>8.0f}ms"
+                     f"{s['p99'] * 1000:>8.0f}ms{s['sum']:>9.1f}s")
+    return "\n".join(lines)
+
+
+def format_prometheus(stats):
+    lines = [
+        "# HELP jarvis_stage_seconds Time spent in each stage of a turn",
+        "# TYPE jarvis_stage_seconds summary",
+    ]
+    for name in sorted(stats):
+        s = stats[name]
+        stage = name.replace("\\", "\\\\").replace('"', '\\"')
+        for q in QUANTILES:
+            lines.append(f'jarvis_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'jarvis_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+        lines.append(f'jarvis_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def load_stats(path):
+    """Per-stage stats over every span in a trace file"""
+    durations = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if entry.get("name") != "profile" and "ms" in entry:
+                durations.setdefault(entry["name"], []).append(entry["ms"] / 1000)
+    return {name: describe(sorted(values)) for name, values in durations.items()}
+
+
+# Process-wide tracer; jarvis.py enables it with --trace or JARVIS_TRACE=1
+tracer = Tracer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a JARVIS trace file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="per-stage p50/p95/p99")
+    report.add_argument("trace", type=Path)
+    report.add_argument("--prometheus", action="store_true", help="print Prometheus text instead of a table")
+    args = parser.parse_args()
+    if not args.trace.is_file():
+        parser.error(f"no trace file at {args.trace}")
+    
+    stats = load_stats(args.trace)
+    if args.prometheus:
+        print(format_prometheus(stats), end="")
+    else:
+        print(format_summary(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+TTS Cache - Pre-rendered audio for phrases JARVIS says again and again
+Each phrase is rendered to a WAV file once and stored under a hash of the
+text and the voice, rate and volume it was spoken with, so changing the
+voice never plays stale audio. The directory is an LRU bounded by size.
+
+Rendering runs in a separate process: pyttsx3 engines are per-process
+singletons that are not thread-safe, and the main one is busy speaking.
+
+    python -m assistant.tts_cache warm "Hello!" "Goodbye!"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import config
+
+
+def cache_key(text, voice, rate, volume):
+    settings = json.dumps([" ".join(text.split()), voice, rate, round(volume, 3)])
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = Path(directory or config.TTS_CACHE_DIR)
+        self.max_bytes = max_bytes or config.TTS_CACHE_MAX_BYTES
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def path(self, text, voice, rate, volume):
+        return self.directory / f"{cache_key(text, voice, rate, volume)}.wav"
+    
+    def lookup(self, text, voice, rate, volume):
+        """Path of the rendered phrase, or None; a hit counts as a use for LRU"""
+        path = self.path(text, voice, rate, volume)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+    
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def evict(self):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.wav"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self.discard(path)
+                total -= size
+    
+    def render(self, engine, phrases, voice, rate, volume):
+        """Render missing phrases with a pyttsx3 engine already set to voice/rate/volume"""
+        pending = []
+        for text in phrases:
+            final = self.path(text, voice, rate, volume)
+            if final.exists():
+                continue
+            fd, temp = tempfile.mkstemp(suffix=".wav", dir=self.directory)
+            os.close(fd)
+            engine.save_to_file(text, temp)
+            pending.append((temp, final))
+        if not pending:
+            return 0
+        
+        engine.runAndWait()
+        for temp, final in pending:
+            # Some drivers write nothing for text they can't say
+            if os.path.getsize(temp) > 0:
+                os.replace(temp, final)
+            else:
+                os.remove(temp)
+        self.evict()
+        return len(pending)
+
+
+class CacheWarmer:
+    """Background thread that renders queued phrases, batching whatever piles up"""
+    
+    def __init__(self, cache, voice, rate, volume):
+        self.cache = cache
+        self.settings = (voice, rate, volume)
+        self._queue = []
+        self._wakeup = threading.Condition()
+        self._thread = None
+    
+    def warm(self, phrases):
+        voice, rate, volume = self.settings
+        missing = [text for text in phrases if not self.cache.path(text, voice, rate, volume).exists()]
+        if not missing:
+            return
+        with self._wakeup:
+            self._queue.extend(missing)
+            self._wakeup.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jarvis-tts-warm", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        voice, rate, volume = self.settings
+        while True:
+            with self._wakeup:
+                while not self._queue:
+                    self._wakeup.wait()
+                phrases, self._queue = list(dict.fromkeys(self._queue)), []
+            command = [sys.executable, "-m", "assistant.tts_cache", "warm",
+                       "--directory", str(self.cache.directory), "--voice", voice or "",
+                       "--rate", str(rate), "--volume", str(volume), *phrases]
+            try:
+                subprocess.run(command, cwd=Path(__file__).resolve().parent.parent,
+                               capture_output=True, timeout=60)
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"⚠️  Could not pre-render speech: {e}")
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render phrases into the TTS cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("warm")
+    warm.add_argument("phrases", nargs="*")
+    warm.add_argument("--directory", default=str(config.TTS_CACHE_DIR))
+    warm.add_argument("--voice", default="")
+    warm.add_argument("--rate", type=int, default=config.TTS_RATE)
+    warm.add_argument("--volume", type=float, default=config.TTS_VOLUME)
+    args = parser.parse_args()
+    
+    import pyttsx3
+    engine = pyttsx3.init()
+    if args.voice:
+        engine.setProperty("voice", args.voice)
+    engine.setProperty("rate", args.rate)
+    engine.setProperty("volume", args.volume)
+    voice = args.voice or engine.getProperty("voice")
+    
+    phrases = args.phrases or list(config.PHRASES.values())
+    rendered = TTSCache(args.directory).render(engine, phrases, voice, args.rate, args.volume)
+    print(f"🔊 Rendered {rendered} phrase{'' if rendered == 1 else 's'} into {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,94 @@
 """
 Voice Handler - FREE speech recognition and text-to-speech
-Uses Google Speech Recognition (FREE) + pyttsx3 (FREE offline TTS)
+Uses Google Speech Recognition (FREE) or offline Vosk + pyttsx3 (FREE offline TTS)
+The audio libraries are imported when a VoiceHandler is created, so text mode
+(TextHandler) never loads them.
 """
 
-import speech_recognition as sr
-import pyttsx3
+import contextvars
+import queue
+import re
+import threading
+import wave
+from collections import OrderedDict
 import config
+from assistant.speech_backend import create_recognizer
+from assistant.tracing import tracer
+from assistant.tts_cache import CacheWarmer, TTSCache
+
+# End of sentence: terminal punctuation followed by whitespace, or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+ABBREVIATIONS = ("e.g.", "i.e.", "etc.", "vs.", "mr.", "mrs.", "dr.")
+
+
+def iter_sentences(chunks, min_length=config.TTS_MIN_SENTENCE_CHARS):
+    """Regroup a stream of text chunks into sentences as soon as each one completes"""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            # "e.g." or "Dr." is not the end of a sentence
+            if buffer[start:match.start()].lower().endswith(ABBREVIATIONS):
+                continue
+            # Hold very short fragments ("Hi.") so speech doesn't stutter
+            if match.start() - start >= min_length:
+                sentence = buffer[start:match.start()].strip()
+                if sentence:
+                    yield sentence
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
 
 class VoiceHandler:
-    def __init__(self):
+    def __init__(self, calibrate=True):
+        import speech_recognition as sr
+        import pyttsx3
+        
+        self.sr = sr
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self.microphone = sr.Microphone(sample_rate=config.SAMPLE_RATE, chunk_size=config.CHUNK_SIZE)
+        self.engine = create_recognizer()
         
         # Initialize FREE offline TTS
         self.tts_engine = pyttsx3.init()
-        self.tts_engine.setProperty('rate', 175)
-        self.tts_engine.setProperty('volume', 0.9)
+        self.tts_engine.setProperty('rate', config.TTS_RATE)
+        self.tts_engine.setProperty('volume', config.TTS_VOLUME)
+        self.is_speaking = False
+        self._interrupted = threading.Event()
+        
+        # Fixed phrases are rendered once and played straight from disk
+        self.tts_settings = (self.tts_engine.getProperty('voice'), config.TTS_RATE, config.TTS_VOLUME)
+        self.tts_cache = TTSCache()
+        self.tts_warmer = CacheWarmer(self.tts_cache, *self.tts_settings)
+        self.tts_warmer.warm(config.PHRASES.values())
+        self._heard_once = OrderedDict()  # uncached short replies spoken once, oldest first
+        self._audio = None
+        self._cached_playback = True
         
-        # Adjust for ambient noise
-        print("🎙️  Calibrating microphone for ambient noise...")
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-        print("✅ Microphone ready!")
+        # Adjust for ambient noise while the rest of JARVIS starts; listen() waits for it.
+        # The audio pipeline tracks the noise floor itself and doesn't need this.
+        self.calibrated = threading.Event()
+        if calibrate:
+            threading.Thread(target=self._calibrate, name="jarvis-calibrate", daemon=True).start()
+        else:
+            self.calibrated.set()
+    
+    def _calibrate(self):
+        try:
+            with self.microphone as source:
+                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            print("✅ Microphone calibrated")
+        except Exception as e:
+            print(f"⚠️  Microphone calibration failed: {e}")
+        finally:
+            self.calibrated.set()
     
     def listen(self):
-        """Listen using FREE Google Speech Recognition (no API key needed)"""
+        """Listen for one phrase and recognize it (Google by default, no API key needed)"""
+        self.calibrated.wait()
         try:
             with self.microphone as source:
                 audio = self.recognizer.listen(
@@ -33,23 +97,157 @@ class VoiceHandler:
                     phrase_time_limit=config.PHRASE_TIME_LIMIT
                 )
             
-            # Use Google's FREE speech recognition
-            text = self.recognizer.recognize_google(audio)
-            return text
+            return self.recognize(audio)
                 
-        except sr.WaitTimeoutError:
-            return None
-        except sr.UnknownValueError:
+        except self.sr.WaitTimeoutError:
             return None
         except Exception as e:
             print(f"❌ Error in speech recognition: {e}")
             return None
     
+    def recognize(self, audio):
+        """Turn captured audio into text with the configured speech backend"""
+        with tracer.span("recognize"):
+            return self.engine.transcribe(audio.get_raw_data(convert_width=2), audio.sample_rate)
+    
     def speak(self, text):
         """FREE offline text-to-speech"""
+        self._interrupted.clear()
+        self._say(text)
+    
+    def _say(self, text):
         try:
             print(f"🔊 {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            self.is_speaking = True
+            with tracer.span("speak", chars=len(text)) as span:
+                cached = self._play_cached(text)
+                span.set(cached=cached)
+                if not cached:
+                    self.tts_engine.say(text)
+                    self.tts_engine.runAndWait()
         except Exception as e:
             print(f"❌ Error in text-to-speech: {e}")
+        finally:
+            self.is_speaking = False
+    
+    def _play_cached(self, text):
+        """Play a pre-rendered phrase; False when it has to be synthesized live"""
+        if not self._cached_playback or len(text) > config.TTS_CACHE_MAX_CHARS:
+            return False
+        path = self.tts_cache.lookup(text, *self.tts_settings)
+        if path is None:
+            # Short replies that come up twice (acknowledgements, errors) are worth rendering
+            if self._heard_once.pop(text, None):
+                self.tts_warmer.warm([text])
+            else:
+                self._heard_once[text] = True
+                if len(self._heard_once) > config.TTS_REPEAT_WINDOW:
+                    self._heard_once.popitem(last=False)
+            return False
+        
+        try:
+            wav = wave.open(str(path), "rb")
+        except (wave.Error, EOFError, OSError):
+            # Not a WAV this player understands (some drivers write AIFF)
+            self.tts_cache.discard(path)
+            return False
+        
+        with wav:
+            try:
+                stream = self._open_output(wav)
+            except Exception as e:
+                print(f"⚠️  Cached speech disabled, no audio output: {e}")
+                self._cached_playback = False
+                return False
+            try:
+                while not self._interrupted.is_set():
+                    frames = wav.readframes(config.CHUNK_SIZE)
+                    if not frames:
+                        break
+                    stream.write(frames)
+            finally:
+                stream.stop_stream()
+                stream.close()
+        return True
+    
+    def _open_output(self, wav):
+        import pyaudio
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        return self._audio.open(
+            format=self._audio.get_format_from_width(wav.getsampwidth()),
+            channels=wav.getnchannels(),
+            rate=wav.getframerate(),
+            output=True
+        )
+    
+    def stop_speaking(self):
+        """Barge-in: cut off the current utterance and anything still queued"""
+        if self.is_speaking:
+            print("✋ Interrupted")
+        self._interrupted.set()
+        try:
+            self.tts_engine.stop()
+        except Exception:
+            pass
+    
+    def speak_stream(self, chunks):
+        """
+        Speak a streamed response sentence by sentence.
+        The stream is consumed on a worker thread that queues finished sentences,
+        so the first sentence is spoken while the rest is still being generated.
+        Returns the full text, even if speech was interrupted part way.
+        """
+        self._interrupted.clear()
+        sentences = queue.Queue()
+        spoken = []
+        
+        def produce():
+            try:
+                for sentence in iter_sentences(chunks):
+                    sentences.put(sentence)
+            except Exception as e:
+                sentences.put(e)
+            finally:
+                sentences.put(None)
+        
+        # The producer runs the model, so it carries this turn's tracing context
+        threading.Thread(target=contextvars.copy_context().run, args=(produce,), daemon=True).start()
+        
+        # TTS stays on this thread; pyttsx3 engines are not thread-safe
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            if isinstance(sentence, Exception):
+                raise sentence
+            spoken.append(sentence)
+            if not self._interrupted.is_set():
+                self._say(sentence)
+        
+        return " ".join(spoken)
+
+
+class TextHandler:
+    """Console stand-in for VoiceHandler (python jarvis.py --text): typed commands, printed replies"""
+    
+    def __init__(self):
+        self.is_speaking = False
+    
+    def listen(self):
+        """Next typed command; EOFError at the end of input"""
+        return input("⌨️  ").strip() or None
+    
+    def speak(self, text):
+        print(f"🔊 {text}")
+    
+    def speak_stream(self, chunks):
+        """Print each sentence as soon as it is complete; returns the full text"""
+        spoken = []
+        for sentence in iter_sentences(chunks):
+            spoken.append(sentence)
+            self.speak(sentence)
+        return " ".join(spoken)
+    
+    def stop_speaking(self):
+        pass
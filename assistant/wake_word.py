@@ -0,0 +1,287 @@
+"""
+Wake Word - Voice activity detection and offline keyword spotting on raw PCM
+Every chunk from the microphone is analysed with NumPy before anything is
+sent to cloud recognition: a spectral VAD decides what is speech, and a DTW
+template matcher listens for the wake word. Templates are a few recordings
+of you saying the wake word, made once with:
+
+    python -m assistant.wake_word enroll
+"""
+
+import argparse
+import math
+import wave
+from pathlib import Path
+import numpy as np
+import config
+
+FRAME_MS = 25
+HOP_MS = 10
+MEL_BANDS = 24
+SPEECH_BAND = (300, 3400)  # Hz
+MIN_NOISE_FLOOR_DB = -70  # digital silence must not make the VAD hair-triggered
+HANGOVER_MS = 300  # keep spotting this long after speech stops
+
+
+def pcm_to_float(data):
+    """16-bit little-endian PCM bytes -> float32 samples in [-1, 1)"""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def mel_filterbank(sample_rate, n_fft, bands=MEL_BANDS, low=60.0, high=None):
+    """Triangular filters evenly spaced on the mel scale, shape (bands, n_fft // 2 + 1)"""
+    high = high or sample_rate / 2
+    to_mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    to_hz = lambda mel: 700 * (10 ** (mel / 2595) - 1)
+    edges = to_hz(np.linspace(to_mel(low), to_mel(high), bands + 2))
+    freqs = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class FrameAnalyzer:
+    """
+    Cuts a stream of PCM chunks into overlapping 25ms frames (10ms hop) and
+    computes, for all complete frames at once: level in dBFS, the share of
+    energy in the speech band, and log-mel band energies
+    """
+    
+    def __init__(self, sample_rate=None):
+        self.sample_rate = sample_rate or config.SAMPLE_RATE
+        self.frame = int(self.sample_rate * FRAME_MS / 1000)
+        self.hop = int(self.sample_rate * HOP_MS / 1000)
+        self.n_fft = 1 << (self.frame - 1).bit_length()
+        self.window = np.hanning(self.frame).astype(np.float32)
+        self.mel = mel_filterbank(self.sample_rate, self.n_fft).T
+        freqs = np.fft.rfftfreq(self.n_fft, 1 / self.sample_rate)
+        self.speech_bins = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+        self._tail = np.zeros(0, dtype=np.float32)
+    
+    def process(self, data):
+        """Returns (level_db, speech_ratio, log_mel) arrays, one row per new frame"""
+        samples = np.concatenate([self._tail, pcm_to_float(data)])
+        count = (len(samples) - self.frame) // self.hop + 1 if len(samples) >= self.frame else 0
+        self._tail = samples[count * self.hop:]
+        if count == 0:
+            return np.zeros(0), np.zeros(0), np.zeros((0, MEL_BANDS))
+        
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.frame)[::self.hop][:count]
+        level = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        spectrum = np.abs(np.fft.rfft(frames * self.window, self.n_fft)) ** 2
+        total = spectrum.sum(axis=1) + 1e-10
+        ratio = spectrum[:, self.speech_bins].sum(axis=1) / total
+        log_mel = np.log(spectrum @ self.mel + 1e-10)
+        return level, ratio, log_mel
+
+
+class VoiceActivityDetector:
+    """
+    A frame is speech when it is well above the background noise and most of
+    its energy sits in the speech band (so fans, hum and hiss don't count).
+    The noise floor follows quiet frames: down quickly, up slowly.
+    """
+    
+    def __init__(self, margin_db=None, min_ratio=None):
+        self.margin_db = margin_db if margin_db is not None else config.VAD_MARGIN_DB
+        self.min_ratio = min_ratio if min_ratio is not None else config.VAD_SPEECH_RATIO
+        self.noise_floor = None
+    
+    def frames(self, level, ratio, threshold_factor=1.0):
+        """Speech decision for each frame"""
+        if not len(level):
+            return np.zeros(0, dtype=bool)
+        if self.noise_floor is None:
+            self.noise_floor = max(MIN_NOISE_FLOOR_DB, float(np.min(level)))
+        
+        margin = self.margin_db + (20 * math.log10(threshold_factor) if threshold_factor > 1 else 0)
+        speech = (level > self.noise_floor + margin) & (ratio >= self.min_ratio)
+        
+        quiet = level[~speech]
+        if len(quiet):
+            background = float(np.mean(quiet))
+            rate = 0.5 if background < self.noise_floor else 0.05
+            self.noise_floor = max(MIN_NOISE_FLOOR_DB, self.noise_floor + rate * (background - self.noise_floor))
+        return speech
+    
+    def is_speech(self, level, ratio, threshold_factor=1.0):
+        """A chunk is speech when at least a third of its frames are"""
+        speech = self.frames(level, ratio, threshold_factor)
+        return bool(len(speech)) and speech.mean() >= 1 / 3
+
+
+def normalize_frames(log_mel):
+    """Remove each frame's overall level and scale to unit length (cosine features)"""
+    centered = log_mel - log_mel.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    return centered / np.maximum(norms, 1e-6)
+
+
+def subsequence_dtw(template, sequence):
+    """
+    Lowest average frame cost of aligning the whole template against any
+    stretch of sequence. Steps allow the speaker to be up to twice as fast or
+    slow as the template; each template frame is paid for exactly once.
+    """
+    cost = 1 - template @ sequence.T  # (template frames, sequence frames)
+    rows, cols = cost.shape
+    if cols < 2:
+        return math.inf
+    
+    before = np.full(cols, np.inf)
+    previous = cost[0].copy()  # the match may start anywhere
+    for i in range(1, rows):
+        best = np.full(cols, np.inf)
+        best[1:] = previous[:-1]
+        best[2:] = np.minimum(best[2:], previous[:-2])
+        best[1:] = np.minimum(best[1:], before[:-1] + cost[i - 1, 1:])
+        before, previous = previous, best + cost[i]
+    return float(previous.min()) / rows
+
+
+class KeywordSpotter:
+    """Matches the last couple of seconds of audio features against wake word templates"""
+    
+    def __init__(self, templates, threshold=None):
+        self.templates = [normalize_frames(t) for t in templates if len(t) >= 2]
+        if not self.templates:
+            raise ValueError("KeywordSpotter needs at least one template")
+        self.threshold = threshold if threshold is not None else config.WAKE_THRESHOLD
+        self.window = 2 * max(len(t) for t in self.templates)
+        self.min_frames = min(len(t) for t in self.templates) // 2
+        self.last_score = math.inf
+        self._history = np.zeros((0, MEL_BANDS))
+    
+    @classmethod
+    def from_directory(cls, directory=None, threshold=None):
+        """Load every WAV in directory as a template; None when nothing is enrolled"""
+        paths = sorted(Path(directory or config.WAKE_TEMPLATE_DIR).glob("*.wav"))
+        if not paths:
+            return None
+        return cls([load_template(path) for path in paths], threshold)
+    
+    def append(self, log_mel):
+        self._history = np.concatenate([self._history, log_mel])[-self.window:]
+    
+    def reset(self):
+        self._history = self._history[:0]
+    
+    def match(self):
+        """True when recent audio matches any template closely enough"""
+        if len(self._history) < self.min_frames:
+            return False
+        recent = normalize_frames(self._history)
+        self.last_score = min(subsequence_dtw(t, recent) for t in self.templates)
+        return self.last_score <= self.threshold
+
+
+def read_wav(path):
+    """Mono 16-bit WAV -> (pcm bytes, sample rate)"""
+    with wave.open(str(path), "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+def write_wav(path, data, sample_rate):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(data)
+
+
+def load_template(path):
+    """Log-mel frames of a recording, trimmed to the part that is speech"""
+    data, sample_rate = read_wav(path)
+    level, _, log_mel = FrameAnalyzer(sample_rate).process(data)
+    voiced = np.flatnonzero(level > level.max() - 30)
+    if not len(voiced):
+        return log_mel[:0]
+    return log_mel[voiced[0]:voiced[-1] + 1]
+
+
+class WakeWordDetector:
+    """
+    Per-chunk front end for the capture thread: returns (is_speech, wake_hit).
+    Without a spotter it is a plain VAD.
+    """
+    
+    def __init__(self, spotter=None, sample_rate=None):
+        self.analyzer = FrameAnalyzer(sample_rate)
+        self.vad = VoiceActivityDetector()
+        self.spotter = spotter
+        self.hangover = int(HANGOVER_MS / HOP_MS)
+        self._recent_speech = 0
+    
+    def process(self, data, threshold_factor=1.0, spot=True):
+        level, ratio, log_mel = self.analyzer.process(data)
+        speech = self.vad.is_speech(level, ratio, threshold_factor)
+        if self.spotter is None:
+            return speech, False
+        
+        # Spotting only runs during (and just after) speech, so silence costs one FFT per frame
+        self._recent_speech = self.hangover if speech else max(0, self._recent_speech - len(level))
+        self.spotter.append(log_mel)
+        if not (spot and self._recent_speech and self.spotter.match()):
+            return speech, False
+        self.spotter.reset()
+        return speech, True
+
+
+def enroll(count, directory):
+    import speech_recognition as sr
+    
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    recognizer = sr.Recognizer()
+    with sr.Microphone(sample_rate=config.SAMPLE_RATE, chunk_size=config.CHUNK_SIZE) as source:
+        print("🎙️  Calibrating microphone for ambient noise...")
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        for i in range(count):
+            print(f"🎤 ({i + 1}/{count}) Say '{config.WAKE_WORD}'...")
+            audio = recognizer.listen(source, phrase_time_limit=3)
+            path = directory / f"wake_{i + 1:02d}.wav"
+            write_wav(path, audio.get_raw_data(convert_rate=config.SAMPLE_RATE, convert_width=2), config.SAMPLE_RATE)
+            print(f"✅ Saved {path}")
+
+
+def test(paths, directory):
+    spotter = KeywordSpotter.from_directory(directory)
+    if spotter is None:
+        print(f"❌ No templates in {directory}; run: python -m assistant.wake_word enroll")
+        return
+    for path in paths:
+        data, sample_rate = read_wav(path)
+        detector = WakeWordDetector(spotter, sample_rate)
+        chunk = config.CHUNK_SIZE * 2
+        hits, best = [], math.inf
+        for offset in range(0, len(data), chunk):
+            _, hit = detector.process(data[offset:offset + chunk])
+            best = min(best, spotter.last_score)
+            if hit:
+                hits.append((offset + chunk) / 2 / sample_rate)
+        found = ", ".join(f"{t:.2f}s" for t in hits) or "no hit"
+        print(f"{path}: {found} (best score {best:.3f}, threshold {spotter.threshold})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline wake word templates")
+    parser.add_argument("--templates", default=str(config.WAKE_TEMPLATE_DIR), help="template directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enroll_parser = commands.add_parser("enroll", help="record the wake word a few times")
+    enroll_parser.add_argument("--count", type=int, default=5)
+    test_parser = commands.add_parser("test", help="run the spotter over WAV files")
+    test_parser.add_argument("wavs", nargs="+")
+    args = parser.parse_args()
+    
+    if args.command == "enroll":
+        enroll(args.count, args.templates)
+    else:
+        test(args.wavs, args.templates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Workspace Index - In-memory index of every file in the workspace
+Built on first use, then kept current incrementally: a background thread
+rescans only directories whose mtime changed (entries added, removed or
+renamed) and re-stats a slice of files each pass to catch in-place edits.
+JARVIS's own writes are applied immediately.
+
+Queries never touch the disk. Paths are kept in sorted lists, so everything
+under a directory, or every file with an extension, is one bisect away.
+"""
+
+import bisect
+import functools
+import os
+import re
+import threading
+import time
+from pathlib import Path
+import config
+
+END = "\U0010ffff"  # sorts after any path character; prefix + END bounds a prefix range
+RESTAT_BATCH = 2000  # files re-stat'ed per refresh to catch edits that keep the directory mtime
+CHANGE_LOG = 10000  # recent changes remembered for changes_since()
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _extension(path):
+    name = path.rsplit("/", 1)[-1]
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else ""
+
+
+def _segment_regex(segment):
+    out = []
+    i = 0
+    while i < len(segment):
+        c = segment[i]
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and segment.find("]", i + 2) > 0:
+            end = segment.find("]", i + 2)
+            body = segment[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=256)
+def glob_regex(pattern):
+    """Compile a glob where * and ? stay within one directory and ** spans any number"""
+    segments = pattern.split("/")
+    parts = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if last else "(?:[^/]+/)*")
+        else:
+            parts.append(_segment_regex(segment) + ("" if last else "/"))
+    return re.compile("".join(parts) + r"\Z")
+
+
+def has_magic(pattern):
+    return any(c in pattern for c in "*?[")
+
+
+class WorkspaceIndex:
+    def __init__(self, root, refresh_interval=None):
+        self.root = Path(root)
+        self.refresh_interval = refresh_interval if refresh_interval is not None else config.INDEX_REFRESH_INTERVAL
+        self.files = {}  # path -> (size, mtime_ns)
+        self.dirs = {}  # directory ("" is the root) -> mtime_ns when last listed
+        self.build_seconds = None
+        self.version = 0  # bumped on every change, so followers know when to look again
+        self._changes = []  # paths changed since version _changes_from, oldest first
+        self._changes_from = 0
+        self._children = {}  # directory -> {name: is_dir}
+        self._paths = []  # every file, sorted
+        self._by_ext = {}  # extension -> sorted paths
+        self._by_name = {}  # file name -> set of paths
+        self._totals = {}  # directory -> [files, bytes] for its whole subtree
+        self._restat_from = 0
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    # ----- building and keeping current -----
+    
+    def ensure_built(self):
+        with self._lock:
+            if self.build_seconds is not None:
+                return
+            start = time.perf_counter()
+            self._scan("", bulk=True)
+            self._paths.sort()
+            for paths in self._by_ext.values():
+                paths.sort()
+            self._changes_from = self.version
+            self.build_seconds = time.perf_counter() - start
+        if self.refresh_interval:
+            self._thread = threading.Thread(target=self._refresh_loop, name="jarvis-index", daemon=True)
+            self._thread.start()
+    
+    def close(self):
+        self._stop.set()
+    
+    def _full(self, rel):
+        return self.root / rel if rel else self.root
+    
+    def _scan(self, directory, bulk=False):
+        """Index a directory tree that is not in the index yet"""
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                mtime = os.stat(self._full(current)).st_mtime_ns
+                entries = list(os.scandir(self._full(current)))
+            except OSError:
+                continue
+            self.dirs[current] = mtime
+            children = self._children.setdefault(current, {})
+            self._totals.setdefault(current, [0, 0])
+            for entry in entries:
+                if entry.name in config.INDEX_IGNORE:
+                    continue
+                path = f"{current}/{entry.name}" if current else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        children[entry.name] = True
+                        pending.append(path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        children[entry.name] = False
+                        self._add_file(path, stat.st_size, stat.st_mtime_ns, bulk)
+                except OSError:
+                    continue
+    
+    def _ancestors(self, path):
+        parts = path.split("/")[:-1]
+        yield ""
+        for i in range(1, len(parts) + 1):
+            yield "/".join(parts[:i])
+    
+    def _adjust_totals(self, path, files, size):
+        for directory in self._ancestors(path):
+            totals = self._totals.setdefault(directory, [0, 0])
+            totals[0] += files
+            totals[1] += size
+    
+    def _changed(self, path, bulk=False):
+        self.version += 1
+        if bulk:
+            return
+        self._changes.append(path)
+        if len(self._changes) > CHANGE_LOG:
+            drop = len(self._changes) - CHANGE_LOG // 2
+            del self._changes[:drop]
+            self._changes_from += drop
+    
+    def _add_file(self, path, size, mtime, bulk=False):
+        previous = self.files.get(path)
+        self.files[path] = (size, mtime)
+        self._changed(path, bulk)
+        if previous is not None:
+            self._adjust_totals(path, 0, size - previous[0])
+            return
+        self._adjust_totals(path, 1, size)
+        ext_paths = self._by_ext.setdefault(_extension(path), [])
+        if bulk:
+            self._paths.append(path)
+            ext_paths.append(path)
+        else:
+            bisect.insort(self._paths, path)
+            bisect.insort(ext_paths, path)
+        self._by_name.setdefault(path.rsplit("/", 1)[-1], set()).add(path)
+    
+    def _remove_file(self, path):
+        size, _ = self.files.pop(path)
+        self._changed(path)
+        self._adjust_totals(path, -1, -size)
+        for paths in (self._paths, self._by_ext.get(_extension(path), [])):
+            i = bisect.bisect_left(paths, path)
+            if i < len(paths) and paths[i] == path:
+                del paths[i]
+        names = self._by_name.get(path.rsplit("/", 1)[-1])
+        if names is not None:
+            names.discard(path)
+            if not names:
+                del self._by_name[path.rsplit("/", 1)[-1]]
+    
+    def _remove_dir(self, directory):
+        for name, is_dir in self._children.pop(directory, {}).items():
+            path = f"{directory}/{name}" if directory else name
+            if is_dir:
+                self._remove_dir(path)
+            elif path in self.files:
+                self._remove_file(path)
+        self.dirs.pop(directory, None)
+        self._totals.pop(directory, None)
+    
+    def _rescan_dir(self, directory):
+        """Bring one directory's direct entries up to date"""
+        full = self._full(directory)
+        try:
+            mtime = os.stat(full).st_mtime_ns
+            entries = {e.name: e for e in os.scandir(full) if e.name not in config.INDEX_IGNORE}
+        except OSError:
+            self._remove_dir(directory)
+            parent, _, name = directory.rpartition("/")
+            self._children.get(parent, {}).pop(name, None)
+            return
+        self.dirs[directory] = mtime
+        children = self._children.setdefault(directory, {})
+        
+        for name in list(children):
+            if name not in entries:
+                path = f"{directory}/{name}" if directory else name
+                if children.pop(name):
+                    self._remove_dir(path)
+                elif path in self.files:
+                    self._remove_file(path)
+        
+        for name, entry in entries.items():
+            path = f"{directory}/{name}" if directory else name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if children.get(name) is not True:
+                        children[name] = True
+                        self._scan(path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    children[name] = False
+                    if self.files.get(path) != (stat.st_size, stat.st_mtime_ns):
+                        self._add_file(path, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+    
+    def refresh(self):
+        """One incremental pass: changed directories, plus a slice of file re-stats"""
+        with self._lock:
+            known = list(self.dirs.items())
+            start = self._restat_from
+            batch = self._paths[start:start + RESTAT_BATCH]
+            self._restat_from = 0 if start + RESTAT_BATCH >= len(self._paths) else start + RESTAT_BATCH
+        
+        # stat() outside the lock so queries are never held up by disk I/O
+        changed = []
+        for directory, mtime in known:
+            try:
+                if os.stat(self._full(directory)).st_mtime_ns != mtime:
+                    changed.append(directory)
+            except OSError:
+                changed.append(directory)
+        edited = []
+        for path in batch:
+            try:
+                stat = os.stat(self.root / path)
+                edited.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                pass
+        
+        with self._lock:
+            for directory in changed:
+                if directory in self.dirs:
+                    self._rescan_dir(directory)
+            for path, size, mtime in edited:
+                if path in self.files and self.files[path] != (size, mtime):
+                    self._add_file(path, size, mtime)
+        return len(changed)
+    
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Workspace index refresh failed: {e}")
+    
+    def update(self, path):
+        """Apply a change JARVIS made itself (write, create, delete) right away"""
+        if self.build_seconds is None:
+            return
+        path = os.path.normpath(path).replace(os.sep, "/")
+        parent, _, name = path.rpartition("/")
+        with self._lock:
+            directory = parent
+            while directory not in self.dirs:
+                directory = directory.rpartition("/")[0]
+            if directory != parent:
+                # New directories: index them from the deepest one already known
+                self._rescan_dir(directory)
+                return
+            try:
+                stat = os.stat(self.root / path)
+            except OSError:
+                stat = None
+            if stat is None or not os.path.isfile(self.root / path):
+                self._children[parent].pop(name, None)
+                if path in self.files:
+                    self._remove_file(path)
+                return
+            self._children[parent][name] = False
+            self._add_file(path, stat.st_size, stat.st_mtime_ns)
+    
+    # ----- queries (in memory only) -----
+    
+    @staticmethod
+    def _prefix(directory):
+        directory = os.path.normpath(directory or ".").replace(os.sep, "/")
+        return "" if directory == "." else directory.rstrip("/") + "/"
+    
+    def _range(self, paths, prefix):
+        return bisect.bisect_left(paths, prefix), bisect.bisect_left(paths, prefix + END)
+    
+    def snapshot(self):
+        """(version, {path: (size, mtime_ns)}) for code that mirrors the workspace"""
+        self.ensure_built()
+        with self._lock:
+            return self.version, dict(self.files)
+    
+    def changes_since(self, version):
+        """Paths added, changed or removed after version; None when that is too long ago to know"""
+        with self._lock:
+            if version < self._changes_from:
+                return None
+            return set(self._changes[version - self._changes_from:])
+    
+    def totals(self, directory="."):
+        """(files, bytes) under directory, recursively"""
+        self.ensure_built()
+        with self._lock:
+            files, size = self._totals.get(self._prefix(directory).rstrip("/"), (0, 0))
+            return files, size
+    
+    def children(self, directory="."):
+        """Direct entries of a directory: (sorted subdirectory names, sorted [(file name, size)])"""
+        self.ensure_built()
+        rel = self._prefix(directory).rstrip("/")
+        with self._lock:
+            if rel not in self.dirs:
+                raise FileNotFoundError(directory)
+            # One stat keeps single-directory listings exact between background refreshes
+            try:
+                current = os.stat(self._full(rel)).st_mtime_ns
+            except OSError:
+                current = None
+            if current != self.dirs[rel]:
+                self._rescan_dir(rel)
+            entries = self._children.get(rel, {})
+            subdirs = sorted(name for name, is_dir in entries.items() if is_dir)
+            files = sorted(
+                (name, self.files[f"{rel}/{name}" if rel else name][0])
+                for name, is_dir in entries.items()
+                if not is_dir and (f"{rel}/{name}" if rel else name) in self.files
+            )
+            return subdirs, files
+    
+    def walk(self, directory=".", max_depth=None, limit=None):
+        """Files under directory in path order: ([(path, size)], more_left)"""
+        self.ensure_built()
+        prefix = self._prefix(directory)
+        limit = limit or config.INDEX_MAX_RESULTS
+        results = []
+        with self._lock:
+            lo, hi = self._range(self._paths, prefix)
+            for i in range(lo, hi):
+                path = self._paths[i]
+                if max_depth is not None and path.count("/", len(prefix)) >= max_depth:
+                    continue
+                if len(results) == limit:
+                    return results, True
+                results.append((path, self.files[path][0]))
+        return results, False
+    
+    def glob(self, pattern, directory=".", limit=None):
+        """
+        Files matching a glob under directory: ([(path, size)], more_left).
+        A pattern without a slash matches file names at any depth.
+        """
+        self.ensure_built()
+        prefix = self._prefix(directory)
+        limit = limit or config.INDEX_MAX_RESULTS
+        pattern = pattern.strip()
+        while pattern.startswith("./"):
+            pattern = pattern[2:]
+        anywhere = "/" not in pattern
+        
+        with self._lock:
+            if anywhere and not has_magic(pattern):
+                matches = sorted(p for p in self._by_name.get(pattern, ()) if p.startswith(prefix))
+                return [(p, self.files[p][0]) for p in matches[:limit]], len(matches) > limit
+            
+            regex = glob_regex("**/" + pattern if anywhere else pattern)
+            # Narrow the candidates: a literal extension picks one sorted list,
+            # leading literal directories narrow the range within it
+            ext = re.fullmatch(r"\*(\.[^*?\[\]/]+)", pattern.rsplit("/", 1)[-1])
+            candidates = self._by_ext.get(ext.group(1).lower(), []) if ext else self._paths
+            literal = prefix
+            if not anywhere:
+                for segment in pattern.split("/")[:-1]:
+                    if has_magic(segment):
+                        break
+                    literal += segment + "/"
+            
+            results = []
+            lo, hi = self._range(candidates, literal)
+            for i in range(lo, hi):
+                path = candidates[i]
+                if regex.match(path, len(prefix)):
+                    if len(results) == limit:
+                        return results, True
+                    results.append((path, self.files[path][0]))
+            return results, False
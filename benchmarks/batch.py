@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark - batch mode throughput as the worker pool grows
+Replays a command file (benchmarks/data/recorded_commands.txt by default,
+optionally several times over) through BatchRunner against the in-process
+mock LLM server, with 1, 4, 16 and 32 sessions running at once.
+
+Usage: python benchmarks/batch.py [--commands FILE] [--repeat 1] [--latency 0.2]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.batch import BatchRunner, create_batch_backend, group_sessions, parse_commands
+from assistant.code_handler import CodeHandler
+from assistant.memory import Memory
+from assistant.tracing import quantile
+
+WORKERS = [1, 4, 16, 32]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=Path, default=ROOT / "benchmarks" / "data" / "recorded_commands.txt")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM seconds before the first token")
+    args = parser.parse_args()
+
+    (config.WORKSPACE_DIR / "notes.txt").write_text("remember to profile the voice loop\n")
+    with open(args.commands, encoding="utf-8") as f:
+        sessions = group_sessions(parse_commands(f), args.repeat)
+    count = sum(len(commands) for commands in sessions.values())
+    print(f"{count} commands in {len(sessions)} sessions, mock LLM latency {args.latency}s\n")
+    print(f"{'workers':>8}{'wall':>9}{'cmd/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+
+    for workers in WORKERS:
+        backend, server = create_batch_backend("fake", latency=args.latency, token_latency=0.005)
+        with contextlib.redirect_stdout(io.StringIO()):
+            memory = Memory(config.WORKSPACE_DIR)
+            code_handler = CodeHandler(memory=memory)
+            # A fresh CodeHandler each round, so no round reuses another's cached answers
+            runner = BatchRunner(backend, code_handler, memory, workers)
+            results = runner.run(sessions)
+        server.stop()
+        latencies = sorted(r["ms"] for r in results)
+        errors = sum(1 for r in results if r["error"])
+        print(f"{workers:>8}{runner.elapsed:>8.2f}s{len(results) / runner.elapsed:>9.1f}"
+              f"{quantile(latencies, 0.5):>7.0f}ms{quantile(latencies, 0.95):>7.0f}ms"
+              f"{quantile(latencies, 0.99):>7.0f}ms{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
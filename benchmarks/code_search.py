@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark - search_code's trigram index vs a naive scan of every file
+Generates a synthetic code workspace, then times the first (cold) index
+build, reopening the persisted index, queries of varying selectivity, and
+re-indexing after a write.
+
+Usage: python benchmarks/code_search.py [--files 20000] [--lines 120]
+"""
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.code_search import CodeSearch, query_trigrams, required_literals
+from assistant.workspace_index import WorkspaceIndex
+
+WORDS = ["self", "return", "value", "result", "config", "items", "data", "index", "name", "path",
+         "count", "total", "buffer", "request", "response", "handler", "client", "user", "cache", "error"]
+QUERIES = [
+    ("rare identifier", "def compute_checksum_4242", False),
+    ("uncommon word", "handler_17", False),
+    ("common word", "return", False),
+    ("regex", r"class Widget\d+7\(", True),
+    ("no match", "frobnicate_the_zorb", False),
+]
+ROUNDS = 20
+
+
+def generate(root, files, lines):
+    rng = random.Random(7)
+    for i in range(files):
+        directory = root / f"pkg_{i % 50}" / f"mod_{i // 50 % 20}"
+        directory.mkdir(parents=True, exist_ok=True)
+        body = [f"class Widget{i}(Base):", f"    def compute_checksum_{i}(self, {rng.choice(WORDS)}):"]
+        for _ in range(lines - 2):
+            a, b, c = rng.sample(WORDS, 3)
+            body.append(f"        {a} = {b}.{c}_{rng.randrange(100)}({rng.randrange(1000)})")
+        body.append("        return result")
+        (directory / f"widget_{i}.py").write_text("\n".join(body) + "\n")
+
+
+def naive(root, query, regex):
+    pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE)
+    matches = 0
+    for path in sorted(root.rglob("*.py")):
+        for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+            if pattern.search(line):
+                matches += 1
+                if matches == 50:
+                    return matches
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--lines", type=int, default=120)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate(root, args.files, args.lines)
+        size = sum(p.stat().st_size for p in root.rglob("*.py"))
+        print(f"{args.files} files, {size / 1e6:.0f} MB\n")
+        
+        index = WorkspaceIndex(root, refresh_interval=0)
+        search = CodeSearch(index)
+        start = time.perf_counter()
+        search.sync()
+        print(f"cold index build: {time.perf_counter() - start:.1f}s "
+              f"({len(search._keys)} trigrams, {search._postings.nbytes / 1e6:.0f} MB postings)")
+        db = search.db_file.stat().st_size
+        
+        start = time.perf_counter()
+        reopened = CodeSearch(index)
+        reopened.sync()
+        print(f"reopen from {search.db_file.name} ({db / 1e6:.0f} MB): {time.perf_counter() - start:.2f}s\n")
+        
+        print(f"{'query':<18}{'matches':>9}{'candidates':>12}{'p50':>10}{'naive':>10}")
+        for label, query, regex in QUERIES:
+            samples = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                matches, more = search.search(query, regex=regex)
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            codes = query_trigrams(required_literals(query) if regex else [query], False)
+            opened = len(search._candidates(codes))
+            start = time.perf_counter()
+            naive(root, query, regex)
+            scan = time.perf_counter() - start
+            shown = f"{len(matches)}{'+' if more else ''}"
+            print(f"{label:<18}{shown:>9}{opened:>12}{samples[len(samples) // 2] * 1000:>8.1f}ms{scan * 1000:>8.0f}ms")
+        
+        path = "pkg_0/mod_0/widget_0.py"
+        (root / path).write_text("def freshly_written():\n    pass\n")
+        start = time.perf_counter()
+        index.update(path)
+        search.update(path)
+        found, _ = search.search("freshly_written")
+        print(f"\nwrite -> re-index -> found: {(time.perf_counter() - start) * 1000:.1f}ms ({len(found)} match)")
+        search.conn.close()
+        reopened.conn.close()
+
+
+if __name__ == "__main__":
+    main()
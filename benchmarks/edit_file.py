@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark - output tokens and turn latency of small edits: write_file vs edit_file
+Each task changes a few lines of one of JARVIS's own source files, copied
+into a scratch workspace. The fake model makes the change three ways: by
+resending the whole file, with search/replace edits, and with a unified
+diff. Output tokens are estimated like ContextWindow does; latency comes
+from the fake backend generating tool arguments at --token-latency.
+
+Usage: python benchmarks/edit_file.py [--token-latency 0.004]
+"""
+
+import argparse
+import contextlib
+import difflib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.context_window import estimate_tokens
+from benchmarks.fake_llm import FakeClient
+
+# (file, request, [(search, replace), ...]); search texts carry a line of context like a model would
+TASKS = [
+    ("config.py", "raise the cache TTL to two hours", [
+        ("CACHE_MAX_BYTES = 32 * 1024 * 1024  # file reads, listings and answers\nCACHE_TTL = 3600  # seconds",
+         "CACHE_MAX_BYTES = 32 * 1024 * 1024  # file reads, listings and answers\nCACHE_TTL = 7200  # seconds"),
+    ]),
+    ("assistant/cache.py", "count puts in the cache stats", [
+        ("        self.invalidations = 0\n",
+         "        self.invalidations = 0\n        self.puts = 0\n"),
+        ("        tags = {normalize_path(t) for t in tags}\n        with self._lock:\n",
+         "        tags = {normalize_path(t) for t in tags}\n        with self._lock:\n            self.puts += 1\n"),
+    ]),
+    ("assistant/intent_router.py", "also accept 'see you jarvis' as goodbye", [
+        ('    ("exit", r".*\\b(?:goodbye|bye|exit) jarvis\\b.*", 1.0),\n',
+         '    ("exit", r".*\\b(?:goodbye|bye|exit) jarvis\\b.*", 1.0),\n    ("exit", r"see you(?: later)? jarvis", 1.0),\n'),
+    ]),
+    ("jarvis.py", "make the ready message say it is listening", [
+        ('    print(f"✅ JARVIS is ready!")\n',
+         '    print(f"✅ JARVIS is ready and listening!")\n'),
+    ]),
+    ("assistant/memory.py", "show ten recent files in the context summary", [
+        ("        recent_projects = self.get_recent_projects(3)\n        recent_files = self.get_recent_files(5)\n",
+         "        recent_projects = self.get_recent_projects(3)\n        recent_files = self.get_recent_files(10)\n"),
+    ]),
+    ("assistant/context_window.py", "document that fit may fold turns into the summary", [
+        ("        Returns the messages to send: system prompt, running summary, history.\n",
+         "        Returns the messages to send: system prompt, running summary, history.\n"
+         "        Turns that don't fit are folded into the running summary.\n"),
+    ]),
+]
+
+
+def tool_calls(path, original, changes):
+    expected = original
+    for search, replace in changes:
+        expected = expected.replace(search, replace, 1)
+    diff = "".join(difflib.unified_diff(
+        original.splitlines(keepends=True), expected.splitlines(keepends=True),
+        f"a/{path}", f"b/{path}", n=2
+    ))
+    edits = [{"search": search, "replace": replace} for search, replace in changes]
+    return expected, {
+        "write_file": ("write_file", {"file_path": path, "content": expected}),
+        "edit_file (edits)": ("edit_file", {"file_path": path, "edits": edits}),
+        "edit_file (diff)": ("edit_file", {"file_path": path, "diff": diff}),
+    }
+
+
+def run(code_handler, request, call, token_latency):
+    brain = AIBrain(backend=FakeClient(
+        [{"tool_calls": [call]}, {"content": "Done."}],
+        first_token_latency=0.3, token_latency=token_latency
+    ))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        brain.process_command(request, code_handler)
+    elapsed = time.perf_counter() - start
+    message = next(m for m in brain.conversation_history if m.get("tool_calls"))
+    result = next(m for m in brain.conversation_history if m["role"] == "tool")["content"]
+    return estimate_tokens(message), elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-latency", type=float, default=0.004, help="seconds per generated token")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        code_handler = CodeHandler()
+    approaches = ["write_file", "edit_file (edits)", "edit_file (diff)"]
+    totals = {name: [0, 0.0] for name in approaches}
+
+    print(f"{'task':<52}" + "".join(f"{name:>22}" for name in approaches))
+    for path, request, changes in TASKS:
+        target = config.WORKSPACE_DIR / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        original = (ROOT / path).read_text(encoding="utf-8")
+        if any(search not in original for search, _ in changes):
+            print(f"{path}: source changed, task skipped")
+            continue
+        expected, calls = tool_calls(path, original, changes)
+
+        row = []
+        for name in approaches:
+            shutil.copyfile(ROOT / path, target)
+            tokens, elapsed, result = run(code_handler, request, calls[name], args.token_latency)
+            if target.read_text(encoding="utf-8") != expected:
+                raise SystemExit(f"{name} on {path} gave the wrong result: {result}")
+            totals[name][0] += tokens
+            totals[name][1] += elapsed
+            row.append(f"{tokens:>6} tok {elapsed * 1000:>7.0f}ms")
+        print(f"{path + ': ' + request:<52.52}" + "".join(f"{cell:>22}" for cell in row))
+
+    base_tokens, base_time = totals["write_file"]
+    print()
+    for name in approaches:
+        tokens, elapsed = totals[name]
+        print(f"{name:<20} {tokens:>7} output tokens ({tokens / base_tokens:>5.1%})  "
+              f"{elapsed:>6.2f}s total ({elapsed / base_time:>5.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Fake LLM backend for benchmarks
+Mimics LLMBackend.create (plain and streamed) from a script, with configurable
+latency, so AIBrain can be driven in-process without network access.
+Tool call arguments are generated token by token too (~4 characters each).
+"""
+
+import itertools
+import json
+import re
+import time
+from types import SimpleNamespace
+
+
+def argument_tokens(call):
+    return len(call.function.arguments) // 4
+
+
+class FakeToolCall:
+    def __init__(self, call_id, name, arguments):
+        self.id = call_id
+        self.type = "function"
+        self.function = SimpleNamespace(name=name, arguments=json.dumps(arguments))
+
+    def model_dump(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "function": {"name": self.function.name, "arguments": self.function.arguments}
+        }
+
+
+class FakeClient:
+    """
+    script: list of turns, consumed one per create() call (cycled when exhausted).
+    A turn is either {"content": "..."} or {"tool_calls": [(name, {args}), ...]}.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, script, first_token_latency=0.3, token_latency=0.02):
+        self.script = itertools.cycle(script)
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.requests = []
+
+    def create(self, model=None, messages=None, tools=None, tool_choice=None, stream=False, **kwargs):
+        self.requests.append({"messages": messages, "tools": tools, "stream": stream})
+        turn = next(self.script)
+        tool_calls = [FakeToolCall(f"call_{next(self._ids)}", name, args) for name, args in turn.get("tool_calls", [])]
+        content = turn.get("content")
+
+        if stream:
+            return self._stream(content, tool_calls)
+
+        tokens = len(re.findall(r"\S+\s*", content or "")) + sum(argument_tokens(call) for call in tool_calls)
+        time.sleep(self.first_token_latency + self.token_latency * tokens)
+        message = SimpleNamespace(content=content, tool_calls=tool_calls or None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, content, tool_calls):
+        time.sleep(self.first_token_latency)
+        for index, call in enumerate(tool_calls):
+            time.sleep(self.token_latency * argument_tokens(call))
+            piece = SimpleNamespace(index=index, id=call.id, function=call.function)
+            yield self._chunk(None, [piece])
+        for token in re.findall(r"\S+\s*", content or ""):
+            time.sleep(self.token_latency)
+            yield self._chunk(token, None)
+
+    def _chunk(self, content, tool_calls):
+        delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark - local intent router hit rate and latency on recorded commands
+Commands are one per line in benchmarks/data/recorded_commands.txt (as
+transcribed by speech recognition)
+
+Usage: python benchmarks/intent_router.py [--llm-latency SECONDS]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.intent_router import IntentRouter
+
+CORPUS = Path(__file__).parent / "data" / "recorded_commands.txt"
+EXISTING_FILES = ["calculator.py", "main.py", "app.py", "config.py", "notes.txt", "utils.py", "web_app/main.py"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency", type=float, default=0.9,
+                        help="typical LLM round-trip in seconds, used to estimate savings")
+    args = parser.parse_args()
+
+    commands = [line.strip() for line in CORPUS.read_text().splitlines() if line.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in EXISTING_FILES:
+            path = Path(tmp) / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("print('hello')\n")
+        router = IntentRouter(workspace=tmp)
+
+        intents = Counter()
+        timings = []
+        for command in commands:
+            start = time.perf_counter()
+            intent = router.route(command)
+            timings.append(time.perf_counter() - start)
+            intents[intent.name if intent else "llm"] += 1
+            print(f"  {intent.name if intent else '-> llm':<12} {command}")
+
+    hits = len(commands) - intents["llm"]
+    # Exit/pause never reached the LLM before either; only file commands save a round-trip
+    saved = intents["list_files"] + intents["read_file"]
+    print(f"\n{len(commands)} commands, {hits} handled locally ({hits / len(commands):.0%})")
+    for name, count in intents.most_common():
+        print(f"  {name:<12} {count}")
+    print(f"router latency: median {statistics.median(timings) * 1e6:.1f}us, max {max(timings) * 1e6:.1f}us")
+    print(f"LLM round-trips avoided: {saved}/{len(commands) - intents['exit'] - intents['pause']}, "
+          f"about {saved * args.llm_latency:.1f}s saved at {args.llm_latency:.2f}s each")
+
+
+if __name__ == "__main__":
+    main()
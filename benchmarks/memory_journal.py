@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark - per-activity cost and load time of Memory as the knowledge graph grows
+Compares the journaled store against the old full-file JSON rewrite
+
+Usage: python benchmarks/memory_journal.py
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.memory import Memory
+
+SIZES = [1_000, 10_000, 100_000]
+ACTIVITIES = 200
+ACTIVITIES_PER_TURN = 4
+
+
+def populate(memory, count):
+    """Fill the graph with synthetic files and fold them into the snapshot"""
+    for i in range(count):
+        path = f"project_{i % 50}/pkg_{i % 7}/module_{i}.py"
+        memory.record_file_activity(path, "created")
+        memory.detect_project(path)
+    memory.flush()
+    memory.compact()
+
+
+def time_journaled(memory):
+    start = time.perf_counter()
+    for i in range(ACTIVITIES):
+        path = f"project_{i % 50}/hot_{i % 10}.py"
+        memory.record_file_activity(path, "read")
+        memory.detect_project(path)
+        if i % ACTIVITIES_PER_TURN == 0:
+            memory.flush()
+    memory.flush()
+    return (time.perf_counter() - start) / ACTIVITIES
+
+
+def time_full_rewrite(memory):
+    """What every record_file_activity/detect_project call used to cost"""
+    start = time.perf_counter()
+    for _ in range(10):
+        with open(memory.memory_file, 'w') as f:
+            json.dump(memory.knowledge_graph, f, indent=2)
+    # Two rewrites per tool call
+    return (time.perf_counter() - start) / 10 * 2
+
+
+def time_load(workspace):
+    start = time.perf_counter()
+    Memory(workspace)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'files':>8} {'snapshot':>10} {'load':>8} {'journaled/op':>14} {'rewrite/op':>12}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            memory = Memory(Path(tmp))
+            memory.flush_interval = float("inf")
+            memory.compact_threshold = float("inf")
+            populate(memory, size)
+            snapshot_kb = memory.memory_file.stat().st_size / 1024
+            load = time_load(Path(tmp))
+            journaled = time_journaled(memory)
+            rewrite = time_full_rewrite(memory)
+            print(f"{size:>8} {snapshot_kb:>8.0f}KB {load * 1e3:>6.0f}ms "
+                  f"{journaled * 1e6:>12.1f}us {rewrite * 1e6:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
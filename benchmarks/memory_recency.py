@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark - recency queries on Memory at 10k/100k/1M tracked files
+Compares the recency index against a full sort of every entry
+
+Usage: python benchmarks/memory_recency.py
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.memory import Memory
+
+SIZES = [10_000, 100_000, 1_000_000]
+QUERIES = 200
+
+
+def synthetic_memory(workspace, count):
+    """Build the graph directly; going through record_file_activity would dominate"""
+    memory = Memory(workspace)
+    start = datetime(2024, 1, 1)
+    files = memory.knowledge_graph["files"]
+    for i in range(count):
+        # Scramble timestamps so insertion order says nothing about recency
+        ts = (start + timedelta(seconds=(i * 7919) % count)).isoformat()
+        files[f"project_{i % 100}/module_{i}.py"] = {
+            "created": ts,
+            "last_modified": ts,
+            "access_count": 1,
+            "actions": [],
+            "action_counts": {},
+            "daily": {}
+        }
+    return memory
+
+
+def full_sort(memory, limit):
+    """What get_recent_files used to do on every call"""
+    files = [
+        {"path": path, "last_modified": data["last_modified"], "access_count": data["access_count"]}
+        for path, data in memory.knowledge_graph["files"].items()
+    ]
+    files.sort(key=lambda x: x["last_modified"], reverse=True)
+    return files[:limit]
+
+
+def main():
+    print(f"{'files':>9} {'index build':>12} {'indexed top-5':>14} {'full sort':>11} {'summary (cached)':>17}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            memory = synthetic_memory(Path(tmp), size)
+            
+            start = time.perf_counter()
+            memory.get_recent_files(5)
+            build = time.perf_counter() - start
+            
+            assert [f["path"] for f in memory.get_recent_files(5)] == [f["path"] for f in full_sort(memory, 5)]
+            
+            start = time.perf_counter()
+            for i in range(QUERIES):
+                memory.record_file_activity(f"project_{i % 100}/module_{i}.py", "read")
+                memory.get_recent_files(5)
+            indexed = (time.perf_counter() - start) / QUERIES
+            
+            runs = 3
+            start = time.perf_counter()
+            for _ in range(runs):
+                full_sort(memory, 5)
+            sort = (time.perf_counter() - start) / runs
+            
+            memory.get_context_summary()
+            start = time.perf_counter()
+            for _ in range(QUERIES):
+                memory.get_context_summary()
+            summary = (time.perf_counter() - start) / QUERIES
+            
+            memory._pending = []
+            print(f"{size:>9} {build * 1e3:>10.0f}ms {indexed * 1e6:>12.1f}us "
+                  f"{sort * 1e3:>9.1f}ms {summary * 1e6:>15.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark - N parallel read_file calls in one model turn, sequential vs thread pool
+A scripted fake client asks for N reads at once; file access is slowed down
+to mimic a network or cold disk, where concurrency matters most
+
+Usage: python benchmarks/parallel_tools.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.memory import Memory
+from benchmarks.fake_llm import FakeClient
+
+FILE_COUNTS = [4, 16, 64]
+READ_LATENCY = 0.02  # seconds per read
+
+
+class SlowCodeHandler(CodeHandler):
+    def read_file(self, file_path):
+        time.sleep(READ_LATENCY)
+        return super().read_file(file_path)
+
+
+def run(code_handler, memory, count, workers):
+    config.TOOL_WORKERS = workers
+    reads = [("read_file", {"file_path": f"project/module_{i}.py"}) for i in range(count)]
+    client = FakeClient([{"tool_calls": reads}, {"content": "Done."}], first_token_latency=0, token_latency=0)
+    brain = AIBrain(memory=memory, backend=client)
+
+    start = time.perf_counter()
+    brain.process_command("read every module", code_handler)
+    elapsed = time.perf_counter() - start
+
+    results = [m for m in brain.conversation_history if m["role"] == "tool"]
+    assert len(results) == count and all(r["content"].startswith("Successfully read") for r in results)
+    return elapsed
+
+
+def main():
+    memory = Memory(config.WORKSPACE_DIR)
+    for i in range(max(FILE_COUNTS)):
+        path = config.WORKSPACE_DIR / "project" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"def function_{i}():\n    return {i}\n" * 200)
+
+    print(f"{'reads':>6} {'sequential':>11} {'pooled (8)':>11} {'speedup':>8}")
+    for count in FILE_COUNTS:
+        # Each mode gets its own handler, so the pooled run can't read from the sequential run's cache
+        sequential = run(SlowCodeHandler(memory=memory), memory, count, workers=1)
+        pooled = run(SlowCodeHandler(memory=memory), memory, count, workers=8)
+        print(f"{count:>6} {sequential * 1e3:>9.0f}ms {pooled * 1e3:>9.0f}ms {sequential / pooled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
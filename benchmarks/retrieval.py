@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark - BM25 context retrieval over a large workspace
+Generates a synthetic code workspace, then measures the index build, its
+memory, query latency (ranking alone and the snippets a turn gets), writes
+re-indexed one at a time, and querying with a full overlay before it is
+merged. It also checks how often the file a question is about reaches the
+model: in the retrieved snippets, against the memory's recency-only summary
+of the 5 most recently touched files.
+
+Usage: python benchmarks/retrieval.py [--files 12000] [--lines 80]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from assistant.memory import Memory
+from assistant.retrieval import RetrievalIndex
+from assistant.workspace_index import WorkspaceIndex
+
+WORDS = ["self", "return", "value", "result", "config", "items", "data", "index", "name", "path",
+         "count", "total", "buffer", "request", "response", "handler", "client", "user", "cache", "error"]
+QUERIES = [
+    ("rare identifier", "compute_checksum_4242"),
+    ("question", "where do we retry the request when the client times out"),
+    ("common words", "return the result value"),
+    ("no match", "frobnicate the zorb"),
+]
+ROUNDS = 50
+QUESTIONS = 100
+WRITES = 500
+
+
+def generate(root, files, lines):
+    rng = random.Random(7)
+    for i in range(files):
+        directory = root / f"pkg_{i % 50}" / f"mod_{i // 50 % 20}"
+        directory.mkdir(parents=True, exist_ok=True)
+        body = [f"class Widget{i}(Base):", f"    def compute_checksum_{i}(self, {rng.choice(WORDS)}):"]
+        for _ in range(lines - 2):
+            a, b, c = rng.sample(WORDS, 3)
+            body.append(f"        {a} = {b}.{c}_{rng.randrange(100)}({rng.randrange(1000)})")
+        if i % 97 == 0:
+            body.append("        # retry the request when the client times out")
+        body.append("        return result")
+        (directory / f"widget_{i}.py").write_text("\n".join(body) + "\n")
+
+
+def path_of(i):
+    return f"pkg_{i % 50}/mod_{i // 50 % 20}/widget_{i}.py"
+
+
+def timed(fn, rounds=ROUNDS):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def build(root, memory=None):
+    index = RetrievalIndex(WorkspaceIndex(root, refresh_interval=0), memory=memory)
+    start = time.perf_counter()
+    index.sync()
+    index._merge()
+    index._ready.set()
+    return index, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=12000)
+    parser.add_argument("--lines", type=int, default=80)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    config.WORKSPACE_DIR = root
+    start = time.perf_counter()
+    generate(root, args.files, args.lines)
+    print(f"generated {args.files} files x {args.lines} lines in {time.perf_counter() - start:.1f}s\n")
+
+    # Memory that has seen a few hundred of the files, as after some days of use
+    with contextlib.redirect_stdout(io.StringIO()):
+        memory = Memory(root)
+    rng = random.Random(11)
+    for i in rng.sample(range(args.files), 300):
+        memory.record_file_activity(path_of(i), "read")
+        time.sleep(0.0001)
+
+    index, seconds = build(root, memory)
+    postings = len(index._postings)
+    arrays = sum(a.nbytes for a in (index._terms, index._starts, index._postings, index._counts,
+                                    index._lengths, index._alive))
+    tracemalloc.start()
+    measured, _ = build(root)
+    in_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print("index build (cold, every file read and tokenized)")
+    print(f"  {seconds:.2f}s, {args.files / seconds:.0f} files/s; {len(index._chunks)} chunks, "
+          f"{len(index._vocab)} distinct words, {postings} postings")
+    print(f"  memory: {in_memory / 2**20:.1f} MB in all ({arrays / 2**20:.1f} MB of NumPy arrays)\n")
+
+    print(f"{'query (ms)':<20}{'rank p50':>10}{'rank p95':>10}{'snippets p50':>14}{'bytes':>7}")
+    for label, query in QUERIES:
+        rank = timed(lambda: index.search(query))
+        snip = timed(lambda: index.snippets(query))
+        size = len(index.snippets(query).encode())
+        print(f"{label:<20}{rank[0]:>10.2f}{rank[1]:>10.2f}{snip[0]:>14.2f}{size:>7}")
+
+    # Writes re-index just their file; queries also see the overlay until it is merged
+    targets = rng.sample(range(args.files), WRITES)
+    samples = []
+    for i in targets:
+        path = root / path_of(i)
+        path.write_text(path.read_text() + f"        log_write_{i}()\n")
+        index.workspace.update(path_of(i))
+        start = time.perf_counter()
+        index.update(path_of(i))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    overlay = len(index._fresh)
+    with_overlay = timed(lambda: index.search(QUERIES[1][1]))
+    start = time.perf_counter()
+    index._merge()
+    merge = time.perf_counter() - start
+    merged = timed(lambda: index.search(QUERIES[1][1]))
+    print(f"\n{WRITES} writes: re-index p50 {statistics.median(samples):.2f}ms, max {samples[-1]:.2f}ms")
+    print(f"  query with {overlay} chunks in the overlay p50 {with_overlay[0]:.2f}ms, "
+          f"after merging ({merge * 1000:.0f}ms) {merged[0]:.2f}ms")
+
+    # Does the file a question is about reach the model?
+    retrieved = recent = 0
+    summary = {f["path"] for f in memory.get_recent_files(5)}
+    for i in rng.sample(range(args.files), QUESTIONS):
+        question = f"what does the checksum for widget {i} compute"
+        retrieved += any(hit[0] == path_of(i) for hit in index.search(question))
+        recent += path_of(i) in summary
+    print(f"\nquestions about one file ({QUESTIONS}): the file is in the retrieved snippets "
+          f"{retrieved}/{QUESTIONS} times, in the recency summary {recent}/{QUESTIONS}")
+
+
+if __name__ == "__main__":
+    main()
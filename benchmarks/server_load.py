@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark - load test of the JARVIS server against the mock LLM
+Starts assistant.server in this process (its own event loop thread) with
+the in-process mock LLM, then runs concurrent clients. Each client opens a
+session, sends a few commands and closes it, over and over, either over
+HTTP (POST /command, keep-alive) or over a WebSocket with streamed answers.
+Reports sessions/sec, turn latency percentiles, time to first streamed text
+and how many turns the server refused (503) when its queue was full.
+Refused turns are retried after a short pause.
+
+The answer cache is off unless --answer-cache is given: every session asks
+the same questions, so with it on most turns would never reach the LLM and
+the numbers would measure cache hits rather than queueing. The share of
+turns answered from the cache and the LLM requests made are reported too.
+
+Usage: python benchmarks/server_load.py [--clients 8 32 128] [--duration 5] [--latency 0.2] [--answer-cache]
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.batch import create_batch_backend
+from assistant.code_handler import CodeHandler
+from assistant.memory import Memory
+from assistant.server import OP_CLOSE, OP_TEXT, JarvisServer, encode_frame, read_frame
+from assistant.tracing import quantile
+
+COMMANDS = ["what files are in my workspace", "read notes.txt", "summarize that in one line"]
+RETRY_PAUSE = 0.05
+
+
+class Stats:
+    def __init__(self):
+        self.sessions = 0
+        self.latencies = []
+        self.cached = 0
+        self.first = []
+        self.rejected = 0
+        self.errors = 0
+
+
+async def http_turn(reader, writer, payload):
+    body = json.dumps(payload).encode()
+    writer.write(b"POST /command HTTP/1.1\r\nHost: jarvis\r\nContent-Type: application/json\r\n"
+                 + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length"))
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def http_client(port, stats, stop):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while not stop.is_set():
+            session = None
+            for command in COMMANDS:
+                while True:
+                    start = time.perf_counter()
+                    status, result = await http_turn(reader, writer, {"command": command, "session": session})
+                    if status != 503:
+                        break
+                    stats.rejected += 1
+                    await asyncio.sleep(RETRY_PAUSE)
+                if status != 200:
+                    stats.errors += 1
+                    break
+                stats.latencies.append(time.perf_counter() - start)
+                stats.cached += result["cached"]
+                session = result["session"]
+            else:
+                stats.sessions += 1
+    finally:
+        writer.close()
+
+
+async def ws_client(port, stats, stop):
+    while not stop.is_set():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(("GET /ws HTTP/1.1\r\nHost: jarvis\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        await reader.readuntil(b"\r\n\r\n")
+        await read_frame(reader)  # {"type": "session"}
+        completed = True
+        for command in COMMANDS:
+            while True:
+                start, first = time.perf_counter(), None
+                writer.write(encode_frame(OP_TEXT, json.dumps({"command": command}).encode(), mask=True))
+                await writer.drain()
+                while True:
+                    _, payload = await read_frame(reader)
+                    message = json.loads(payload)
+                    if message["type"] == "chunk" and first is None:
+                        first = time.perf_counter() - start
+                    if message["type"] in ("done", "error"):
+                        break
+                if message.get("status") != 503:
+                    break
+                stats.rejected += 1
+                await asyncio.sleep(RETRY_PAUSE)
+            if message["type"] == "error":
+                stats.errors += 1
+                completed = False
+                break
+            stats.latencies.append(time.perf_counter() - start)
+            stats.cached += message["cached"]
+            if first is not None:
+                stats.first.append(first)
+        writer.write(encode_frame(OP_CLOSE, b"\x03\xe8", mask=True))
+        await writer.drain()
+        writer.close()
+        if completed:
+            stats.sessions += 1
+
+
+async def load(port, client, clients, duration):
+    stats = Stats()
+    stop = asyncio.Event()
+    tasks = [asyncio.ensure_future(client(port, stats, stop)) for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - start
+
+
+def start_server(latency):
+    (config.WORKSPACE_DIR / "notes.txt").write_text("profile the voice loop\nship the server\n")
+    backend, mock = create_batch_backend("fake", latency=latency, token_latency=0.005)
+    with contextlib.redirect_stdout(io.StringIO()):
+        memory = Memory(config.WORKSPACE_DIR)
+        server = JarvisServer(backend, CodeHandler(memory=memory), memory)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start("127.0.0.1", 0))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="jarvis-server", daemon=True).start()
+    ready.wait()
+    return server, mock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM seconds before the first token")
+    parser.add_argument("--answer-cache", action="store_true", help="let repeated questions be answered from the cache")
+    args = parser.parse_args()
+    config.ANSWER_CACHE = args.answer_cache
+
+    server, mock = start_server(args.latency)
+    print(f"server: {server.workers} workers, {server.max_pending} turns admitted; "
+          f"mock LLM {args.latency}s; {len(COMMANDS)} commands per session; "
+          f"answer cache {'on' if args.answer_cache else 'off'}\n")
+    print(f"{'transport':<11}{'clients':>8}{'sessions/s':>12}{'turns/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}"
+          f"{'first p50':>11}{'refused':>9}{'errors':>8}{'cached':>8}{'LLM req':>9}")
+    for name, client in (("http", http_client), ("websocket", ws_client)):
+        for clients in args.clients:
+            requests = mock.requests
+            stats, elapsed = asyncio.run(load(server.port, client, clients, args.duration))
+            latencies = sorted(stats.latencies)
+            first = f"{quantile(sorted(stats.first), 0.5) * 1000:.0f}ms" if stats.first else "-"
+            print(f"{name:<11}{clients:>8}{stats.sessions / elapsed:>12.1f}{len(latencies) / elapsed:>9.1f}"
+                  f"{quantile(latencies, 0.5) * 1000:>6.0f}ms{quantile(latencies, 0.95) * 1000:>6.0f}ms"
+                  f"{quantile(latencies, 0.99) * 1000:>6.0f}ms{first:>11}{stats.rejected:>9}{stats.errors:>8}"
+                  f"{stats.cached / max(len(latencies), 1):>8.0%}{mock.requests - requests:>9}")
+    print(f"\n{server.health()['sessions']} sessions kept, {mock.requests} LLM requests")
+    mock.stop()
+
+
+if __name__ == "__main__":
+    main()
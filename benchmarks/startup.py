@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark - time from launch to the first prompt, and where import time goes
+Every measurement runs in a fresh interpreter, so nothing is already imported.
+
+  imports      python -X importtime breakdown of `import jarvis`, plus the
+               libraries that are now only imported when first needed
+  startup      the old sequence (eager imports, components built one after
+               another, a blocking one-second mic calibration) against the
+               new one (lazy imports, components built concurrently,
+               calibration off the startup path), and `jarvis.py --text`
+               from launch to exit on empty input
+
+The microphone and TTS engine are not opened (no audio device needed); the
+audio stack's cost here is its imports, and calibration is the one-second
+sleep adjust_for_ambient_noise(duration=1) would take.
+
+Usage: python benchmarks/startup.py [--runs 5] [--memory-files 2000]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PRELUDE = f"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {str(ROOT)!r})
+import config
+from pathlib import Path
+config.WORKSPACE_DIR = Path({{workspace!r}})
+"""
+
+# Before: what jarvis.py used to do on the way to its first prompt
+SEQUENTIAL = """
+import groq, speech_recognition, pyttsx3, numpy
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.memory import open_memory
+time.sleep(1.0)  # VoiceHandler: adjust_for_ambient_noise(source, duration=1)
+memory = open_memory(config.WORKSPACE_DIR)
+brain = AIBrain(memory=memory)
+code_handler = CodeHandler(memory=memory)
+"""
+
+# After: jarvis.py's startup, with VoiceHandler's audio imports on the main thread
+CONCURRENT = """
+import concurrent.futures
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.memory import open_memory
+init = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+memory_future = init.submit(open_memory, config.WORKSPACE_DIR)
+brain_future = init.submit(lambda: AIBrain(memory=memory_future.result()))
+code_future = init.submit(lambda: CodeHandler(memory=memory_future.result()))
+import speech_recognition, pyttsx3  # calibration now runs in the background
+memory, brain, code_handler = memory_future.result(), brain_future.result(), code_future.result()
+"""
+
+TEXT_ONLY = CONCURRENT.replace("import speech_recognition, pyttsx3  # calibration now runs in the background\n", "")
+
+ON_DEMAND = [
+    ("groq (first AIBrain)", "import groq"),
+    ("speech_recognition + pyttsx3 (voice mode)", "import speech_recognition, pyttsx3"),
+    ("numpy (first search_code)", "import numpy"),
+]
+
+
+def run(code, workspace, env=None):
+    script = PRELUDE.format(workspace=str(workspace)) + code + "\nprint(time.perf_counter() - start)\n"
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, cwd=ROOT)
+    if out.returncode:
+        raise SystemExit(out.stderr)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(env):
+    """Cumulative ms of jarvis's own imports (interpreter startup left out)"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import jarvis"],
+                         capture_output=True, text=True, env=env, cwd=ROOT)
+    children = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == "jarvis":
+                return [("jarvis (total)", int(parts[1]) / 1000)] + children
+            children = []
+        elif depth == 1 or name.strip().startswith("assistant."):
+            children.append((name.strip(), int(parts[1]) / 1000))
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--memory-files", type=int, default=2000, help="file activities in the memory loaded at startup")
+    args = parser.parse_args()
+
+    workspace = Path(tempfile.mkdtemp())
+    env = dict(os.environ, JARVIS_LLM_BACKEND="mock", HOME=str(workspace / "home"))
+    run(f"""
+from assistant.memory import Memory
+memory = Memory(config.WORKSPACE_DIR)
+for i in range({args.memory_files}):
+    memory.record_file_activity(f"project_{{i % 40}}/module_{{i}}.py", "modified")
+memory.compact()
+""", workspace, env)
+
+    print("import jarvis, cumulative ms (fresh interpreter)")
+    for name, ms in sorted(import_breakdown(env), key=lambda item: -item[1])[:12]:
+        print(f"  {name:<40}{ms:>8.1f}")
+    print("\nimported only when first needed")
+    for label, code in ON_DEMAND:
+        ms = statistics.median(run(code, workspace, env) for _ in range(args.runs)) * 1000
+        print(f"  {label:<40}{ms:>8.1f}")
+
+    print(f"\nstartup to first prompt, median of {args.runs} ({args.memory_files} files in memory)")
+    rows = [
+        ("before: eager, sequential, blocking calibration", SEQUENTIAL),
+        ("after: voice mode", CONCURRENT),
+        ("after: text mode", TEXT_ONLY),
+    ]
+    for label, code in rows:
+        seconds = statistics.median(run(code, workspace, env) for _ in range(args.runs))
+        print(f"  {label:<50}{seconds * 1000:>8.0f}ms")
+
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "jarvis.py", "--text"], stdin=subprocess.DEVNULL, capture_output=True,
+                       env=env, cwd=ROOT)
+        samples.append(time.perf_counter() - start)
+    print(f"  {'python jarvis.py --text, launch to exit':<50}{statistics.median(samples) * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
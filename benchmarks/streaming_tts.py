@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark - time-to-first-audio, blocking vs streamed responses
+A fake completion client generates tokens at a fixed rate and a fake TTS
+engine takes time proportional to the text it speaks
+
+Usage: python benchmarks/streaming_tts.py
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.voice_handler import VoiceHandler
+from benchmarks.fake_llm import FakeClient
+
+ANSWER = (
+    "I've read app.py for you. It defines a Flask application with two routes. "
+    "The index route renders the home template and passes the current user. "
+    "The api route returns a JSON list of tasks loaded from the database. "
+    "There is no error handling around the database call, so you may want to add some. "
+    "Let me know if you'd like me to write that for you."
+)
+SECONDS_PER_CHAR = 0.004  # roughly 175 words per minute
+
+
+class FakeVoice(VoiceHandler):
+    def __init__(self):
+        self.first_audio = None
+        self.is_speaking = False
+        self._interrupted = threading.Event()
+
+    def _say(self, text):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter()
+        time.sleep(len(text) * SECONDS_PER_CHAR)
+
+
+def run(streaming, with_tools):
+    # A fresh handler every run, so no answer comes from an earlier run's cache
+    code_handler = CodeHandler()
+    script = [{"content": ANSWER}]
+    if with_tools:
+        script = [{"tool_calls": [("read_file", {"file_path": "app.py"})]}, {"content": ANSWER}]
+    brain = AIBrain(backend=FakeClient(script, first_token_latency=0.3, token_latency=0.03))
+    voice = FakeVoice()
+
+    start = time.perf_counter()
+    if streaming:
+        voice.speak_stream(brain.process_command_stream("summarize app.py", code_handler))
+    else:
+        voice.speak(brain.process_command("summarize app.py", code_handler))
+    done = time.perf_counter()
+    return voice.first_audio - start, done - start
+
+
+def main():
+    (config.WORKSPACE_DIR / "app.py").write_text("from flask import Flask\napp = Flask(__name__)\n")
+    print(f"{'mode':<22} {'first audio':>12} {'turn done':>10}")
+    for with_tools in (False, True):
+        for streaming in (False, True):
+            first, total = run(streaming, with_tools)
+            label = ("streamed" if streaming else "blocking") + (" + tool call" if with_tools else "")
+            print(f"{label:<22} {first * 1e3:>10.0f}ms {total * 1e3:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark - speech recognition accuracy, throughput and partial-result latency
+Transcribes every WAV in a directory. A `name.txt` next to `name.wav` holds
+the reference transcript used for word error rate.
+
+For streaming backends each file is also fed in real-time-sized chunks to
+measure how far into the audio the first partial hypothesis arrives, and how
+long the final result takes once the audio ends.
+
+Usage: python benchmarks/stt_backends.py recordings/ --backend vosk --workers 1 2 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from assistant.intent_router import normalize
+from assistant.speech_backend import create_recognizer
+from assistant.wake_word import read_wav
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref, hyp = normalize(reference).split(), normalize(hypothesis).split()
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        current = [i]
+        for j, guess in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != guess)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def stream_latency(engine, path):
+    """(audio seconds until the first partial, seconds from end of audio to the final text)"""
+    pcm, sample_rate = read_wav(path)
+    chunk = config.CHUNK_SIZE * 2
+    stream = engine.stream(sample_rate)
+    first = None
+    for offset in range(0, len(pcm), chunk):
+        if stream.feed(pcm[offset:offset + chunk]) and first is None:
+            first = (offset + chunk) / 2 / sample_rate
+    start = time.perf_counter()
+    stream.finish()
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--backend", default=config.STT_BACKEND, choices=["google", "vosk"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    
+    paths = sorted(Path(args.directory).glob("*.wav"))
+    if not paths:
+        sys.exit(f"No .wav files in {args.directory}")
+    engine = create_recognizer(args.backend)
+    
+    print(f"{args.backend}: {len(paths)} files\n")
+    print(f"{'workers':<10}{'wall':>8}{'audio/wall':>12}{'per file p50':>14}")
+    results = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = engine.transcribe_batch(paths, workers)
+        wall = time.perf_counter() - start
+        audio = sum(r["audio_seconds"] for r in results)
+        per_file = sorted(r["seconds"] for r in results)
+        print(f"{workers:<10}{wall:>7.1f}s{audio / wall:>11.1f}x{per_file[len(per_file) // 2] * 1000:>12.0f}ms")
+    
+    scored = [(r, Path(r["path"]).with_suffix(".txt")) for r in results]
+    scored = [(r, ref.read_text()) for r, ref in scored if ref.exists()]
+    if scored:
+        errors = [word_error_rate(ref, r["text"]) for r, ref in scored]
+        print(f"\nWER over {len(scored)} files with references: {sum(errors) / len(errors):.1%}")
+    
+    if engine.streaming:
+        latencies = [stream_latency(engine, path) for path in paths]
+        firsts = sorted(first for first, _ in latencies if first is not None)
+        finals = sorted(final for _, final in latencies)
+        if firsts:
+            print(f"first partial after {firsts[len(firsts) // 2] * 1000:.0f}ms of audio (median)")
+        print(f"final result {finals[len(finals) // 2] * 1000:.0f}ms after the audio ends (median)")
+
+
+if __name__ == "__main__":
+    main()
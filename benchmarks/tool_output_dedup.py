@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark - bytes sent per request in a scripted session, with and without
+deduplicating tool outputs in the conversation history
+The session keeps coming back to the same files, rewrites one and reads it
+again, like a real back-and-forth about a small project.
+
+Usage: python benchmarks/tool_output_dedup.py
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from benchmarks.fake_llm import FakeClient
+
+FILES = {
+    "app.py": 6000,
+    "models.py": 4000,
+    "utils.py": 2500,
+}
+
+# (user command, [tool calls made before answering])
+SESSION = [
+    ("what does app.py do", [("read_file", {"file_path": "app.py"})]),
+    ("which models does it use", [("read_file", {"file_path": "models.py"})]),
+    ("how does app.py load the config", [("read_file", {"file_path": "app.py"})]),
+    ("list my files", [("list_files", {})]),
+    ("compare app.py and utils.py", [("read_file", {"file_path": "app.py"}), ("read_file", {"file_path": "utils.py"})]),
+    ("add logging to utils.py", [("write_file", {"file_path": "utils.py", "content": None})]),
+    ("show me utils.py now", [("read_file", {"file_path": "utils.py"})]),
+    ("list my files again", [("list_files", {})]),
+    ("where is the User model defined", [("read_file", {"file_path": "models.py"})]),
+    ("summarize app.py one more time", [("read_file", {"file_path": "app.py"})]),
+]
+
+
+class MeasuringClient(FakeClient):
+    """Sizes are taken when a request is sent; history messages are rewritten in place later"""
+
+    def __init__(self, script):
+        super().__init__(script, first_token_latency=0, token_latency=0)
+        self.sent = []
+
+    def create(self, messages=None, **kwargs):
+        self.sent.append(len(json.dumps(messages)))
+        return super().create(messages=messages, **kwargs)
+
+
+def source(name, size, version=1):
+    line = f"def {name.split('.')[0]}_helper_{{}}(value):  # v{version}\n    return value * {{}}\n"
+    text = "".join(line.format(i, i) for i in range(size // len(line) + 1))
+    return text[:size]
+
+
+def run(dedupe):
+    for name, size in FILES.items():
+        (config.WORKSPACE_DIR / name).write_text(source(name, size))
+    script = []
+    for _, calls in SESSION:
+        calls = [(name, dict(args, content=source("utils.py", FILES["utils.py"], 2)) if name == "write_file" else args)
+                 for name, args in calls]
+        script += [{"tool_calls": calls}, {"content": "Here is what I found."}]
+
+    client = MeasuringClient(script)
+    brain = AIBrain(backend=client)
+    if not dedupe:
+        brain.tool_outputs.refresh = lambda history, fingerprint: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        code_handler = CodeHandler()
+        per_turn = []
+        for command, _ in SESSION:
+            sent = len(client.sent)
+            brain.process_command(command, code_handler)
+            per_turn.append(sum(client.sent[sent:]))
+    return per_turn, brain
+
+
+def main():
+    budget = config.CONTEXT_TOKEN_BUDGET
+    for label, limit in ((f"context budget {budget} tokens (default)", budget), ("no context budget", 10 ** 9)):
+        config.CONTEXT_TOKEN_BUDGET = limit
+        before, _ = run(dedupe=False)
+        after, brain = run(dedupe=True)
+        print(label)
+        print(f"{'turn':<36}{'history as is':>15}{'deduplicated':>15}")
+        for (command, _), old, new in zip(SESSION, before, after):
+            print(f"{command:<36}{old:>13,}B{new:>13,}B")
+        print(f"{'total':<36}{sum(before):>13,}B{sum(after):>13,}B  "
+              f"({1 - sum(after) / sum(before):.0%} less; {brain.tool_outputs.deduplicated} copies deduplicated, "
+              f"{brain.tool_outputs.dropped} stale dropped)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark - what tracing costs, and what a trace of a scripted session shows
+First times an empty span with tracing off and on. Then runs a short
+session of AI turns (fake LLM, real tools, JSON memory) with tracing and the
+slow-turn profiler enabled, and prints the per-stage report, the Prometheus
+dump and the slow turns the profiler caught.
+
+Usage: python benchmarks/tracing.py [--turns 20] [--slow 0.5]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WORKSPACE_DIR = Path(tempfile.mkdtemp())
+
+from assistant.ai_brain import AIBrain
+from assistant.code_handler import CodeHandler
+from assistant.memory import Memory
+from assistant.tracing import Tracer, format_summary, load_stats, tracer
+from benchmarks.fake_llm import FakeClient
+
+SPANS = 200_000
+
+# (command, [tool calls]) cycled through the session
+SESSION = [
+    ("read app.py", [("read_file", {"file_path": "app.py"})]),
+    ("what files are there", [("list_files", {})]),
+    ("add a helper to utils.py", [("write_file", {"file_path": "utils.py", "content": "def helper():\n    return 1\n"})]),
+    ("where is helper used", [("search_code", {"query": "helper"})]),
+    ("explain the project", []),
+]
+
+
+def overhead():
+    off = Tracer()
+    on = Tracer()
+    on.enable()
+    rows = []
+    for label, t in (("disabled", off), ("enabled, no file", on)):
+        start = time.perf_counter()
+        for _ in range(SPANS):
+            with t.span("stage", path="app.py"):
+                pass
+        rows.append((label, (time.perf_counter() - start) / SPANS))
+    start = time.perf_counter()
+    for _ in range(SPANS):
+        pass
+    baseline = (time.perf_counter() - start) / SPANS
+    print(f"{'span overhead':<20}{'per span':>12}")
+    for label, seconds in rows:
+        print(f"{label:<20}{(seconds - baseline) * 1e6:>10.2f}µs")
+    print()
+
+
+def session(turns, slow):
+    (config.WORKSPACE_DIR / "app.py").write_text("import utils\n\nprint(utils.helper())\n" * 50)
+    script = []
+    for i in range(turns):
+        _, calls = SESSION[i % len(SESSION)]
+        if calls:
+            script.append({"tool_calls": calls})
+        script.append({"content": "Done. " * 20})
+
+    trace_file = config.WORKSPACE_DIR / config.TRACE_FILE
+    tracer.enable(trace_file, slow_turn=slow)
+    memory = Memory(config.WORKSPACE_DIR)
+    client = FakeClient(script, first_token_latency=0.05, token_latency=0.001)
+    slow_create = client.create
+
+    def create(**kwargs):
+        # A stall inside the "backend" that the profiler should point at
+        if create.calls % 7 == 6:
+            time.sleep(slow * 1.5)
+        create.calls += 1
+        return slow_create(**kwargs)
+    create.calls = 0
+    client.create = create
+
+    brain = AIBrain(memory=memory, backend=client)
+    with contextlib.redirect_stdout(io.StringIO()):
+        code_handler = CodeHandler(memory=memory)
+        for i in range(turns):
+            command, _ = SESSION[i % len(SESSION)]
+            with tracer.turn(command=command):
+                brain.process_command(command, code_handler)
+                memory.flush()
+    tracer.close()
+
+    print(f"{turns} turns, slow-turn threshold {slow}s, trace in {trace_file.name}\n")
+    print(format_summary(load_stats(trace_file)))
+    print()
+    print(tracer.prometheus())
+    print(f"{tracer.slow_turns} slow turns profiled; the busiest stack of the first:")
+    for line in trace_file.read_text().splitlines():
+        entry = json.loads(line)
+        if entry["name"] == "profile":
+            top = entry["stacks"][0]
+            frames = top["stack"].split(";")
+            print(f"  {top['count']}/{entry['samples']} samples, innermost frames:")
+            for frame in frames[-4:]:
+                print(f"    {frame}")
+            break
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--slow", type=float, default=0.5, help="seconds; slower turns are profiled")
+    args = parser.parse_args()
+    overhead()
+    session(args.turns, args.slow)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark - speak-start latency for cached vs live-synthesized phrases
+Speak-start is the time from VoiceHandler._say() to the first audio going
+out: the first buffer written to the output stream for cached phrases,
+pyttsx3's "started-utterance" event for live synthesis.
+
+By default the live engine is simulated with a fixed startup delay and the
+output stream discards audio, so only the cache path is measured for real.
+With --real, pyttsx3 and pyaudio are used for both.
+
+Usage: python benchmarks/tts_cache.py [--real] [--rounds 20]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from assistant.tts_cache import CacheWarmer, TTSCache
+from assistant.voice_handler import VoiceHandler
+
+SIMULATED_STARTUP = 0.25  # seconds before a simulated engine produces sound
+
+
+class FakeEngine:
+    def __init__(self, voice):
+        self.voice = voice
+        self.started = None
+    
+    def say(self, text):
+        pass
+    
+    def runAndWait(self):
+        time.sleep(SIMULATED_STARTUP)
+        self.started()
+
+
+class NullStream:
+    def __init__(self, voice):
+        self.voice = voice
+    
+    def write(self, frames):
+        self.voice.first_audio = self.voice.first_audio or time.perf_counter()
+    
+    def stop_stream(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class BenchVoice(VoiceHandler):
+    """TTS half of VoiceHandler only: no microphone, no recognizer"""
+    
+    def __init__(self, engine, cache, real):
+        self.tts_engine = engine
+        self.tts_settings = (engine.voice if not real else engine.getProperty("voice"), config.TTS_RATE, config.TTS_VOLUME)
+        self.tts_cache = cache
+        self.tts_warmer = CacheWarmer(cache, *self.tts_settings)
+        self.is_speaking = False
+        self._interrupted = threading.Event()
+        self._phrase_counts = Counter()
+        self._audio = None
+        self._cached_playback = True
+        self.real = real
+        self.first_audio = None
+    
+    def _open_output(self, wav):
+        stream = super()._open_output(wav) if self.real else NullStream(self)
+        if self.real:
+            write = stream.write
+            def timed(frames):
+                self.first_audio = self.first_audio or time.perf_counter()
+                write(frames)
+            stream.write = timed
+        return stream
+
+
+def speak_start(voice, text):
+    voice.first_audio = None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        voice._say(text)
+    return voice.first_audio - start
+
+
+def write_fake_render(path, seconds=2.0):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(22050)
+        wav.writeframes(b"\0" * int(seconds * 22050) * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true", help="use pyttsx3 and pyaudio")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    
+    cache = TTSCache(tempfile.mkdtemp())
+    phrases = list(config.PHRASES.values())
+    if args.real:
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty("rate", config.TTS_RATE)
+        engine.setProperty("volume", config.TTS_VOLUME)
+    else:
+        engine = FakeEngine("simulated")
+    voice = BenchVoice(engine, cache, args.real)
+    
+    def started(*_):
+        voice.first_audio = voice.first_audio or time.perf_counter()
+    if args.real:
+        engine.connect("started-utterance", started)
+    else:
+        engine.started = started
+    
+    # Live synthesis first, while the cache is still empty
+    voice._cached_playback = False
+    live = sorted(speak_start(voice, text) for _ in range(args.rounds) for text in phrases)
+    
+    voice._cached_playback = True
+    if args.real:
+        cache.render(engine, phrases, *voice.tts_settings)
+    else:
+        for text in phrases:
+            write_fake_render(cache.path(text, *voice.tts_settings))
+    cached = sorted(speak_start(voice, text) for _ in range(args.rounds) for text in phrases)
+    
+    mode = "pyttsx3 + pyaudio" if args.real else f"simulated engine ({SIMULATED_STARTUP * 1000:.0f}ms startup), null output"
+    print(f"{len(phrases)} phrases x {args.rounds} rounds, {mode}\n")
+    print(f"{'':<10}{'p50':>10}{'p95':>10}")
+    for name, samples in (("live", live), ("cached", cached)):
+        p50, p95 = samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+        print(f"{name:<10}{p50 * 1000:>8.1f}ms{p95 * 1000:>8.1f}ms")
+    print(f"\ncache: {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
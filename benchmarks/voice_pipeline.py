@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark - serial listen/think/speak loop vs the background voice pipeline
+A synthetic recording holds short voiced bursts ("phrases") separated by
+silence. Recognition, thinking and speaking are simulated with sleeps, so
+the numbers show how much speech each loop hears and how quickly speech
+interrupts TTS.
+
+Usage: python benchmarks/voice_pipeline.py
+"""
+
+import array
+import math
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+config.WAKE_TEMPLATE_DIR = Path(tempfile.mkdtemp())  # no enrolled wake word: recognize every phrase
+
+from assistant.audio_pipeline import PhraseSegmenter, VoicePipeline, WavFileSource
+from assistant.wake_word import WakeWordDetector
+from assistant.voice_handler import VoiceHandler
+
+PHRASES = 8
+PHRASE_SECONDS = 1.0
+GAP_SECONDS = 1.2
+RECOGNIZE_SECONDS = 0.6
+THINK_SECONDS = 1.0
+SPEAK_SECONDS = 2.0
+
+
+def write_recording(path):
+    """Voiced bursts between stretches of silence; returns each burst's start time"""
+    samples = array.array("h")
+    starts = []
+    silence = int(GAP_SECONDS * config.SAMPLE_RATE)
+    for _ in range(PHRASES):
+        samples.extend([0] * silence)
+        starts.append(len(samples) / config.SAMPLE_RATE)
+        samples.extend(
+            int(2000 * sum(math.sin(2 * math.pi * 150 * k * n / config.SAMPLE_RATE) for k in range(1, 6)))
+            for n in range(int(PHRASE_SECONDS * config.SAMPLE_RATE))
+        )
+    samples.extend([0] * silence)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(config.SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return starts
+
+
+class FakeRecognizer:
+    pause_threshold = 0.5
+
+
+class FakeVoice(VoiceHandler):
+    """No microphone or TTS engine; recognition and speech just take time"""
+    
+    def __init__(self):
+        self.recognizer = FakeRecognizer()
+        self.is_speaking = False
+        self._interrupted = threading.Event()
+        self.recognized = []
+        self.interrupted_at = []
+    
+    def recognize(self, audio):
+        time.sleep(RECOGNIZE_SECONDS)
+        self.recognized.append(time.perf_counter())
+        return f"phrase {len(self.recognized)}"
+    
+    def _say(self, text):
+        self.is_speaking = True
+        deadline = time.perf_counter() + SPEAK_SECONDS
+        while time.perf_counter() < deadline and not self._interrupted.is_set():
+            time.sleep(0.01)
+        self.is_speaking = False
+    
+    def stop_speaking(self):
+        if self.is_speaking:
+            self.interrupted_at.append(time.perf_counter())
+        self._interrupted.set()
+
+
+def run_serial(path):
+    """Old loop: capture only while blocked in listen(); speech during think/speak is lost"""
+    source = WavFileSource([path])
+    source.open()
+    voice = FakeVoice()
+    detector = WakeWordDetector(sample_rate=source.sample_rate)
+    segmenter = PhraseSegmenter(source.sample_rate, source.sample_width, source.chunk_size,
+                                voice.recognizer.pause_threshold)
+    start = time.perf_counter()
+    heard = 0
+    busy_until = 0.0
+    while True:
+        chunk = source.read()
+        if chunk is None:
+            break
+        if time.perf_counter() < busy_until:
+            continue  # nobody is listening while JARVIS thinks and speaks
+        speech, _ = detector.process(chunk)
+        phrase = segmenter.feed(chunk, speech)
+        if isinstance(phrase, bytes):
+            heard += 1
+            # Recognize, think and speak on the same thread as capture
+            busy_until = time.perf_counter() + RECOGNIZE_SECONDS + THINK_SECONDS + SPEAK_SECONDS
+    return heard, time.perf_counter() - start
+
+
+def run_pipeline(path, starts):
+    voice = FakeVoice()
+    pipeline = VoicePipeline(voice, WavFileSource([path]), workers=1).start()
+    start = time.perf_counter()
+    heard = 0
+    latencies = []
+    try:
+        while True:
+            text = pipeline.next_transcript()
+            if text is None:
+                break
+            heard += 1
+            time.sleep(THINK_SECONDS)
+            voice.speak(f"answer to {text}")
+    finally:
+        pipeline.stop()
+    elapsed = time.perf_counter() - start
+    
+    for interrupted in voice.interrupted_at:
+        offset = interrupted - start
+        spoken = [s for s in starts if s <= offset]
+        if spoken:
+            latencies.append(offset - spoken[-1])
+    return heard, elapsed, latencies, pipeline.dropped
+
+
+def main():
+    path = Path(tempfile.mkdtemp()) / "phrases.wav"
+    starts = write_recording(path)
+    duration = PHRASES * (PHRASE_SECONDS + GAP_SECONDS) + GAP_SECONDS
+    print(f"Recording: {PHRASES} phrases, {duration:.1f}s; "
+          f"recognize {RECOGNIZE_SECONDS}s, think {THINK_SECONDS}s, speak {SPEAK_SECONDS}s per phrase\n")
+    
+    heard, elapsed = run_serial(path)
+    print(f"{'serial loop':<20} heard {heard}/{PHRASES} phrases in {elapsed:.1f}s")
+    
+    heard, elapsed, latencies, dropped = run_pipeline(path, starts)
+    print(f"{'voice pipeline':<20} heard {heard}/{PHRASES} phrases in {elapsed:.1f}s ({dropped} dropped)")
+    if latencies:
+        latencies.sort()
+        print(f"{'barge-in latency':<20} median {latencies[len(latencies) // 2] * 1000:.0f}ms, "
+              f"max {latencies[-1] * 1000:.0f}ms over {len(latencies)} interruptions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark - offline VAD and wake word spotting on recorded clips
+Reports CPU time per second of audio, detection and false-alarm rates, and
+wake latency (end of the wake word to detection).
+
+Without arguments it uses synthetic clips: vowel-like harmonic sounds with
+formants and fricative noise, spoken at different speeds, pitches and
+levels over background hiss. Real recordings can be used instead:
+
+Usage: python benchmarks/wake_word.py [--templates DIR --positives DIR --negatives DIR]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from assistant.wake_word import KeywordSpotter, WakeWordDetector, load_template, read_wav, write_wav
+
+RATE = config.SAMPLE_RATE
+CHUNK_BYTES = config.CHUNK_SIZE * 2
+PAUSE_THRESHOLD = 0.8  # seconds of silence the old listen() waited for before recognizing
+
+# (F1, F2) for vowels; (low, high) noise band for fricatives
+VOWELS = {"a": (730, 1090), "ae": (660, 1720), "e": (530, 1840), "i": (270, 2290),
+          "o": (570, 840), "u": (300, 870), "er": (490, 1350)}
+FRICATIVES = {"h": (500, 3000), "s": (4000, 7500), "z": (3000, 6000), "f": (2000, 7000), "j": (1800, 4500)}
+
+WAKE = [("h", 0.06), ("e", 0.14), ("i", 0.06), ("j", 0.06), ("a", 0.16), ("er", 0.08), ("z", 0.05), ("i", 0.10), ("s", 0.12)]
+OTHERS = [
+    [("h", 0.05), ("e", 0.10), ("o", 0.18), ("z", 0.06), ("e", 0.12), ("er", 0.12)],          # hello there
+    [("o", 0.12), ("u", 0.10), ("e", 0.10), ("f", 0.08), ("a", 0.12), ("i", 0.14)],          # open file
+    [("u", 0.10), ("a", 0.10), ("s", 0.08), ("i", 0.12), ("a", 0.14), ("i", 0.08), ("z", 0.1)],  # what time is it
+    [("ae", 0.16), ("f", 0.06), ("er", 0.10), ("u", 0.12), ("s", 0.10)],                     # after us
+    [("h", 0.06), ("a", 0.16), ("er", 0.10), ("f", 0.06), ("e", 0.10), ("s", 0.12)],          # harvest (confusable)
+]
+
+
+def phone(kind, duration, f0, rng):
+    n = int(duration * RATE)
+    t = np.arange(n) / RATE
+    if kind in VOWELS:
+        f1, f2 = VOWELS[kind]
+        pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 3 * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / RATE
+        signal = np.zeros(n)
+        for k in range(1, int(4000 / f0)):
+            freq = k * f0
+            gain = np.exp(-((freq - f1) / 120) ** 2) + 0.6 * np.exp(-((freq - f2) / 160) ** 2) + 0.02
+            signal += gain * np.sin(k * phase)
+    else:
+        low, high = FRICATIVES[kind]
+        spectrum = np.fft.rfft(rng.standard_normal(n))
+        freqs = np.fft.rfftfreq(n, 1 / RATE)
+        spectrum[(freqs < low) | (freqs > high)] = 0
+        signal = np.fft.irfft(spectrum, n) * 0.4
+    ramp = min(n // 4, int(0.01 * RATE))
+    envelope = np.ones(n)
+    envelope[:ramp] = np.linspace(0, 1, ramp)
+    envelope[n - ramp:] = np.linspace(1, 0, ramp)
+    return signal * envelope
+
+
+def say(phones, rng):
+    """One rendition: random speed, pitch and level"""
+    speed = rng.uniform(0.8, 1.25)
+    f0 = rng.uniform(100, 220)
+    audio = np.concatenate([phone(kind, duration / speed, f0, rng) for kind, duration in phones])
+    return audio / np.abs(audio).max() * rng.uniform(0.1, 0.5)
+
+
+def clip(word, rng, noise_db):
+    """Silence, the word, silence, over background hiss; returns (pcm, word end in seconds)"""
+    lead = np.zeros(int(rng.uniform(0.5, 1.0) * RATE))
+    audio = np.concatenate([lead, word, np.zeros(RATE)])
+    audio += rng.standard_normal(len(audio)) * 10 ** (noise_db / 20)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+    return pcm, (len(lead) + len(word)) / RATE
+
+
+def synthesize(directory, count):
+    rng = np.random.default_rng(7)
+    directory = Path(directory)
+    for name in ("templates", "positives", "negatives"):
+        (directory / name).mkdir(parents=True, exist_ok=True)
+    for i in range(3):
+        pcm, _ = clip(say(WAKE, rng), rng, -60)
+        write_wav(directory / "templates" / f"wake_{i}.wav", pcm, RATE)
+    ends = {}
+    for i in range(count):
+        pcm, end = clip(say(WAKE, rng), rng, rng.uniform(-60, -45))
+        path = directory / "positives" / f"wake_{i}.wav"
+        write_wav(path, pcm, RATE)
+        ends[path.name] = end
+        pcm, _ = clip(say(OTHERS[i % len(OTHERS)], rng), rng, rng.uniform(-60, -45))
+        write_wav(directory / "negatives" / f"other_{i}.wav", pcm, RATE)
+    return ends
+
+
+def speech_end(data, detector_factory):
+    """Last chunk the VAD called speech, for recordings without a known word end"""
+    detector = detector_factory()
+    end = 0.0
+    for offset in range(0, len(data), CHUNK_BYTES):
+        speech, _ = detector.process(data[offset:offset + CHUNK_BYTES])
+        if speech:
+            end = (offset + CHUNK_BYTES) / 2 / RATE
+    return end
+
+
+def run(paths, spotter):
+    """Feed each file chunk by chunk; returns per-file first hit time and total CPU seconds"""
+    hits = {}
+    cpu = 0.0
+    for path in paths:
+        data, _ = read_wav(path)
+        detector = WakeWordDetector(spotter)
+        if spotter:
+            spotter.reset()
+        start = time.process_time()
+        for offset in range(0, len(data), CHUNK_BYTES):
+            _, hit = detector.process(data[offset:offset + CHUNK_BYTES])
+            if hit and path.name not in hits:
+                hits[path.name] = (offset + CHUNK_BYTES) / 2 / RATE
+        cpu += time.process_time() - start
+    return hits, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates")
+    parser.add_argument("--positives")
+    parser.add_argument("--negatives")
+    parser.add_argument("--count", type=int, default=25, help="synthetic clips of each kind")
+    args = parser.parse_args()
+    
+    ends = {}
+    if args.templates:
+        templates, positives, negatives = Path(args.templates), Path(args.positives), Path(args.negatives)
+    else:
+        directory = Path(tempfile.mkdtemp())
+        ends = synthesize(directory, args.count)
+        templates, positives, negatives = directory / "templates", directory / "positives", directory / "negatives"
+        print(f"Synthetic clips in {directory}")
+    
+    positive_paths = sorted(positives.glob("*.wav"))
+    negative_paths = sorted(negatives.glob("*.wav"))
+    audio_seconds = sum(len(read_wav(p)[0]) / 2 / RATE for p in positive_paths + negative_paths)
+    spotter = KeywordSpotter([load_template(p) for p in sorted(templates.glob("*.wav"))])
+    
+    _, vad_cpu = run(positive_paths + negative_paths, None)
+    positive_hits, positive_cpu = run(positive_paths, spotter)
+    negative_hits, negative_cpu = run(negative_paths, spotter)
+    spot_cpu = positive_cpu + negative_cpu
+    
+    latencies = []
+    for path in positive_paths:
+        if path.name in positive_hits:
+            end = ends.get(path.name) or speech_end(read_wav(path)[0], WakeWordDetector)
+            latencies.append(positive_hits[path.name] - end)
+    latencies.sort()
+    
+    print(f"\n{len(positive_paths)} wake clips, {len(negative_paths)} other clips, "
+          f"{audio_seconds:.0f}s of audio, {len(spotter.templates)} templates, threshold {spotter.threshold}\n")
+    print(f"{'CPU per audio second':<28} VAD only {vad_cpu / audio_seconds * 1000:.1f}ms, "
+          f"VAD + spotter {spot_cpu / audio_seconds * 1000:.1f}ms")
+    print(f"{'detections':<28} {len(positive_hits)}/{len(positive_paths)}")
+    print(f"{'false alarms':<28} {len(negative_hits)}/{len(negative_paths)}")
+    if latencies:
+        print(f"{'wake latency':<28} median {latencies[len(latencies) // 2] * 1000:.0f}ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms relative to the end of the word")
+    print(f"{'cloud wake path':<28} >= {PAUSE_THRESHOLD * 1000:.0f}ms pause + a recognize_google round trip, "
+          f"and one request per phrase ({len(positive_paths) + len(negative_paths)} here, "
+          f"{len(positive_hits) + len(negative_hits)} with local spotting)")
+
+
+if __name__ == "__main__":
+    main()
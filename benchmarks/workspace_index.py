@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark - WorkspaceIndex cold build, warm queries and incremental refresh
+Generates a synthetic workspace (100k files by default) and compares each
+query against a naive os.walk + fnmatch over the same tree.
+
+Usage: python benchmarks/workspace_index.py [--files 100000]
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.workspace_index import WorkspaceIndex
+
+EXTENSIONS = [".py", ".js", ".md", ".json", ".txt", ".css", ".html", ".yaml"]
+QUERIES = [
+    ("list_tree .", "walk", ".", None),
+    ("list_tree project_7", "walk", "project_7", None),
+    ("glob config_4242.json", "glob", "config_4242.json", None),
+    ("glob *.py", "glob", "*.py", None),
+    ("glob test_*.py", "glob", "test_*.py", None),
+    ("glob project_2/**/*.md", "glob", "project_2/**/*.md", None),
+    ("glob *.xyz (no match)", "glob", "*.xyz", None),
+]
+ROUNDS = 200
+
+
+def generate(root, count):
+    """project_N/pkg_M/sub_K/ directories, ~50 files each"""
+    for i in range(count):
+        directory = root / f"project_{i % 20}" / f"pkg_{i // 20 % 10}" / f"sub_{i // 200 % 10}"
+        if i < 2000:
+            directory.mkdir(parents=True, exist_ok=True)
+        ext = EXTENSIONS[i % len(EXTENSIONS)]
+        name = f"test_{i}{ext}" if i % 5 == 0 else f"config_{i}.json" if i % 101 == 0 else f"module_{i}{ext}"
+        (directory / name).write_bytes(b"x" * (i % 4096))
+
+
+def naive(root, kind, argument):
+    """What a query costs without an index: walk and stat everything"""
+    start = root if kind == "glob" or argument == "." else root / argument
+    results = []
+    for directory, _, names in os.walk(start):
+        rel = os.path.relpath(directory, root).replace(os.sep, "/")
+        for name in names:
+            path = name if rel == "." else f"{rel}/{name}"
+            if kind == "walk" or (fnmatch.fnmatch(name, argument) if "/" not in argument else fnmatch.fnmatch(path, argument)):
+                results.append((path, os.stat(os.path.join(directory, name)).st_size))
+    return results
+
+
+def percentile(samples, p):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100_000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        start = time.perf_counter()
+        generate(root, args.files)
+        print(f"Generated {args.files} files in {time.perf_counter() - start:.1f}s\n")
+        
+        index = WorkspaceIndex(root, refresh_interval=0)
+        index.ensure_built()
+        print(f"cold build: {index.build_seconds * 1000:.0f}ms ({len(index.files)} files, {len(index.dirs)} directories)\n")
+        
+        print(f"{'query':<26}{'results':>9}{'p50':>10}{'p95':>10}{'naive':>10}")
+        for label, kind, argument, directory in QUERIES:
+            query = index.walk if kind == "walk" else index.glob
+            samples = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                results, more = query(argument) if kind == "walk" else query(argument, directory or ".")
+                samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            naive(root, kind, argument)
+            walk = time.perf_counter() - start
+            shown = f"{len(results)}{'+' if more else ''}"
+            print(f"{label:<26}{shown:>9}{percentile(samples, 0.5) * 1e6:>8.0f}us"
+                  f"{percentile(samples, 0.95) * 1e6:>8.0f}us{walk * 1000:>8.0f}ms")
+        
+        # Incremental upkeep: a refresh pass with nothing changed, then after outside edits
+        start = time.perf_counter()
+        index.refresh()
+        idle = time.perf_counter() - start
+        for i in range(10):
+            (root / f"project_{i}" / "pkg_0" / f"added_{i}.py").write_text("new")
+        os.remove(root / index.walk(limit=1)[0][0][0])
+        start = time.perf_counter()
+        changed = index.refresh()
+        busy = time.perf_counter() - start
+        print(f"\nrefresh, nothing changed: {idle * 1000:.1f}ms")
+        print(f"refresh after 11 outside changes: {busy * 1000:.1f}ms ({changed} directories rescanned)")
+        
+        start = time.perf_counter()
+        path = "project_0/pkg_0/sub_0/written.py"
+        (root / path).write_text("hello")
+        index.update(path)
+        print(f"update after a JARVIS write: {(time.perf_counter() - start) * 1e6:.0f}us (write included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,3 +21,117 @@ PHRASE_TIME_LIMIT = 10  # seconds
 # Audio Settings
 SAMPLE_RATE = 16000
 CHUNK_SIZE = 1024
+CONCURRENT_AUDIO = True  # keep capturing and recognizing while JARVIS thinks and speaks
+RECOGNITION_WORKERS = 1  # phrases recognized in parallel
+CAPTURE_QUEUE_SIZE = 8  # phrases waiting for recognition before the oldest is dropped
+BARGE_IN_FACTOR = 2.0  # speech must be this much louder than the threshold to interrupt TTS
+
+# Wake Word Detection (offline, before any cloud recognition)
+VAD_MARGIN_DB = 12  # speech must be this far above the tracked noise floor
+VAD_SPEECH_RATIO = 0.5  # share of a frame's energy that must fall in 300-3400 Hz
+WAKE_TEMPLATE_DIR = Path(os.getenv("JARVIS_WAKE_TEMPLATES", Path.home() / ".jarvis" / "wake_word"))
+WAKE_THRESHOLD = 0.2  # DTW cost for a hit; tune with `python -m assistant.wake_word test`
+
+# Speech Output
+TTS_RATE = 175  # words per minute
+TTS_VOLUME = 0.9
+TTS_CACHE_DIR = Path(os.getenv("JARVIS_TTS_CACHE", Path.home() / ".jarvis" / "tts_cache"))
+TTS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+TTS_CACHE_MAX_CHARS = 120  # longer text is always synthesized live
+TTS_REPEAT_WINDOW = 200  # recent uncached replies remembered; one said again within them is rendered
+PHRASES = {  # fixed replies, pre-rendered at startup
+    "greeting": "Hello! I'm listening. What can I help you with?",
+    "goodbye": "Goodbye! Have a great day!",
+    "pause": "Okay, I'll wait. Say 'Hey Jarvis' when you need me again.",
+    "shutdown": "Shutting down. Goodbye!",
+    "error": "I encountered an error. Please check the console."
+}
+
+# Speech Recognition
+STT_BACKEND = os.getenv("JARVIS_STT_BACKEND", "google")  # "google" (online) or "vosk" (offline, streaming)
+VOSK_MODEL_PATH = Path(os.getenv("JARVIS_VOSK_MODEL", Path.home() / ".jarvis" / "vosk-model-small-en-us-0.15"))
+
+# Memory Settings
+MEMORY_FLUSH_INTERVAL = 2.0  # seconds between journal appends
+MEMORY_COMPACT_THRESHOLD = 500  # journal records before rewriting the snapshot
+MEMORY_ACTIONS_PER_FILE = 20  # recent actions kept per file; older ones live on as counters
+MEMORY_DAILY_ROLLUP_DAYS = 90  # days of per-file activity counts to keep
+MEMORY_FILES_PER_PROJECT = 50  # recently touched files listed per project
+MEMORY_BACKEND = os.getenv("JARVIS_MEMORY_BACKEND", "json")  # "json" or "sqlite"
+
+# Response Streaming
+STREAM_RESPONSES = True  # speak each sentence while the rest is still generating
+TTS_MIN_SENTENCE_CHARS = 12  # shorter fragments are merged with the next sentence
+
+# Conversation Context
+CONTEXT_TOKEN_BUDGET = 6000  # estimated prompt tokens per request
+CONTEXT_KEEP_TURNS = 2  # most recent turns are never truncated or summarized
+CONTEXT_TOOL_OUTPUT_CHARS = 400  # older tool results are cut to this many characters
+CONTEXT_SUMMARY_CHARS = 2000  # cap on the running summary of folded turns
+SHOW_PROMPT_METRICS = False  # print estimated prompt size after each turn
+
+# Tool Execution
+TOOL_WORKERS = 8  # concurrent read-only tool calls
+MAX_TOOL_ROUNDS = 5  # tool-call rounds per command before forcing an answer
+TOOL_LOOP_TIMEOUT = 60  # seconds per command across all tool rounds
+BATCH_WORKERS = 8  # sessions run at once by python -m assistant.batch
+
+# File Reads
+READ_MAX_BYTES = 32 * 1024  # largest read_file result; anything beyond is left out with a note
+READ_MMAP_THRESHOLD = 1024 * 1024  # bigger files are memory-mapped instead of read into memory
+
+# Workspace Index
+INDEX_REFRESH_INTERVAL = 2.0  # seconds between background scans for changes made outside JARVIS
+INDEX_MAX_RESULTS = 200  # entries per recursive listing or file search
+INDEX_IGNORE = {".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+# Code Search
+SEARCH_INDEX_FILE = ".jarvis_search.db"  # trigram index, kept in the workspace
+SEARCH_MAX_RESULTS = 50  # matching lines per search
+SEARCH_CONTEXT_LINES = 1  # lines shown before and after each match
+SEARCH_MAX_FILE_BYTES = 1024 * 1024  # bigger files are not searched
+SEARCH_MERGE_AFTER = 500  # files changed since the postings were built before they are rebuilt
+
+# Context Retrieval (workspace snippets relevant to each turn)
+RETRIEVAL_ENABLED = os.getenv("JARVIS_RETRIEVAL", "1") != "0"
+RETRIEVAL_TOP_K = 4  # files a turn's snippets come from
+RETRIEVAL_MAX_BYTES = 2048  # snippet text added to each turn's requests
+RETRIEVAL_CHUNK_LINES = 30  # files are indexed in chunks of this many lines
+RETRIEVAL_MAX_FILE_BYTES = 256 * 1024  # bigger files are not indexed
+RETRIEVAL_MERGE_AFTER = 1000  # chunks changed since the postings were built before they are rebuilt
+RETRIEVAL_BUILD_WAIT = 1.0  # seconds a turn waits for the first build; after that it goes without
+RETRIEVAL_RECENT_FILES = 50  # recently touched files (from memory) that rank higher
+RETRIEVAL_ACTIVITY_BOOST = 0.5  # score boost for the most recently touched file, tapering to 0
+RETRIEVAL_BM25_K1 = 1.2
+RETRIEVAL_BM25_B = 0.75
+
+# Caching
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # file reads, listings and answers
+CACHE_TTL = 3600  # seconds
+ANSWER_CACHE = True  # repeat answers to repeated questions while the files they read are unchanged
+
+# LLM Backend
+LLM_BACKEND = os.getenv("JARVIS_LLM_BACKEND", "groq")  # "groq" or "mock"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # None uses the public Groq API
+MOCK_LLM_URL = os.getenv("JARVIS_MOCK_LLM_URL", "http://127.0.0.1:8765")
+LLM_TIMEOUT = 30  # seconds per request, including retries; a streamed answer must finish within it too
+LLM_MAX_RETRIES = 3
+LLM_BACKOFF_BASE = 0.5  # seconds; doubled per attempt, with full jitter
+LLM_BACKOFF_MAX = 8  # seconds
+LLM_HEDGE_AFTER = 0  # seconds before sending a duplicate of a slow request (0 = off)
+
+# Tracing (python jarvis.py --trace, or JARVIS_TRACE=1)
+TRACE_ENABLED = os.getenv("JARVIS_TRACE", "") not in ("", "0")
+TRACE_FILE = ".jarvis_trace.jsonl"  # one span per line, in the workspace; metrics go next to it as .prom
+TRACE_WINDOW = 1000  # recent durations per stage behind p50/p95/p99
+PROFILE_SLOW_TURNS = float(os.getenv("JARVIS_PROFILE_SLOW_TURNS", 0))  # seconds; slower turns get their top stacks traced (0 = off)
+PROFILE_INTERVAL = 0.01  # seconds between stack samples
+PROFILE_TOP_STACKS = 10  # stacks kept per slow turn
+
+# Server (python -m assistant.server)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8766
+SERVER_WORKERS = 16  # turns running at once, each with at most one LLM request in flight
+SERVER_MAX_PENDING = 64  # turns running or waiting before new ones are refused with 503
+SERVER_SESSION_TTL = 1800  # seconds a session's history is kept without use
+SERVER_MAX_BODY = 1024 * 1024  # largest request body or WebSocket message
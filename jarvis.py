@@ -4,93 +4,184 @@ JARVIS - Voice-Activated AI Assistant
 Main entry point for the assistant
 """
 
+import argparse
+import concurrent.futures
 import sys
-from assistant.voice_handler import VoiceHandler
+from assistant.voice_handler import TextHandler, VoiceHandler
 from assistant.ai_brain import AIBrain
 from assistant.code_handler import CodeHandler
+from assistant.intent_router import IntentRouter
+from assistant.tracing import tracer
 from config import WAKE_WORD
 import config
 
 def main():
+    parser = argparse.ArgumentParser(description="JARVIS voice assistant")
+    parser.add_argument("--replay", nargs="+", metavar="WAV",
+                        help="feed recorded mono 16-bit WAV files instead of the microphone")
+    parser.add_argument("--text", action="store_true",
+                        help="type commands and read replies; no microphone, speech or audio libraries")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"time each stage of every turn into {config.TRACE_FILE} in the workspace")
+    args = parser.parse_args()
+    
     print("🤖 Initializing JARVIS...")
     
-    # Check API key
-    if not config.GROQ_API_KEY:
+    # Check API key (not needed for the local mock backend)
+    if config.LLM_BACKEND == "groq" and not config.GROQ_API_KEY:
         print("❌ Error: GROQ_API_KEY not found")
         print("Get a FREE API key from: https://console.groq.com/keys")
         print("Then add it to the .env file")
         sys.exit(1)
     
-    # Initialize components
-    from assistant.memory import Memory
+    # Initialize components: memory, the LLM client and the workspace load on
+    # worker threads while the audio stack starts here (pyttsx3 wants the main thread)
+    from assistant.memory import open_memory
+    
+    init = concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix="jarvis-init")
+    memory_future = init.submit(open_memory, config.WORKSPACE_DIR)
+    brain_future = init.submit(lambda: AIBrain(memory=memory_future.result()))
+    code_future = init.submit(lambda: CodeHandler(memory=memory_future.result()))
+    router = IntentRouter()
+    
+    use_pipeline = not args.text and (config.CONCURRENT_AUDIO or args.replay)
+    # The pipeline tracks the noise floor as it listens; only plain listen() needs calibrating
+    voice = TextHandler() if args.text else VoiceHandler(calibrate=not use_pipeline)
+    
+    trace_file = config.WORKSPACE_DIR / config.TRACE_FILE
+    if args.trace or config.TRACE_ENABLED:
+        tracer.enable(trace_file)
+        print(f"⏱️  Tracing turns to {trace_file}")
+    
+    # Typed commands need no wake word
+    conversation_active = args.text
+    
+    # Capture and recognition run in the background so nothing said while
+    # JARVIS is thinking or speaking is lost, and speech can interrupt TTS.
+    # It starts listening for the wake word before the other components are ready.
+    pipeline = None
+    if use_pipeline:
+        from assistant.audio_pipeline import VoicePipeline, WavFileSource
+        source = WavFileSource(args.replay) if args.replay else None
+        # Partial transcripts let the wake word and exit/pause phrases act
+        # before the closing pause (streaming speech backends only)
+        finalize_early = lambda partial: router.is_control(partial) if conversation_active else router.is_wake(partial)
+        pipeline = VoicePipeline(voice, source, on_partial=finalize_early).start()
+        if pipeline.spotter is None:
+            print("💡 Record the wake word for offline detection: python -m assistant.wake_word enroll")
+    
+    memory, brain, code_handler = memory_future.result(), brain_future.result(), code_future.result()
+    init.shutdown()
     
-    voice = VoiceHandler()
-    memory = Memory(config.WORKSPACE_DIR)
-    brain = AIBrain(memory=memory)
-    code_handler = CodeHandler(memory=memory)
+    def listen(wake=False):
+        with tracer.span("listen", wake=wake):
+            return _listen(wake)
+    
+    def _listen(wake):
+        if pipeline is None:
+            return voice.listen()
+        # While idle, nothing goes to cloud recognition until the wake word is spotted locally
+        pipeline.wait_for_wake(wake)
+        text = pipeline.next_transcript()
+        if text is None and pipeline.finished.is_set():
+            raise EOFError
+        return text
     
     # Update session
     memory.update_session()
     
     print(f"✅ JARVIS is ready!")
-    print(f"💡 Say '{WAKE_WORD}' to start a conversation")
-    print(f"💡 Or press Ctrl+C to exit\n")
-    
-    conversation_active = False
+    if args.text:
+        print(f"💡 Type a command, or 'goodbye jarvis' (or Ctrl+D) to exit\n")
+    else:
+        print(f"💡 Say '{WAKE_WORD}' to start a conversation")
+        print(f"💡 Or press Ctrl+C to exit\n")
     
     try:
         while True:
             if not conversation_active:
                 # Listen for wake word to start conversation
                 print(f"👂 Listening for '{WAKE_WORD}'...")
-                text = voice.listen()
+                text = listen(wake=True)
                 
                 if not text:
                     continue
                     
-                if WAKE_WORD.lower() in text.lower():
+                if router.is_wake(text):
                     conversation_active = True
-                    voice.speak("Hello! I'm listening. What can I help you with?")
+                    voice.speak(config.PHRASES["greeting"])
                     print("🎤 Conversation started! (Say 'stop listening' to pause)\n")
             else:
                 # Continuous conversation mode
                 print("👂 Listening...")
-                command = voice.listen()
+                command = listen()
                 
                 if not command:
                     continue
                 
                 print(f"📝 You: {command}")
                 
-                # Check for exit commands
-                command_lower = command.lower()
-                if any(phrase in command_lower for phrase in ["goodbye jarvis", "bye jarvis", "exit jarvis"]):
-                    voice.speak("Goodbye! Have a great day!")
-                    break
-                elif any(word in command_lower for word in ["exit", "quit", "goodbye", "bye"]):
-                    voice.speak("Goodbye! Have a great day!")
+                # Control phrases and simple file commands are handled locally
+                intent = router.route(command)
+                if intent and intent.name == "exit":
+                    voice.speak(config.PHRASES["goodbye"])
                     break
                 
-                # Check for pause command
-                if any(phrase in command.lower() for phrase in ["stop listening", "pause", "sleep"]):
-                    voice.speak("Okay, I'll wait. Say 'Hey Jarvis' when you need me again.")
+                if intent and intent.name == "pause":
+                    voice.speak(config.PHRASES["pause"])
                     conversation_active = False
                     print("💤 Conversation paused\n")
                     continue
                 
-                # Process command with AI
-                response = brain.process_command(command, code_handler)
-                print(f"💭 JARVIS: {response}\n")
-                
-                # Speak the response
-                voice.speak(response)
+                with tracer.turn(intent=intent.name if intent else None):
+                    if intent:
+                        result, response = router.handle(intent, code_handler)
+                        brain.record_local_turn(command, intent.name, intent.args, result, response, code_handler)
+                        print(f"{result}\n")
+                        voice.speak(response)
+                        memory.flush()
+                        continue
+                    
+                    # Process command with AI
+                    if config.STREAM_RESPONSES:
+                        # Speaks each sentence as soon as it has been generated
+                        response = voice.speak_stream(brain.process_command_stream(command, code_handler))
+                        print(f"💭 JARVIS: {response}\n")
+                    else:
+                        response = brain.process_command(command, code_handler)
+                        print(f"💭 JARVIS: {response}\n")
+                        
+                        # Speak the response
+                        voice.speak(response)
+                    
+                    if config.SHOW_PROMPT_METRICS and brain.prompt_metrics:
+                        metrics = brain.prompt_metrics[-1]
+                        print(f"📏 Prompt: ~{metrics['prompt_tokens']}/{metrics['budget']} tokens, "
+                              f"{metrics['messages']} messages, {metrics['folded_turns']} turns summarized")
+                        cache = code_handler.cache.stats()
+                        print(f"💾 Cache: {cache['hits']} hits, {cache['misses']} misses, "
+                              f"{cache['bytes'] // 1024}KB of {cache['max_bytes'] // 1024}KB\n")
+                    
+                    # Persist this turn's memory updates in one batch
+                    memory.flush()
     
+    except EOFError:
+        print("\n📼 End of input")
     except KeyboardInterrupt:
         print("\n\n👋 Shutting down JARVIS...")
-        voice.speak("Shutting down. Goodbye!")
+        voice.speak(config.PHRASES["shutdown"])
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        voice.speak("I encountered an error. Please check the console.")
+        voice.speak(config.PHRASES["error"])
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+        memory.flush()
+        if tracer.enabled:
+            tracer.close()
+            trace_file.with_suffix(".prom").write_text(tracer.prometheus())
+            print(f"\n⏱️  Stage latencies (spans in {trace_file.name}, metrics in {trace_file.with_suffix('.prom').name}):")
+            print(tracer.summary())
 
 if __name__ == "__main__":
     main()